@@ -1,42 +1,48 @@
 import numpy as np
 import pandas as pd
-import mysql.connector as mdb
 import matplotlib.pyplot as plt
 import mplfinance as mpf
 from itertools import product
-from urllib.parse import quote_plus
-from sqlalchemy import create_engine
 from matplotlib.backends.backend_pdf import PdfPages
 import os
+import sys
 
+# ✅ Shared data layer (pooled engine, Parquet candle store)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Sql_setup_and_data_fetch"))
+from db_engine import get_engine
+from candle_store import candle_store_dir, load_candles, sync_candle_store
+from ohlcv_panel import PANEL_FIELDS, date_columns, load_or_build_panel, store_fingerprint, ticker_rows
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Indicators"))
+from indicators import wma
+from indicator_cache import INDICATOR_CACHE, data_key
 
-# ✅ Database Connection Details
-DB_HOST = "localhost"
-DB_USER = "sec_user"
-DB_PASS = "v"
+
+# ✅ Database (credentials come from the environment, see db_engine.py)
 DB_NAME = "securities_master"
+ENGINE = get_engine(DB_NAME)
+STORE_DIR = candle_store_dir(DB_NAME)
 
-# ✅ Encode Password for URL
-ENCODED_PASS = quote_plus(DB_PASS)
-ENGINE = create_engine(f"mysql+mysqlconnector://{DB_USER}:{ENCODED_PASS}@{DB_HOST}/{DB_NAME}")
+# ✅ Backtest window and WMA parameter grid
+BACKTEST_START, BACKTEST_END = "2024-02-21", "2025-02-21"
+SHORT_RANGE, LONG_RANGE = range(5, 16, 5), range(20, 41, 10)
 
 
 # ✅ Fetch Nifty 50 Stocks
 def get_nifty50_stocks():
     try:
-        con = mdb.connect(host=DB_HOST, user=DB_USER, password=DB_PASS, database=DB_NAME)
-        cur = con.cursor()
-        cur.execute("SELECT ticker FROM symbol")
-        stocks = [row[0] for row in cur.fetchall()]
-        con.close()
-        return stocks
+        return pd.read_sql("SELECT ticker FROM symbol", con=ENGINE)["ticker"].tolist()
     except Exception as e:
         print(f"❌ Error fetching stock list: {e}")
         return []
 
 
 # ✅ Load Historical Data
-def load_data(stock_ticker, start_date="2024-02-21", end_date="2025-02-21"):
+def load_data(stock_ticker, start_date=BACKTEST_START, end_date=BACKTEST_END):
+    # ✅ Read from the local Parquet mirror (synced once in backtest_multiple_stocks)
+    df = load_candles(stock_ticker, start_date=start_date, end_date=end_date, store_dir=STORE_DIR)
+    if not df.empty:
+        return df.droplevel("ticker")
+
     query = """
         SELECT dp.price_date AS timestamp, dp.open_price AS open, dp.high_price AS high, 
                dp.low_price AS low, dp.close_price AS close, dp.volume AS volume
@@ -58,21 +64,53 @@ def load_data(stock_ticker, start_date="2024-02-21", end_date="2025-02-21"):
         return None
 
 
-# ✅ Weighted Moving Average (WMA)
-def weighted_moving_average(prices, period):
-    weights = np.arange(1, period + 1)
-    return np.convolve(prices, weights / weights.sum(), mode="valid")
+# ✅ Backtest window of every ticker from the memory-mapped panel (None without a local mirror)
+class PanelWindow:
+    """Panel columns of [start_date, end_date] plus the WMA of every ticker for every grid window (one call each)."""
+
+    def __init__(self, panel, start_date=BACKTEST_START, end_date=BACKTEST_END, windows=()):
+        self.panel = panel
+        self.columns = date_columns(panel, start_date, end_date)  # A slice: the arrays below stay mmap views
+        self.rows = ticker_rows(panel)
+        close = panel.close[:, self.columns]
+        key = data_key(close)  # Hash the close panel once for every window
+        self.wmas = {window: weighted_moving_average(close, window, key) for window in windows}
+
+    def stock(self, ticker):
+        """(frame like load_data(), {window: WMA aligned with it}), or None without bars in the window."""
+        row = self.rows.get(ticker)
+        if row is None:
+            return None
+        bars = np.flatnonzero(self.panel.valid[row, self.columns])
+        if not len(bars):
+            return None
+        index = pd.DatetimeIndex(self.panel.dates[self.columns][bars], name="timestamp")
+        df = pd.DataFrame({field: getattr(self.panel, field)[row, self.columns][bars] for field in PANEL_FIELDS},
+                          index=index)
+        return df, {window: values[row, bars] for window, values in self.wmas.items()}
+
+
+def load_panel_window():
+    if store_fingerprint(STORE_DIR) is None:
+        return None
+    return PanelWindow(load_or_build_panel(STORE_DIR), windows=sorted(set(SHORT_RANGE) | set(LONG_RANGE)))
+
+
+# ✅ Weighted Moving Average (WMA): newest close weighted most, NaN until a full window
+def weighted_moving_average(prices, period, key=None):
+    """Memoized per (close series or ticker x date panel, period): a parameter sweep computes each window once."""
+    return INDICATOR_CACHE.get("wma", np.asarray(prices, dtype=float), wma, key=key, window=period)
 
 
 # ✅ Generate Trading Signals
-def generate_signals(df, short_window, long_window):
+def generate_signals(df, short_window, long_window, key=None, wmas=None):
+    """wmas: optional {window: WMA aligned with df} precomputed for the whole panel (see PanelWindow)."""
     df = df.copy()
-    df["WMA_Short"] = np.nan
-    df["WMA_Long"] = np.nan
-
-    if len(df) >= long_window:
-        df.loc[df.index[short_window - 1:], "WMA_Short"] = weighted_moving_average(df["close"], short_window)
-        df.loc[df.index[long_window - 1:], "WMA_Long"] = weighted_moving_average(df["close"], long_window)
+    if wmas is not None:
+        df["WMA_Short"], df["WMA_Long"] = wmas[short_window], wmas[long_window]
+    else:
+        df["WMA_Short"] = weighted_moving_average(df["close"], short_window, key)
+        df["WMA_Long"] = weighted_moving_average(df["close"], long_window, key)
 
     df.dropna(inplace=True)
     df["Signal"] = np.where(df["WMA_Short"] > df["WMA_Long"], 1, 0)
@@ -81,14 +119,16 @@ def generate_signals(df, short_window, long_window):
 
 
 # ✅ Optimize WMA Parameters
-def optimize_wma_parameters(df, short_range=range(5, 16, 5), long_range=range(20, 41, 10)):
+def optimize_wma_parameters(df, short_range=SHORT_RANGE, long_range=LONG_RANGE, wmas=None):
     best_params = None
     best_performance = float('-inf')
+    # Hash the closes once for the whole grid (not needed when the panel WMAs are passed in)
+    key = None if wmas is not None else data_key(df["close"].to_numpy(dtype=float))
 
     for short, long in product(short_range, long_range):
         if short >= long:
             continue
-        df_test = generate_signals(df.copy(), short, long)
+        df_test = generate_signals(df, short, long, key, wmas)
         trades, final_balance = backtest(df_test)
         net_profit = final_balance - 5000
 
@@ -174,21 +214,28 @@ def save_all_charts_to_pdf(all_trades):
 
 # ✅ Run Backtest for Multiple Stocks and Save to CSV
 def backtest_multiple_stocks():
+    try:
+        sync_candle_store(ENGINE, STORE_DIR)  # ✅ Pull only rows newer than each symbol's watermark
+    except Exception as e:
+        print(f"⚠️ Candle store sync failed, using the local mirror as-is: {e}")
+
     stock_list = get_nifty50_stocks()
+    window = load_panel_window()  # ✅ One WMA call per grid window covers every ticker in the mirror
     results = []
     all_trades = {}
 
     for stock in stock_list:
-        df = load_data(stock)
+        loaded = window.stock(stock) if window is not None else None
+        df, wmas = loaded if loaded is not None else (load_data(stock), None)
         if df is None:
             continue
 
-        best_params = optimize_wma_parameters(df)
+        best_params = optimize_wma_parameters(df, wmas=wmas)
         if best_params is None:
             continue
 
         best_short, best_long = best_params
-        df_signals = generate_signals(df, best_short, best_long)
+        df_signals = generate_signals(df, best_short, best_long, wmas=wmas)
         trades, final_balance = backtest(df_signals)
         net_profit = final_balance - 5000
 
@@ -200,6 +247,7 @@ def backtest_multiple_stocks():
     print("✅ Results saved to backtest_results.csv")
 
     save_all_charts_to_pdf(all_trades)
+    print(f"🧮 Indicator cache: {INDICATOR_CACHE.stats()}")
 
 
 # ✅ Run Strategy
@@ -2,27 +2,29 @@ import numpy as np
 import pandas as pd
 import time
 import json
-from fyers_apiv3 import fyersModel
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine
-from urllib.parse import quote_plus
 import os
+import sys
+
+# ✅ Shared data layer (pooled engine, session-scoped history cache)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Sql_setup_and_data_fetch"))
+from db_engine import get_engine
+from history_cache import HistoryCache
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Fyers_API_setup"))
+from fyers_client import FyersClient, create_model
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Indicators"))
+from indicators import wma
 
 # ✅ Manually Enter Fyers API Credentials
 CLIENT_ID = os.getenv("FYERS_APP_ID") # Replace with your actual Fyers App ID
 ACCESS_TOKEN = os.getenv("FYERS_ACCESS_TOKEN")
 
-# ✅ Database Connection
-DB_HOST = "localhost"
-DB_USER = "sec_user"
-DB_PASS = os.getenv("db_password")
+# ✅ Database Connection (pooled; credentials come from the environment)
 DB_NAME = "securities_master"
+ENGINE = get_engine(DB_NAME)
 
-ENCODED_PASS = quote_plus(DB_PASS)
-ENGINE = create_engine(f"mysql+mysqlconnector://{DB_USER}:{ENCODED_PASS}@{DB_HOST}/{DB_NAME}")
-
-# ✅ Initialize Fyers API
-fyers = fyersModel.FyersModel(client_id=CLIENT_ID, token=ACCESS_TOKEN, is_async=False)
+# ✅ Initialize Fyers API (per-endpoint rate budgets replace the fixed sleeps between calls)
+fyers = FyersClient(create_model(CLIENT_ID, ACCESS_TOKEN, is_async=False))
 
 
 # ✅ Trading Parameters
@@ -38,33 +40,67 @@ def get_nifty50_stocks():
     return df["ticker"].tolist()
 
 
-# ✅ Fetch Real-Time Data from Fyers
-def fetch_realtime_data(stock_ticker):
-    symbol = f"NSE:{stock_ticker}-EQ"
-    data = fyers.history({
-        "symbol": symbol,
-        "resolution": "D",
-        "date_format": "1",
-        "range_from": (datetime.today() - timedelta(days=60)).strftime('%Y-%m-%d'),
-        "range_to": datetime.today().strftime('%Y-%m-%d'),
-        "cont_flag": "1"
-    })
-
-    if "candles" in data and data["candles"]:
-        df = pd.DataFrame(data["candles"], columns=["timestamp", "open", "high", "low", "close", "volume"])
-        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
-        df.set_index("timestamp", inplace=True)
-        return df
-    else:
-        print(f"❌ No data available for {stock_ticker}.")
+# ✅ Fetch Daily History from Fyers (completed sessions only; loaded once per day by HISTORY)
+def fetch_daily_history(stock_list):
+    history = {}
+    for stock_ticker in stock_list:
+        symbol = f"NSE:{stock_ticker}-EQ"
+        data = fyers.history({
+            "symbol": symbol,
+            "resolution": "D",
+            "date_format": "1",
+            "range_from": (datetime.today() - timedelta(days=60)).strftime('%Y-%m-%d'),
+            "range_to": (datetime.today() - timedelta(days=1)).strftime('%Y-%m-%d'),
+            "cont_flag": "1"
+        })
+
+        if "candles" in data and data["candles"]:
+            df = pd.DataFrame(data["candles"], columns=["timestamp", "open", "high", "low", "close", "volume"])
+            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
+            df.set_index("timestamp", inplace=True)
+            history[stock_ticker] = df
+        else:
+            print(f"❌ No data available for {stock_ticker}.")
+    return history
+
+
+HISTORY = HistoryCache(fetch_daily_history)
+
+
+# ✅ Fetch Live Quotes for all stocks (batched into as few quotes calls as possible)
+def fetch_live_prices(stock_list):
+    """{ticker: today's partial candle {open, high, low, close, volume}} from the quotes endpoint"""
+    live_prices = {}
+    for item in fyers.quotes_many([f"NSE:{s}-EQ" for s in stock_list]):
+        quote = item.get("v", {})
+        price = quote.get("lp")
+        if price is None:
+            continue
+        live_prices[item["n"].split(":")[-1].rsplit("-", 1)[0]] = {
+            "open": quote.get("open_price", price),
+            "high": quote.get("high_price", price),
+            "low": quote.get("low_price", price),
+            "close": price,
+            "volume": quote.get("volume", 0),
+        }
+    return live_prices
+
+
+# ✅ Real-Time Data: cached daily history + today's partial candle (every OHLCV column filled)
+def fetch_realtime_data(stock_ticker, live_quote=None):
+    df = HISTORY.frame(stock_ticker)
+    if df is None:
         return None
+    if live_quote is None:
+        return df
+    today = pd.Timestamp(datetime.today().date())
+    live_row = pd.DataFrame({column: [live_quote[column]] for column in df.columns}, index=[today])
+    return pd.concat([df, live_row])
 
 
-# ✅ Weighted Moving Average (WMA)
+# ✅ Weighted Moving Average (WMA): newest close weighted most, NaN until a full window
 def weighted_moving_average(prices, period):
-    weights = np.arange(1, period + 1)
-    wma = np.convolve(prices, weights / weights.sum(), mode="valid")
-    return np.concatenate((np.full(period - 1, np.nan), wma))
+    return wma(np.asarray(prices, dtype=float), period)
 
 
 # ✅ Generate Trading Signals
@@ -75,7 +111,7 @@ def generate_signals(df, short_window=10, long_window=30):
     df = df.copy()
     df["WMA_Short"] = weighted_moving_average(df["close"], short_window)
     df["WMA_Long"] = weighted_moving_average(df["close"], long_window)
-    df.dropna(inplace=True)
+    df.dropna(subset=["WMA_Short", "WMA_Long"], inplace=True)
     df["Signal"] = np.where(df["WMA_Short"] > df["WMA_Long"], 1, 0)
     df["Position"] = df["Signal"].diff()
     return df
@@ -147,8 +183,13 @@ def live_trading():
     capital = INITIAL_CAPITAL
     trade_log = []
 
+    HISTORY.prefetch(stock_list)  # No API calls for history after the first cycle of the day
+    live_prices = fetch_live_prices(stock_list)
+
     for stock in stock_list:
-        df = fetch_realtime_data(stock)
+        if stock not in live_prices:
+            continue
+        df = fetch_realtime_data(stock, live_prices[stock])
         if df is None:
             continue
 
@@ -157,6 +198,9 @@ def live_trading():
             continue
 
         latest = df_signals.iloc[-1]
+        if df_signals.index[-1].normalize() != pd.Timestamp(datetime.today().date()):
+            print(f"⚠️ {stock}: latest bar is {df_signals.index[-1].date()}, not today's; skipping")
+            continue  # Never act on a crossover from a completed session again
         trade_size = max(int((RISK_PER_TRADE * capital) / latest["close"]), 1)
 
         if latest["Position"] == 1:  # Buy Signal
@@ -175,8 +219,6 @@ def live_trading():
             if order_id:
                 trade_log.append([datetime.now(), stock, "SELL", latest["close"], trade_size, "-", "-", "-", "-"])
 
-        time.sleep(1)  # Avoid API Rate Limits
-
     # ✅ Save Live Trades to CSV
     trade_df = pd.DataFrame(trade_log,
                             columns=["Timestamp", "Stock", "Action", "Entry Price", "Qty", "Exit Price", "Trade P/L",
@@ -191,5 +233,6 @@ if __name__ == "__main__":
         print("\n🔄 Running WMA Strategy...")
         live_trading()
         save_pending_orders()  # ✅ Fetch & Save Pending Orders
+        print(f"📈 Fyers API usage: {fyers.stats()}")
         print("⏳ Waiting for next cycle...\n")
         time.sleep(300)  # Run every 5 minutes
@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import zlib
+import random
+import argparse
+import datetime
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# ✅ Offline stand-in for FyersModel: same method names and response shapes, no broker calls.
+# Scripts get it through fyers_client.create_model() when FYERS_FAKE=1 (see from_env() for the knobs).
+FAKE_ENV = "FYERS_FAKE"
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+SESSION_OPEN_MINUTE = 9 * 60 + 15
+SESSION_MINUTES = 375
+FAKE_RATE_LIMITS = ((10, 1.0), (200, 60.0))  # (requests, window seconds): Fyers' per-app caps
+FAKE_FUNDS = 1_000_000.0
+MINUTE_VOLATILITY = 0.0012  # Per-minute log-return stdev of the synthetic prices
+
+RATE_LIMITED = {"s": "error", "code": 429, "message": "request limit reached"}
+
+
+def _ticker(symbol):
+    """'NSE:BAJAJ-AUTO-EQ' / 'NSE:SBIN' → 'BAJAJ-AUTO' / 'SBIN'"""
+    name = symbol.split(":")[-1]
+    return name[:-3] if name.endswith("-EQ") else name
+
+
+def _seed(*parts):
+    return zlib.crc32("|".join(str(p) for p in parts).encode())
+
+
+# ✅ Deterministic synthetic prices: the same (ticker, day) always yields the same minutes,
+# so daily and intraday requests, separate windows and separate runs all agree with each other
+def synthetic_minutes(ticker, day):
+    """375 one-minute (open, high, low, close, volume) rows for one session, as a (375, 5) array."""
+    ordinal = day.toordinal()
+    base = 100 + _seed(ticker) % 4900
+    phase = (_seed(ticker, "phase") % 628) / 100
+    day_open = base * np.exp(0.0002 * (ordinal % 3650) + 0.15 * np.sin(ordinal / 25 + phase))
+    rng = np.random.default_rng(_seed(ticker, ordinal))
+    closes = day_open * np.exp(np.cumsum(rng.normal(0, MINUTE_VOLATILITY, SESSION_MINUTES)))
+    opens = np.r_[day_open, closes[:-1]]
+    spread = np.abs(rng.normal(0, MINUTE_VOLATILITY / 2, SESSION_MINUTES)) * closes
+    highs = np.maximum(opens, closes) + spread
+    lows = np.minimum(opens, closes) - spread
+    volumes = rng.integers(1_000, 50_000, SESSION_MINUTES)
+    return np.column_stack([opens, highs, lows, closes, volumes]).round(2)
+
+
+def _previous_weekday(day):
+    day -= datetime.timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= datetime.timedelta(days=1)
+    return day
+
+
+def _epoch(day, minute_of_day):
+    start = datetime.datetime.combine(day, datetime.time(), IST) + datetime.timedelta(minutes=int(minute_of_day))
+    return int(start.timestamp())
+
+
+def synthetic_candles(ticker, start_date, end_date, resolution="D"):
+    """Fyers-style candles [[epoch, o, h, l, c, v], ...] for weekdays in [start_date, end_date]."""
+    candles = []
+    for day in pd.bdate_range(start_date, end_date).date:
+        bars = synthetic_minutes(ticker, day)
+        if resolution == "D":
+            candles.append([_epoch(day, 0), bars[0, 0], bars[:, 1].max(), bars[:, 2].min(), bars[-1, 3],
+                            int(bars[:, 4].sum())])
+            continue
+        step = int(resolution)
+        for i in range(0, SESSION_MINUTES, step):
+            chunk = bars[i:i + step]
+            candles.append([_epoch(day, SESSION_OPEN_MINUTE + i), chunk[0, 0], chunk[:, 1].max(), chunk[:, 2].min(),
+                            chunk[-1, 3], int(chunk[:, 4].sum())])
+    return [[c[0]] + [float(v) for v in c[1:5]] + [int(c[5])] for c in candles]
+
+
+class FakeFyersModel:
+    """
+    In-process fake of fyers_apiv3 / fyers_api FyersModel for benchmarks and dry runs.
+
+    history, quotes, funds, orderbook, positions, place_order and get_profile return the same JSON
+    shapes as the broker. Prices come from recorded responses in data_dir (see RecordingModel) when
+    present, otherwise from synthetic_minutes(). Every call sleeps latency_ms ± jitter_ms and is
+    refused with code 429 once any (requests, window seconds) rate limit is exceeded.
+    """
+
+    is_async = False
+
+    def __init__(self, latency_ms=50.0, jitter_ms=20.0, rate_limits=FAKE_RATE_LIMITS, error_rate=0.0,
+                 data_dir=None, funds=FAKE_FUNDS, clock=None, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limits = [(limit, window, deque()) for limit, window in rate_limits]
+        self.error_rate = error_rate
+        self.data_dir = data_dir
+        self.clock = clock or (lambda: datetime.datetime.now(IST))
+        self.available_funds = float(funds)
+        self.orders = []
+        self.calls = {}
+        self.refused = 0
+        self._random = random.Random(seed)
+        self._recorded = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency_ms=float(os.getenv("FYERS_FAKE_LATENCY_MS", "50")),
+            jitter_ms=float(os.getenv("FYERS_FAKE_JITTER_MS", "20")),
+            rate_limits=((int(os.getenv("FYERS_FAKE_RATE_SECOND", "10")), 1.0),
+                         (int(os.getenv("FYERS_FAKE_RATE_MINUTE", "200")), 60.0)),
+            error_rate=float(os.getenv("FYERS_FAKE_ERROR_RATE", "0")),
+            data_dir=os.getenv("FYERS_FAKE_DATA_DIR"),
+            funds=float(os.getenv("FYERS_FAKE_FUNDS", FAKE_FUNDS)),
+        )
+
+    # ✅ Latency, sliding-window rate limits and injected server errors, applied to every endpoint
+    def _request(self, endpoint):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            now = time.monotonic()
+            for limit, window, sent in self.rate_limits:
+                while sent and now - sent[0] >= window:
+                    sent.popleft()
+                if len(sent) >= limit:
+                    self.refused += 1
+                    return dict(RATE_LIMITED)
+            for _, _, sent in self.rate_limits:
+                sent.append(now)
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            failed = self._random.random() < self.error_rate
+        time.sleep(delay)
+        return {"s": "error", "code": 503, "message": "service unavailable (injected)"} if failed else None
+
+    def _recorded_candles(self, ticker, resolution):
+        if not self.data_dir:
+            return None
+        key = (ticker, resolution)
+        if key not in self._recorded:
+            path = os.path.join(self.data_dir, "history", f"{ticker}_{resolution}.json")
+            self._recorded[key] = json.load(open(path)) if os.path.exists(path) else None
+        return self._recorded[key]
+
+    def history(self, data):
+        error = self._request("history")
+        if error:
+            return error
+        ticker, resolution = _ticker(data["symbol"]), str(data.get("resolution", "D"))
+        start = datetime.date.fromisoformat(data["range_from"])
+        end = datetime.date.fromisoformat(data["range_to"])
+        recorded = self._recorded_candles(ticker, resolution)
+        if recorded is not None:
+            lo, hi = _epoch(start, 0), _epoch(end + datetime.timedelta(days=1), 0)
+            candles = [c for c in recorded if lo <= c[0] < hi]
+        else:
+            candles = synthetic_candles(ticker, start, end, resolution)
+        if not candles:
+            return {"s": "no_data", "candles": []}
+        return {"s": "ok", "candles": candles}
+
+    # ✅ Live price = the synthetic minute bar for the current IST time (last close outside the session)
+    def _last_price(self, ticker):
+        now = self.clock().astimezone(IST)
+        day = now.date() if now.weekday() < 5 else _previous_weekday(now.date())
+        bars = synthetic_minutes(ticker, day)
+        minute = now.hour * 60 + now.minute - SESSION_OPEN_MINUTE if day == now.date() else SESSION_MINUTES
+        minute = min(max(minute, 0), SESSION_MINUTES - 1)
+        return bars, minute, day
+
+    def quotes(self, data):
+        error = self._request("quotes")
+        if error:
+            return error
+        quotes = []
+        for symbol in data["symbols"].split(","):
+            ticker = _ticker(symbol)
+            bars, minute, day = self._last_price(ticker)
+            so_far = bars[:minute + 1]
+            lp, prev_close = float(bars[minute, 3]), float(synthetic_minutes(ticker, _previous_weekday(day))[-1, 3])
+            quotes.append({"n": symbol, "s": "ok", "v": {
+                "symbol": symbol, "short_name": ticker, "name": ticker, "lp": lp, "ltp": lp,
+                "open_price": float(bars[0, 0]), "high_price": float(so_far[:, 1].max()),
+                "low_price": float(so_far[:, 2].min()), "prev_close_price": prev_close,
+                "o": float(bars[0, 0]), "h": float(so_far[:, 1].max()), "l": float(so_far[:, 2].min()),
+                "c": prev_close, "ch": round(lp - prev_close, 2), "chp": round(100 * (lp / prev_close - 1), 2),
+                "volume": int(so_far[:, 4].sum()), "tt": int(self.clock().timestamp()),
+            }})
+        return {"s": "ok", "code": 200, "d": quotes}
+
+    def funds(self):
+        error = self._request("funds")
+        if error:
+            return error
+        return {"s": "ok", "code": 200, "fund_limit": [
+            {"id": 10, "title": "Available Balance", "equityAmount": round(self.available_funds, 2),
+             "commodityAmount": 0.0},
+        ]}
+
+    # ✅ Market orders fill at once at the live price; other order types stay pending
+    def place_order(self, data):
+        error = self._request("place_order")
+        if error:
+            return error
+        bars, minute, _ = self._last_price(_ticker(data["symbol"]))
+        price = float(bars[minute, 3])
+        filled = data.get("type") == 2
+        with self._lock:
+            order_id = f"FAKE{len(self.orders) + 1:08d}"
+            if filled:
+                self.available_funds -= data.get("side", 1) * data["qty"] * price
+            self.orders.append({
+                "id": order_id, "symbol": data["symbol"], "qty": data["qty"], "side": data.get("side", 1),
+                "type": data.get("type"), "productType": data.get("productType"),
+                "limitPrice": data.get("limitPrice", 0), "stopPrice": data.get("stopPrice", 0),
+                "status": 2 if filled else 6, "filledQty": data["qty"] if filled else 0,
+                "tradedPrice": price if filled else 0, "orderTag": data.get("orderTag", ""),
+                "orderDateTime": self.clock().strftime("%d-%b-%Y %H:%M:%S"),
+            })
+        return {"s": "ok", "code": 1101, "message": "Order submitted successfully", "id": order_id}
+
+    def orderbook(self, data=None):
+        error = self._request("orderbook")
+        if error:
+            return error
+        with self._lock:
+            return {"s": "ok", "code": 200, "orderBook": [dict(order) for order in self.orders]}
+
+    def positions(self):
+        error = self._request("positions")
+        if error:
+            return error
+        net = {}
+        with self._lock:
+            for order in self.orders:
+                if order["status"] == 2:
+                    net[order["symbol"]] = net.get(order["symbol"], 0) + order["side"] * order["filledQty"]
+        return {"s": "ok", "code": 200, "netPositions": [{"symbol": s, "netQty": q} for s, q in net.items()]}
+
+    def get_profile(self):
+        error = self._request("get_profile")
+        return error or {"s": "ok", "code": 200, "data": {"fy_id": "FAKE0001", "name": "Offline Fyers"}}
+
+
+class RecordingModel:
+    """Wraps a real FyersModel and saves every history response to data_dir for FakeFyersModel to replay."""
+
+    def __init__(self, model, data_dir):
+        self.model = model
+        self.data_dir = data_dir
+        os.makedirs(os.path.join(data_dir, "history"), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def history(self, data):
+        response = self.model.history(data=data)
+        if isinstance(response, dict) and response.get("s") == "ok":
+            path = os.path.join(self.data_dir, "history", f"{_ticker(data['symbol'])}_{data.get('resolution', 'D')}.json")
+            with self._lock:
+                candles = {c[0]: c for c in (json.load(open(path)) if os.path.exists(path) else [])}
+                candles.update({c[0]: c for c in response.get("candles", [])})
+                with open(f"{path}.tmp", "w") as f:
+                    json.dump([candles[t] for t in sorted(candles)], f)
+                os.replace(f"{path}.tmp", path)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+# ✅ Main Execution: hammer the fake through FyersClient and report throughput
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+    from fyers_client import FyersClient
+
+    parser = argparse.ArgumentParser(description="Measure history throughput against the offline Fyers fake.")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--resolution", default="D")
+    args = parser.parse_args()
+
+    fake = FakeFyersModel(latency_ms=args.latency_ms, seed=1)
+    client = FyersClient(fake)
+    payloads = [{"symbol": f"NSE:SYM{i}-EQ", "resolution": args.resolution, "date_format": "1",
+                 "range_from": "2024-01-01", "range_to": "2024-03-31", "cont_flag": "0"} for i in range(args.requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        responses = list(pool.map(lambda payload: client.history(data=payload), payloads))
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for r in responses if r.get("s") == "ok")
+    print(f"✅ {ok}/{len(payloads)} history calls in {elapsed:.2f}s ({len(payloads) / elapsed:.1f} req/s), "
+          f"{fake.refused} refused by the fake's rate limit")
+    print(f"📈 {client.stats()['history']}")
@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import random
+import logging
+import importlib
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+
+# ✅ Fyers API v3 limits are per app: 10 requests/second and 200 requests/minute across all endpoints.
+# Each endpoint gets its own budget inside those, so a burst of quotes cannot starve order placement.
+GLOBAL_BUDGETS = [(10.0, 10), (200 / 60, 200)]  # (tokens per second, burst) for the per-second and per-minute caps
+
+Budget = namedtuple("Budget", ["rate", "burst"])
+RetryPolicy = namedtuple("RetryPolicy", ["retries", "backoff_base", "backoff_cap"])
+
+ENDPOINT_BUDGETS = {
+    "history": Budget(float(os.getenv("FYERS_HISTORY_RATE", "3")), 5),
+    "quotes": Budget(5.0, 5),
+    "depth": Budget(2.0, 2),
+    "orderbook": Budget(1.0, 2),
+    "positions": Budget(1.0, 2),
+    "funds": Budget(1.0, 2),
+    "place_order": Budget(5.0, 5),
+}
+DEFAULT_BUDGET = Budget(1.0, 2)
+
+# Orders are never retried: a timeout does not mean the order was not placed
+NO_RETRY = RetryPolicy(0, 0.0, 0.0)
+RETRY_POLICIES = {
+    "place_order": NO_RETRY,
+    "modify_order": NO_RETRY,
+    "cancel_order": NO_RETRY,
+    "exit_positions": NO_RETRY,
+}
+DEFAULT_RETRY = RetryPolicy(3, 0.5, 8.0)
+
+# Clients that feed async_history_fetcher: the fetcher retries history windows itself (longer backoff,
+# "no_data" is not an error), so the client sends each history call once instead of multiplying the retries
+FETCHER_RETRY_POLICIES = {"history": NO_RETRY}
+
+# Read-only endpoints whose concurrent identical calls share one request
+COALESCED_ENDPOINTS = {"history", "quotes", "depth", "orderbook", "positions", "funds", "get_profile", "holdings", "tradebook"}
+
+# Responses worth retrying: HTTP-style throttling / server errors reported in the JSON body
+RETRYABLE_CODES = {429, -429, 500, 502, 503, 504}
+QUOTES_PER_CALL = 50
+
+
+# ✅ FyersModel factory: FYERS_FAKE=1 swaps in the offline fake (fake_fyers.py) without touching the scripts
+def create_model(client_id=None, token=None, package="fyers_apiv3", **kwargs):
+    """fyersModel.FyersModel from `package` ("fyers_apiv3" or the older "fyers_api"), or FakeFyersModel."""
+    if os.getenv("FYERS_FAKE", "").lower() in ("1", "true", "yes"):
+        from fake_fyers import FakeFyersModel
+        logging.info("🧪 FYERS_FAKE is set: using the offline Fyers fake")
+        return FakeFyersModel.from_env()
+    fyers_model = importlib.import_module(f"{package}.fyersModel")
+    return fyers_model.FyersModel(client_id=client_id, token=token, **kwargs)
+
+
+# ✅ Thread-safe token bucket
+class RateBudget:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token and returns how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class EndpointStats:
+    """Counters of one endpoint; updated from many threads (asyncio.to_thread workers), so always under the lock."""
+
+    def __init__(self):
+        self.calls = 0  # Requests actually sent (including retries)
+        self.requests = 0  # Calls made by the scripts
+        self.coalesced = 0  # Calls answered by another thread's in-flight request
+        self.retries = 0
+        self.errors = 0
+        self.throttled_seconds = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def record_call(self, elapsed):
+        with self._lock:
+            self.calls += 1
+            self.latency_total += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "retries": self.retries,
+                "errors": self.errors,
+                "throttled_s": round(self.throttled_seconds, 3),
+                "avg_latency_ms": round(1000 * self.latency_total / self.calls, 1) if self.calls else 0.0,
+                "max_latency_ms": round(1000 * self.latency_max, 1),
+            }
+
+
+def _is_retryable(response):
+    if not isinstance(response, dict) or response.get("s") != "error":
+        return False
+    message = str(response.get("message", "")).lower()
+    return response.get("code") in RETRYABLE_CODES or "limit" in message or "timeout" in message
+
+
+class FyersClient:
+    """
+    Wraps a FyersModel (fyers_apiv3 or fyers_api) with per-endpoint rate budgets, retries,
+    coalescing of concurrent identical read calls, and per-endpoint call/latency counters.
+
+    Any FyersModel method can be called on the wrapper with the same arguments (fyers.quotes(data),
+    fyers.history(data=payload), fyers.place_order(order), ...).
+
+    `metrics` (optional, e.g. ingest_metrics.METRICS) receives per-endpoint latency / throttle histograms
+    and retry / error counters through its observe() and inc() methods.
+    """
+
+    throttles = True  # Every call already waits for its budget (async_history_fetcher skips its own bucket)
+
+    def __init__(self, model, budgets=None, retry_policies=None, global_budgets=GLOBAL_BUDGETS, metrics=None):
+        self.model = model
+        self.metrics = metrics
+        self._budget_config = {**ENDPOINT_BUDGETS, **(budgets or {})}
+        self._retry_policies = {**RETRY_POLICIES, **(retry_policies or {})}
+        self._global = [RateBudget(rate, burst) for rate, burst in global_budgets]
+        self._budgets = {}
+        self._stats = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _endpoint_state(self, endpoint):
+        with self._lock:
+            if endpoint not in self._budgets:
+                budget = self._budget_config.get(endpoint, DEFAULT_BUDGET)
+                self._budgets[endpoint] = RateBudget(budget.rate, budget.burst)
+                self._stats[endpoint] = EndpointStats()
+            return self._budgets[endpoint], self._stats[endpoint]
+
+    def _wait_for_budget(self, endpoint):
+        budget, stats = self._endpoint_state(endpoint)
+        wait = max([budget.reserve()] + [bucket.reserve() for bucket in self._global])
+        if self.metrics is not None:
+            self.metrics.observe("fyers_throttle_seconds", max(wait, 0.0), endpoint=endpoint)
+        if wait > 0:
+            stats.add(throttled_seconds=wait)
+            time.sleep(wait)
+
+    def _count_error(self, endpoint, stats):
+        stats.add(errors=1)
+        if self.metrics is not None:
+            self.metrics.inc("fyers_errors", endpoint=endpoint)
+
+    def _send(self, endpoint, args, kwargs):
+        _, stats = self._endpoint_state(endpoint)
+        policy = self._retry_policies.get(endpoint, DEFAULT_RETRY)
+        method = getattr(self.model, endpoint)
+        for attempt in range(policy.retries + 1):
+            self._wait_for_budget(endpoint)
+            started = time.perf_counter()
+            try:
+                response = method(*args, **kwargs)
+                error = None
+            except Exception as e:
+                response, error = None, e
+            elapsed = time.perf_counter() - started
+            stats.record_call(elapsed)
+            if self.metrics is not None:
+                self.metrics.observe("fyers_request_seconds", elapsed, endpoint=endpoint)
+
+            if error is None and not _is_retryable(response):
+                if isinstance(response, dict) and response.get("s") == "error":
+                    self._count_error(endpoint, stats)
+                return response
+            if attempt == policy.retries:
+                self._count_error(endpoint, stats)
+                if error is not None:
+                    raise error
+                return response
+            stats.add(retries=1)
+            if self.metrics is not None:
+                self.metrics.inc("fyers_retries", endpoint=endpoint)
+            delay = random.uniform(0, min(policy.backoff_cap, policy.backoff_base * 2 ** attempt))
+            logging.warning(f"⚠️ Fyers {endpoint} retry {attempt + 1}/{policy.retries} in {delay:.2f}s: "
+                            f"{error or response.get('message')}")
+            time.sleep(delay)
+
+    # ✅ Identical concurrent read calls share the first caller's request
+    def call(self, endpoint, *args, **kwargs):
+        _, stats = self._endpoint_state(endpoint)
+        stats.add(requests=1)
+        if endpoint not in COALESCED_ENDPOINTS:
+            return self._send(endpoint, args, kwargs)
+
+        key = (endpoint, json.dumps([args, kwargs], sort_keys=True, default=str))
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            stats.add(coalesced=1)
+            return future.result()
+
+        try:
+            future.set_result(self._send(endpoint, args, kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+    def __getattr__(self, endpoint):
+        if endpoint.startswith("_") or not callable(getattr(self.model, endpoint, None)):
+            return getattr(self.model, endpoint)
+        return lambda *args, **kwargs: self.call(endpoint, *args, **kwargs)
+
+    # ✅ Many symbols → as few quotes calls as possible (Fyers accepts 50 symbols per call)
+    def quotes_many(self, symbols):
+        """Returns the merged "d" list of quotes for all symbols (full "NSE:XYZ-EQ" names)."""
+        quotes = []
+        for i in range(0, len(symbols), QUOTES_PER_CALL):
+            response = self.call("quotes", {"symbols": ",".join(symbols[i:i + QUOTES_PER_CALL])})
+            if isinstance(response, dict):
+                quotes.extend(response.get("d", []))
+        return quotes
+
+    def stats(self):
+        with self._lock:
+            return {endpoint: stats.as_dict() for endpoint, stats in self._stats.items()}
+
+    def log_stats(self):
+        for endpoint, stats in self.stats().items():
+            logging.info(f"📈 Fyers {endpoint}: {stats}")
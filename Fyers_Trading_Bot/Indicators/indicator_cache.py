@@ -0,0 +1,137 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# ✅ Memoized indicator results keyed by (input data hash, indicator name, implementation version, parameters).
+# Tier 1 is an in-process LRU; tier 2 (optional) is one .npy/.npz file per result, shared between runs.
+INDICATOR_CACHE_DIR = os.getenv("INDICATOR_CACHE_DIR")  # Unset → memory only
+INDICATOR_CACHE_ENTRIES = int(os.getenv("INDICATOR_CACHE_ENTRIES", "512"))
+INDICATOR_VERSION = 1  # Bump whenever a kernel in indicators.py changes its output, so stored results are not reused
+
+
+def data_key(*arrays):
+    """Content hash of the input arrays (dtype, shape and bytes), so equal data hits regardless of its source."""
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def _param_key(params):
+    return ",".join(f"{name}={params[name]!r}" for name in sorted(params))
+
+
+def implementation_key(compute):
+    """INDICATOR_VERSION plus the compute function's module/qualname: a new version or function never hits old entries."""
+    name = getattr(compute, "__qualname__", type(compute).__qualname__)
+    identity = f"{INDICATOR_VERSION}:{getattr(compute, '__module__', '')}.{name}"
+    return f"v{INDICATOR_VERSION}-{hashlib.sha1(identity.encode()).hexdigest()[:12]}"
+
+
+def _read_only(result):
+    arrays = result if isinstance(result, tuple) else (result,)
+    for array in arrays:
+        array.setflags(write=False)  # Cached results are shared: callers must copy before modifying
+    return result
+
+
+class IndicatorCache:
+    """
+    LRU cache for indicator arrays with an optional disk tier. Safe to share between threads.
+
+    cache.get("wma", close, wma, window=10)           # wma(close, window=10), computed once
+    cache.get("macd", close, macd, key=k, fast=12)    # Pass a precomputed data_key() to skip hashing
+    """
+
+    def __init__(self, max_entries=INDICATOR_CACHE_ENTRIES, disk_dir=INDICATOR_CACHE_DIR):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def _path(self, name, implementation, key, params):
+        param_hash = hashlib.sha1(_param_key(params).encode()).hexdigest()[:16]
+        return os.path.join(self.disk_dir, name, implementation, f"{key}-{param_hash}")
+
+    def _load(self, path):
+        if os.path.exists(f"{path}.npy"):
+            return np.load(f"{path}.npy")
+        if os.path.exists(f"{path}.npz"):
+            with np.load(f"{path}.npz") as stored:
+                return tuple(stored[f"arr_{i}"] for i in range(len(stored.files)))
+        return None
+
+    def _store(self, path, result):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        if isinstance(result, tuple):
+            np.savez(tmp, *result)
+            os.replace(f"{tmp}.npz", f"{path}.npz")
+        else:
+            np.save(tmp, result)
+            os.replace(f"{tmp}.npy", f"{path}.npy")  # Readers never see a half-written file
+
+    def _remember(self, memo_key, result):
+        with self._lock:
+            self._entries[memo_key] = result
+            self._entries.move_to_end(memo_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, name, data, compute, key=None, **params):
+        """compute(data, **params) → array or tuple of arrays; cached results are returned read-only."""
+        key = key or data_key(data)
+        implementation = implementation_key(compute)
+        memo_key = (key, name, implementation, _param_key(params))
+        with self._lock:
+            if memo_key in self._entries:
+                self._entries.move_to_end(memo_key)
+                self.hits += 1
+                return self._entries[memo_key]
+
+        path = self._path(name, implementation, key, params) if self.disk_dir else None
+        result = self._load(path) if path else None
+        if result is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            result = compute(data, **params)
+            with self._lock:
+                self.misses += 1
+            if path:
+                try:
+                    self._store(path, result)
+                except OSError as e:
+                    print(f"⚠️ Indicator cache write failed ({path}): {e}")
+        result = _read_only(result)
+        self._remember(memo_key, result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Process-wide cache shared by the backtests and sweeps
+INDICATOR_CACHE = IndicatorCache()
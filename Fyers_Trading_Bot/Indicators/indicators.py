@@ -0,0 +1,286 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# ✅ Panel-wide indicators: every function takes a (tickers x dates) array — or a single 1-D series —
+# and computes all rows in one call. Missing bars are NaN: each row's valid values are packed to the
+# front before a kernel runs, so warm-up counts real bars and windows never span a gap or another ticker.
+RSI_METHODS = ("wilder", "ema", "sma")
+RSI_EPSILON = 1e-10  # Keeps RSI finite when a window has no losses
+
+PanelLayout = namedtuple("PanelLayout", ["tickers", "dates", "rows", "cols"])
+
+
+# ✅ MultiIndex (ticker, timestamp) frame ↔ (tickers x dates) arrays
+def panel_layout(index):
+    """Row/column position of every (ticker, timestamp) entry; dates are sorted, so time runs left to right."""
+    rows, tickers = pd.factorize(index.get_level_values(0), sort=True)
+    cols, dates = pd.factorize(index.get_level_values(1), sort=True)
+    return PanelLayout(tickers, dates, rows, cols)
+
+
+def to_panel(values, layout):
+    panel = np.full((len(layout.tickers), len(layout.dates)), np.nan)
+    panel[layout.rows, layout.cols] = np.asarray(values, dtype=np.float64)
+    return panel
+
+
+def from_panel(panel, layout):
+    """Values back in the original row order of the frame the layout was built from."""
+    return panel[layout.rows, layout.cols]
+
+
+def _as_2d(x):
+    x = np.asarray(x, dtype=np.float64)
+    return (x[np.newaxis, :], True) if x.ndim == 1 else (x, False)
+
+
+def _pack(*arrays):
+    """Moves each row's bars with no NaN input to the front (stable), returning the packed arrays and the mapping back."""
+    valid = np.logical_and.reduce([~np.isnan(a) for a in arrays])
+    if valid.all():
+        return list(arrays), None, valid
+    order = np.argsort(~valid, axis=1, kind="stable")
+    packed = [np.take_along_axis(np.where(valid, a, np.nan), order, axis=1) for a in arrays]
+    return packed, order, valid
+
+
+def _unpack(values, order, valid):
+    if order is None:
+        return values
+    out = np.empty_like(values)
+    np.put_along_axis(out, order, values, axis=1)
+    out[~valid] = np.nan
+    return out
+
+
+def _panel_call(kernel, *arrays, **kwargs):
+    """Runs kernel(*packed, **kwargs) → array or tuple of arrays, and maps the results back to the input layout."""
+    arrays, squeeze = zip(*(_as_2d(a) for a in arrays))
+    packed, order, valid = _pack(*arrays)
+    result = kernel(*packed, **kwargs)
+    results = result if isinstance(result, tuple) else (result,)
+    results = tuple(_unpack(r, order, valid) for r in results)
+    if squeeze[0]:
+        results = tuple(r[0] for r in results)
+    return results if isinstance(result, tuple) else results[0]
+
+
+# ✅ Kernels on packed rows (time along axis 1, NaN only as warm-up at the front or padding at the end)
+def _diff(x):
+    out = np.full_like(x, np.nan)
+    out[:, 1:] = x[:, 1:] - x[:, :-1]
+    return out
+
+
+def _rolling_mean(x, window, min_periods=None):
+    """pandas rolling(window, min_periods).mean(): NaN entries are skipped and not counted."""
+    min_periods = window if min_periods is None else min_periods
+    present = ~np.isnan(x)
+    sums = np.cumsum(np.where(present, x, 0.0), axis=1)
+    counts = np.cumsum(present, axis=1)
+    sums[:, window:] -= sums[:, :-window].copy()
+    counts[:, window:] -= counts[:, :-window].copy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts >= max(min_periods, 1), sums / counts, np.nan)
+
+
+def _ewm(x, alpha):
+    """pandas ewm(alpha=alpha, adjust=False).mean(): starts at each row's first value, column loop vectorized over rows."""
+    out = np.empty_like(x)
+    prev = x[:, 0].copy()
+    out[:, 0] = prev
+    for j in range(1, x.shape[1]):
+        current = x[:, j]
+        prev = np.where(np.isnan(prev), current, prev + alpha * (current - prev))
+        out[:, j] = prev
+    return out
+
+
+def _wilder(x, period, start=0):
+    """Wilder smoothing (RMA): SMA of the first `period` values from `start`, then alpha = 1/period."""
+    out = np.full_like(x, np.nan)
+    seed = start + period - 1
+    if x.shape[1] <= seed:
+        return out
+    prev = x[:, start:seed + 1].mean(axis=1)  # NaN for rows with fewer than `period` bars
+    out[:, seed] = prev
+    for j in range(seed + 1, x.shape[1]):
+        prev = prev + (x[:, j] - prev) / period
+        out[:, j] = prev
+    return out
+
+
+def _supertrend(hl2, band, close):
+    """
+    Final bands and trend, date loop vectorized over rows. The upper band can only fall (the lower band only
+    rise) until the previous close breaks through it; the trend flips when the close crosses the active band.
+    """
+    rows, dates = close.shape
+    line, direction = np.full(close.shape, np.nan), np.full(close.shape, np.nan)
+    upper, lower = np.full(close.shape, np.nan), np.full(close.shape, np.nan)
+    basic_upper, basic_lower = hl2 + band, hl2 - band
+    final_upper, final_lower = np.full(rows, np.nan), np.full(rows, np.nan)
+    trend, prev_close = np.zeros(rows), np.full(rows, np.nan)  # trend: +1 up, -1 down, 0 warm-up
+    for j in range(dates):
+        bu, bl, c = basic_upper[:, j], basic_lower[:, j], close[:, j]
+        final_upper = np.where(np.isnan(final_upper) | (bu < final_upper) | (prev_close > final_upper), bu, final_upper)
+        final_lower = np.where(np.isnan(final_lower) | (bl > final_lower) | (prev_close < final_lower), bl, final_lower)
+        trend = np.where(
+            np.isnan(final_upper) | np.isnan(final_lower), 0,
+            np.where(trend < 0, np.where(c > final_upper, 1, -1), np.where(c < final_lower, -1, 1)),
+        )
+        upper[:, j], lower[:, j] = final_upper, final_lower
+        line[:, j] = np.where(trend > 0, final_lower, np.where(trend < 0, final_upper, np.nan))
+        direction[:, j] = np.where(trend == 0, np.nan, trend)
+        prev_close = c
+    return line, direction, upper, lower
+
+
+def _weighted_mean(x, window):
+    """Linear weights 1..window with the newest bar weighted most (NaN until a full window)."""
+    weights = np.arange(1, window + 1, dtype=np.float64)
+    padded = np.concatenate([np.full((x.shape[0], window - 1), np.nan), x], axis=1)
+    return np.lib.stride_tricks.sliding_window_view(padded, window, axis=1) @ (weights / weights.sum())
+
+
+def _rsi(close, period, method):
+    delta = _diff(close)
+    gain, loss = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+    if method == "wilder":
+        avg_gain, avg_loss = _wilder(gain, period, start=1), _wilder(loss, period, start=1)
+    elif method == "ema":
+        avg_gain, avg_loss = _ewm(gain, 2 / (period + 1)), _ewm(loss, 2 / (period + 1))
+    else:
+        avg_gain, avg_loss = _rolling_mean(gain, period), _rolling_mean(loss, period)
+    rsi = 100 - 100 / (1 + avg_gain / (avg_loss + RSI_EPSILON))
+    rsi[:, :period] = np.nan  # Same warm-up for every method: the first RSI needs `period` price changes
+    return rsi
+
+
+def _true_range(high, low, close):
+    prev_close = np.full_like(close, np.nan)
+    prev_close[:, 1:] = close[:, :-1]
+    # fmax skips the NaN gaps to the previous close, so the first bar's true range is high - low
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def _atr(high, low, close, period, method):
+    tr = _true_range(high, low, close)
+    if method == "wilder":
+        return _wilder(tr, period)
+    if method == "ema":
+        return _ewm(tr, 2 / (period + 1))
+    return _rolling_mean(tr, period)
+
+
+# ✅ Public indicators (x: 1-D series or 2-D tickers x dates array; returns the same shape)
+def sma(x, window, min_periods=None):
+    return _panel_call(_rolling_mean, x, window=window, min_periods=min_periods)
+
+
+def ema(x, span):
+    """Exponential moving average, adjust=False (the pandas ewm(span=...) the strategies use)."""
+    return _panel_call(_ewm, x, alpha=2 / (span + 1))
+
+
+def wma(x, window):
+    return _panel_call(_weighted_mean, x, window=window)
+
+
+def rsi(close, period=14, method="wilder"):
+    """
+    Relative Strength Index.
+
+    Parameters:
+        close: 1-D series or (tickers x dates) array; NaN marks a missing bar.
+        period (int): Lookback; the first `period` bars of every ticker are NaN.
+        method (str): "wilder" (RMA), "ema" (ewm span=period, Strategy 3) or "sma" (rolling mean).
+    """
+    if method not in RSI_METHODS:
+        raise ValueError(f"Unknown RSI method {method!r}; use one of {RSI_METHODS}")
+    return _panel_call(_rsi, close, period=period, method=method)
+
+
+def rsi_sma(close, period=14, smoothing=2, method="wilder", min_periods=1):
+    """(RSI, SMA of the RSI over `smoothing` bars)."""
+    values = rsi(close, period, method)
+    return values, sma(values, smoothing, min_periods)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """(MACD line, signal line, histogram)."""
+    def _kernel(x):
+        line = _ewm(x, 2 / (fast + 1)) - _ewm(x, 2 / (slow + 1))
+        signal_line = _ewm(line, 2 / (signal + 1))
+        return line, signal_line, line - signal_line
+
+    return _panel_call(_kernel, close)
+
+
+def true_range(high, low, close):
+    return _panel_call(_true_range, high, low, close)
+
+
+def atr(high, low, close, period=14, method="wilder"):
+    """Average True Range (first bar's true range is high - low)."""
+    return _panel_call(_atr, high, low, close, period=period, method=method)
+
+
+def supertrend_bands(high, low, close, period=10, multiplier=3, method="wilder"):
+    """(upper, lower) basic Supertrend bands: hl2 ± multiplier * ATR."""
+    def _kernel(h, l, c):
+        hl2, band = (h + l) / 2, multiplier * _atr(h, l, c, period, method)
+        return hl2 + band, hl2 - band
+
+    return _panel_call(_kernel, high, low, close)
+
+
+def supertrend(high, low, close, period=10, multiplier=3, method="wilder"):
+    """
+    Supertrend with ratcheting bands.
+
+    Returns:
+        (line, direction, upper, lower): the Supertrend line (lower band in an uptrend, upper band in a
+        downtrend), direction +1/-1 (NaN during the ATR warm-up) and the final upper/lower bands.
+    """
+    def _kernel(h, l, c):
+        return _supertrend((h + l) / 2, multiplier * _atr(h, l, c, period, method), c)
+
+    return _panel_call(_kernel, high, low, close)
+
+
+def supertrend_sweep(high, low, close, periods, multipliers, method="wilder"):
+    """
+    Supertrend for every (period, multiplier) pair in one pass: the pairs are stacked as extra rows, so the
+    date loop runs once for the whole grid and each ATR period is computed once.
+
+    Returns:
+        (pairs, line, direction): pairs is [(period, multiplier), ...]; line and direction have shape
+        (len(pairs),) + close.shape.
+    """
+    pairs = [(period, multiplier) for period in periods for multiplier in multipliers]
+    arrays, squeeze = zip(*(_as_2d(a) for a in (high, low, close)))
+    (h, l, c), order, valid = _pack(*arrays)
+    atrs = {period: _atr(h, l, c, period, method) for period in periods}
+    hl2 = (h + l) / 2
+    line, direction, _, _ = _supertrend(
+        np.concatenate([hl2] * len(pairs)),
+        np.concatenate([multiplier * atrs[period] for period, multiplier in pairs]),
+        np.concatenate([c] * len(pairs)),
+    )
+    results = []
+    for stacked in (line, direction):
+        per_pair = [_unpack(block, order, valid) for block in np.split(stacked, len(pairs))]
+        results.append(np.stack([block[0] for block in per_pair] if squeeze[0] else per_pair))
+    return pairs, results[0], results[1]
+
+
+def lag(x, periods=1):
+    """Value `periods` bars earlier for the same ticker (skipping missing bars), like groupby(ticker).shift()."""
+    def _kernel(values):
+        out = np.full_like(values, np.nan)
+        out[:, periods:] = values[:, :-periods]
+        return out
+
+    return _panel_call(_kernel, x)
@@ -0,0 +1,150 @@
+import math
+from collections import deque
+from indicators import RSI_EPSILON, RSI_METHODS
+
+# ✅ Incremental indicator state for the live loops: seeded once from history, O(1) per new price.
+# update(x) commits a confirmed bar; peek(x) evaluates an unconfirmed live tick without changing the state.
+# Values match the batch functions in indicators.py bar for bar (NaN during warm-up).
+RESUM_EVERY = 1000  # Re-add the SMA window from scratch now and then so rounding errors cannot accumulate
+
+
+class StreamingSMA:
+    """Rolling mean of the last `window` values (NaN until `min_periods` values were seen)."""
+
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else max(min_periods, 1)
+        self._values = deque(maxlen=window)
+        self._sum = 0.0
+        self._updates = 0
+
+    def _next(self, x):
+        dropped = self._values[0] if len(self._values) == self.window else 0.0
+        count = min(len(self._values) + 1, self.window)
+        return self._sum + x - dropped, count
+
+    def peek(self, x):
+        total, count = self._next(x)
+        return total / count if count >= self.min_periods else math.nan
+
+    def update(self, x):
+        self._sum, count = self._next(x)
+        self._values.append(x)
+        self._updates += 1
+        if self._updates % RESUM_EVERY == 0:
+            self._sum = math.fsum(self._values)
+        return self._sum / count if count >= self.min_periods else math.nan
+
+    @property
+    def value(self):
+        count = len(self._values)
+        return self._sum / count if count and count >= self.min_periods else math.nan
+
+
+class StreamingEMA:
+    """ewm(alpha, adjust=False): starts at the first value. Pass span or alpha."""
+
+    def __init__(self, span=None, alpha=None):
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        self.value = math.nan
+
+    def peek(self, x):
+        return x if math.isnan(self.value) else self.value + self.alpha * (x - self.value)
+
+    def update(self, x):
+        self.value = self.peek(x)
+        return self.value
+
+
+class StreamingWilder:
+    """Wilder smoothing (RMA): mean of the first `period` values, then alpha = 1/period."""
+
+    def __init__(self, period):
+        self.period = period
+        self.value = math.nan
+        self._seed = []
+
+    def peek(self, x):
+        if not math.isnan(self.value):
+            return self.value + (x - self.value) / self.period
+        if len(self._seed) + 1 == self.period:
+            return (math.fsum(self._seed) + x) / self.period
+        return math.nan
+
+    def update(self, x):
+        value = self.peek(x)
+        if math.isnan(self.value) and math.isnan(value):
+            self._seed.append(x)
+        else:
+            self.value, self._seed = value, []
+        return value
+
+
+def _average(method, period):
+    if method == "wilder":
+        return StreamingWilder(period)
+    if method == "ema":
+        return StreamingEMA(span=period)
+    return StreamingSMA(period)
+
+
+class StreamingRSI:
+    """
+    RSI of a close series, optionally with an SMA of the RSI (smoothing > 0).
+
+    rsi = StreamingRSI.from_history(closes, 14, method="sma")
+    rsi.peek(live_price)       # RSI if the live price were the next close; state unchanged
+    rsi.update(bar_close)      # Commit a completed bar
+    """
+
+    def __init__(self, period=14, method="wilder", smoothing=0):
+        if method not in RSI_METHODS:
+            raise ValueError(f"Unknown RSI method {method!r}; use one of {RSI_METHODS}")
+        self.period = period
+        self.method = method
+        self._gain = _average(method, period)
+        self._loss = _average(method, period)
+        self._smooth = StreamingSMA(smoothing, min_periods=1) if smoothing else None
+        self._last_close = math.nan
+        self._deltas = 0
+        self.value = math.nan
+
+    @classmethod
+    def from_history(cls, closes, period=14, method="wilder", smoothing=0):
+        state = cls(period, method, smoothing)
+        for close in closes:
+            state.update(float(close))
+        return state
+
+    def _rsi(self, avg_gain, avg_loss, deltas):
+        if deltas < self.period or math.isnan(avg_gain) or math.isnan(avg_loss):
+            return math.nan
+        return 100 - 100 / (1 + avg_gain / (avg_loss + RSI_EPSILON))
+
+    def peek(self, close):
+        """(RSI, RSI SMA) for an unconfirmed close. RSI SMA is NaN without smoothing."""
+        if math.isnan(self._last_close):
+            return math.nan, math.nan
+        delta = close - self._last_close
+        value = self._rsi(self._gain.peek(max(delta, 0.0)), self._loss.peek(max(-delta, 0.0)), self._deltas + 1)
+        if self._smooth is None or math.isnan(value):
+            return value, math.nan
+        return value, self._smooth.peek(value)
+
+    def update(self, close):
+        """Commit a completed bar; returns (RSI, RSI SMA) like peek()."""
+        if math.isnan(self._last_close):
+            self._last_close = close
+            return math.nan, math.nan
+        delta = close - self._last_close
+        self._last_close = close
+        self._deltas += 1
+        self.value = self._rsi(self._gain.update(max(delta, 0.0)), self._loss.update(max(-delta, 0.0)), self._deltas)
+        smoothed = math.nan
+        if self._smooth is not None and not math.isnan(self.value):
+            smoothed = self._smooth.update(self.value)
+        return self.value, smoothed
+
+    @property
+    def smoothed(self):
+        return self._smooth.value if self._smooth is not None else math.nan
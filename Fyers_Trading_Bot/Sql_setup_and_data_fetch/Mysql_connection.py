@@ -1,12 +1,7 @@
-import mysql.connector
+from db_engine import raw_connection
 
-# Establish connection
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",  # Replace with your MySQL username
-    password="Apple@1234",  # Replace with your MySQL password
-    database="securities_master"  # Connect to your existing database
-)
+# Establish connection (credentials come from .env, see db_engine.py)
+conn = raw_connection("securities_master")
 
 # Create a cursor object
 cursor = conn.cursor()
@@ -1,47 +1,52 @@
 import datetime
 import time
+import asyncio
+import argparse
 import mysql.connector as mdb
-from fyers_apiv3 import fyersModel
 import os
+import sys
 from dotenv import load_dotenv
+from sqlalchemy.exc import SQLAlchemyError
+from db_engine import get_engine, raw_connection
+from bulk_ingest import DEFAULT_BATCH_SIZE, IngestStats, bulk_ingest
+from async_history_fetcher import iter_fetch
+from candle_decode import concat_candles, decode_candles, price_table
+from sync_planner import plan_sync, summarize_plan
+from ingest_metrics import METRICS
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_API_setup"))
+from fyers_client import FETCHER_RETRY_POLICIES, FyersClient, create_model
 load_dotenv()
 
 # ✅ Fyers API Credentials
 app_id = os.getenv("client_id")
 access_token = os.getenv("FYERS_ACCESS_TOKEN")
 
-# ✅ Initialize Fyers API
-fyers = fyersModel.FyersModel(client_id=app_id, token=access_token, is_async=False)
+# ✅ Initialize Fyers API (rate-budgeted wrappers around one model; only one of the two paths runs per invocation).
+# The concurrent path retries history windows in async_history_fetcher, so its client sends each call once;
+# the --serial path has no retry loop of its own and keeps the client's default history retries.
+fyers_model = create_model(app_id, access_token, is_async=False)
+fyers = FyersClient(fyers_model, retry_policies=FETCHER_RETRY_POLICIES, metrics=METRICS)
+serial_fyers = FyersClient(fyers_model, metrics=METRICS)
 
-# ✅ MySQL Database Connection
-db_config = {
-    "host": "localhost",
-    "user": "sec_user",
-    "password": os.getenv("db_password"),
-    "database": "Algo_trading"
-}
-con = mdb.connect(**db_config)
+# ✅ MySQL Database Connection (pooled; credentials come from .env, see db_engine.py)
+DB_NAME = "Algo_trading"
+ENGINE = get_engine(DB_NAME)
+con = raw_connection(DB_NAME)
 cur = con.cursor()
 
+# ✅ Bulk ingestion settings ("upsert" = multi-row INSERT ... ON DUPLICATE KEY UPDATE, "infile" = LOAD DATA LOCAL INFILE)
+INGEST_METHOD = os.getenv("INGEST_METHOD", "upsert")
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+
 # ✅ Fetch Tickers from Database
 def get_nifty50_tickers():
     """Fetch Nifty 50 tickers and symbol IDs from the database."""
     cur.execute("SELECT id, ticker, name FROM symbol")
     return cur.fetchall()
 
-# ✅ Get Last Available Date for a Symbol
-def get_last_available_date(symbol_id):
-    """Fetch the most recent date for which data is available in MySQL."""
-    cur.execute(
-        "SELECT MAX(price_date) FROM daily_price WHERE symbol_id = %s",
-        (symbol_id,)
-    )
-    result = cur.fetchone()
-    return result[0] if result and result[0] else None
-
 # ✅ Fetch Historical Data from Fyers API
 def fetch_historical_data(symbol, start_date, end_date):
-    """Fetches historical stock data from Fyers API in chunks."""
+    """Fetches historical stock data from Fyers API in chunks (decoded column-wise into CandleArrays)."""
     all_prices = []
     batch_size = 100  # Fetch 100 days per request
     
@@ -56,87 +61,93 @@ def fetch_historical_data(symbol, start_date, end_date):
             "cont_flag": "0"
         }
         
-        for attempt in range(3):  # Retry mechanism
-            response = fyers.history(data=payload)
-            if response and "candles" in response and response["candles"]:
-                break
-            print(f"⚠️ Retry {attempt+1}/3 for {symbol} ({start_date} to {batch_end})...")
-            time.sleep(2)
-        
+        response = serial_fyers.history(data=payload)  # ✅ Throttling and retries handled by FyersClient
+
         if response and "candles" in response and response["candles"]:
-            all_prices.extend([
-                (datetime.datetime.fromtimestamp(d[0]), d[1], d[2], d[3], d[4], d[5])
-                for d in response["candles"]
-            ])
+            METRICS.inc("rows_fetched", len(response["candles"]), resolution="D")
+            all_prices.append(decode_candles(response["candles"]))
         else:
             print(f"❌ No data found for {symbol} ({start_date} to {batch_end})")
         
         start_date = batch_end + datetime.timedelta(days=1)  # Ensure continuous data fetch
     
-    return all_prices
+    return concat_candles(all_prices)
 
 # ✅ Insert Data into MySQL
-def insert_into_db(data_vendor_id, symbol_id, stock_name, price_data):
-    """Inserts historical stock data into MySQL."""
+def insert_into_db(data_vendor_id, symbol_id, stock_name, price_data, table="daily_price"):
+    """Upserts historical stock data into MySQL (re-runs update existing candles instead of duplicating them)."""
     if not price_data:
         print(f"⚠️ No new data to insert for {stock_name}")
-        return
-
-    now = datetime.datetime.now(datetime.timezone.utc)
-    insert_values = [
-        (data_vendor_id, symbol_id, stock_name, d[0], now, now, d[1], d[2], d[3], d[4], d[5])
-        for d in price_data
-    ]
-    
-    # 🔥 Debug: Print first 5 rows before inserting
-    print(f"🛠️ Preparing to insert {len(price_data)} rows into daily_price:")
-    print(insert_values[:5])  
+        return None
 
-    query = """
-    INSERT INTO daily_price (
-        data_vendor_id, symbol_id, stock_name, price_date, created_date,
-        last_updated_date, open_price, high_price, low_price,
-        close_price, volume
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    
     try:
-        cur.executemany(query, insert_values)
-        con.commit()
-        print(f"✅ Successfully inserted {len(price_data)} records for {stock_name}")
-    except mdb.Error as e:
+        stats = bulk_ingest(ENGINE, price_table(data_vendor_id, symbol_id, stock_name, price_data),
+                            table=table, method=INGEST_METHOD, batch_size=INGEST_BATCH_SIZE, verbose=False)
+        print(f"✅ Upserted {stats.rows} records for {stock_name} ({stats.rows_per_sec:,.0f} rows/s)")
+        return stats
+    except (mdb.Error, SQLAlchemyError, OSError) as e:  # ✅ bulk_ingest goes through SQLAlchemy (and temp CSVs for infile)
         print(f"❌ MySQL Error for {stock_name}: {e}")
-        con.rollback()
+        return None  # ✅ One failed ticker must not stop the rest of the backfill
+
+# ✅ Concurrent backfill: every task of the plan in flight under the client's history budget
+async def backfill_async(plan):
+    """Inserts each ticker as soon as its windows are fetched; returns the IngestStats of every insert."""
+    tasks = {task.symbol_id: task for task in plan}
+    results = []
+    async for symbol_id, ticker, historical_data in iter_fetch(
+        fyers, [(task.symbol_id, task.ticker, task.start_date, task.end_date) for task in plan], raw=True
+    ):
+        stock_name = tasks[symbol_id].stock_name
+        if historical_data:
+            stats = await asyncio.to_thread(insert_into_db, 1, symbol_id, stock_name, historical_data)
+            results.append(stats)
+        else:
+            print(f"⚠️ No new data found for {stock_name} ({ticker})")
+    return results
+
 
 # ✅ Main Execution
 if __name__ == "__main__":
-    tickers = get_nifty50_tickers()
-    total_tickers = len(tickers)
+    parser = argparse.ArgumentParser(description="Backfill Nifty 50 daily candles from Fyers into daily_price.")
+    parser.add_argument("--serial", action="store_true", help="Fetch one ticker/window at a time (old behaviour)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Shard tickers across this many processes (each with its own DB connections)")
+    parser.add_argument("--metrics-out", default=os.getenv("INGEST_METRICS_FILE"),
+                        help="Write a run report here (.json, or .prom for the Prometheus text format)")
+    args = parser.parse_args()
+
     today = datetime.date.today()
     end_date = today - datetime.timedelta(days=1)  # ✅ Fetch data only until yesterday
-    
-    for i, (symbol_id, ticker, stock_name) in enumerate(tickers):
-        print(f"📊 Checking last available date for {stock_name} ({ticker})...")
-        
-        last_available_date = get_last_available_date(symbol_id)
-        
-        if last_available_date:
-            start_date = last_available_date.date() + datetime.timedelta(days=1)
-            print(f"📅 Last available date: {last_available_date} → Fetching from {start_date} to {end_date}")
-        else:
-            start_date = datetime.date(2024, 1, 1)
-            print(f"🆕 No data found in DB → Fetching from {start_date} to {end_date}")
-        
-        # Fetch data if there are missing dates
-        if start_date <= end_date:
-            historical_data = fetch_historical_data(ticker, start_date, end_date)
-            
+    plan = plan_sync(ENGINE, end_date)  # ✅ One grouped watermark query for all symbols
+    summarize_plan(plan)
+
+    started = time.perf_counter()
+    failed = {}
+    if args.workers > 1:
+        from parallel_ingest import run_parallel
+        rows, failed = run_parallel(plan, args.workers, DB_NAME, method=INGEST_METHOD, batch_size=INGEST_BATCH_SIZE)
+        all_stats = [IngestStats(rows, 0, time.perf_counter() - started, 0.0)]
+    elif args.serial:
+        all_stats = []
+        for task in plan:
+            historical_data = fetch_historical_data(task.ticker, task.start_date, task.end_date)
             if historical_data:
-                insert_into_db(1, symbol_id, stock_name, historical_data)
-                print(f"✅ Inserted {len(historical_data)} rows for {stock_name} ({ticker})")
+                all_stats.append(insert_into_db(1, task.symbol_id, task.stock_name, historical_data))
             else:
-                print(f"⚠️ No new data found for {stock_name} ({ticker})")
-        else:
-            print(f"✅ Data is already up-to-date for {stock_name} ({ticker})")
-    
-    print("🎉 Data fetching complete!")
\ No newline at end of file
+                print(f"⚠️ No new data found for {task.stock_name} ({task.ticker})")
+    else:
+        all_stats = asyncio.run(backfill_async(plan))
+
+    total_rows = sum(stats.rows for stats in all_stats if stats)
+    total_ingest_seconds = sum(stats.seconds for stats in all_stats if stats)
+    if total_ingest_seconds:
+        print(f"📥 Ingested {total_rows:,} rows in {total_ingest_seconds:.1f}s ({total_rows / total_ingest_seconds:,.0f} rows/s)")
+    print(f"⏱️ {len(plan)} tickers refreshed in {time.perf_counter() - started:.1f}s")
+    if failed:
+        print(f"⚠️ {len(failed)} tickers failed: {', '.join(sorted(failed))}")
+    print(f"📈 Fyers API usage: {(serial_fyers if args.serial else fyers).stats()}")
+    for line in METRICS.summary():
+        print(line)
+    if args.metrics_out:
+        METRICS.write(args.metrics_out)
+    print("🎉 Data fetching complete!")
@@ -3,16 +3,13 @@
 # retrieving_data.py
 
 import pandas as pd
-import mysql.connector as mdb
+from db_engine import raw_connection
 
-# ✅ Database Connection Details
-db_host = "localhost"
-db_user = "sec_user"
-db_pass = "Apple@1234"  # Change if needed
+# ✅ Database (credentials come from .env, see db_engine.py)
 db_name = "securities_master"
 
 # ✅ Connect to MySQL Database
-con = mdb.connect(host=db_host, user=db_user, password=db_pass, database=db_name)
+con = raw_connection(db_name)
 cur = con.cursor()
 
 # ✅ Define the Stock Symbol to Retrieve
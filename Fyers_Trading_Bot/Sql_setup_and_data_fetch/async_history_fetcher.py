@@ -0,0 +1,172 @@
+import os
+import time
+import random
+import asyncio
+import inspect
+import datetime
+from dotenv import load_dotenv
+from history_cache import IST
+from ingest_metrics import METRICS
+from candle_decode import EMPTY_CANDLES, concat_candles, decode_candles
+load_dotenv()
+
+# ✅ Fyers history limits: 10 req/s and 200 req/min per app. Default stays under the per-minute cap.
+HISTORY_RATE = float(os.getenv("FYERS_HISTORY_RATE", "3"))  # Requests per second (sustained)
+HISTORY_BURST = int(os.getenv("FYERS_HISTORY_BURST", "10"))  # Requests allowed back to back
+MAX_IN_FLIGHT = int(os.getenv("FYERS_HISTORY_CONCURRENCY", "8"))
+WINDOW_DAYS = 100  # Fyers caps daily-resolution history at ~100 days per request
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0  # Seconds
+BACKOFF_CAP = 30.0
+
+
+class HistoryFetchError(Exception):
+    """A window still failed after all retries (as opposed to a window with no trading days)."""
+
+
+# ✅ Fyers epochs → naive IST datetimes (independent of the machine's timezone)
+def candle_time(epoch):
+    return datetime.datetime.fromtimestamp(epoch, IST).replace(tzinfo=None)
+
+
+# ✅ Token bucket shared by every request of the event loop
+class TokenBucket:
+    """`rate` tokens per second, at most `capacity` stored; acquire() waits for a token."""
+
+    def __init__(self, rate=HISTORY_RATE, capacity=HISTORY_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# ✅ One throttle per call: a FyersClient already spends its history (and app-wide) budget on every call,
+# so the fetcher's own bucket is only for a bare FyersModel
+def history_bucket(client, rate=HISTORY_RATE, burst=HISTORY_BURST):
+    return None if getattr(client, "throttles", False) else TokenBucket(rate, burst)
+
+
+# ✅ Exponential backoff with full jitter (spreads retries of concurrent requests apart)
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def history_windows(start_date, end_date, days=WINDOW_DAYS):
+    """Consecutive (start, end) date windows covering start_date..end_date inclusive."""
+    while start_date <= end_date:
+        window_end = min(start_date + datetime.timedelta(days=days - 1), end_date)
+        yield start_date, window_end
+        start_date = window_end + datetime.timedelta(days=1)
+
+
+def history_payload(symbol, start_date, end_date, resolution="D"):
+    return {
+        "symbol": f"NSE:{symbol}-EQ",
+        "resolution": resolution,
+        "date_format": "1",
+        "range_from": start_date.strftime('%Y-%m-%d'),
+        "range_to": end_date.strftime('%Y-%m-%d'),
+        "cont_flag": "0"
+    }
+
+
+# ✅ Works with an async FyersModel (is_async=True) or a blocking client run in a worker thread
+async def _call_history(client, payload):
+    response = client.history(data=payload) if getattr(client, "is_async", False) else \
+        await asyncio.to_thread(client.history, data=payload)
+    if inspect.isawaitable(response):
+        response = await response
+    return response
+
+
+async def fetch_window(client, bucket, semaphore, symbol, start_date, end_date, resolution="D", retries=MAX_RETRIES,
+                       raise_on_failure=False, raw=False):
+    """
+    Fetches one window and returns [(datetime, o, h, l, c, v), ...], or CandleArrays with raw=True.
+    "no_data" (holidays, pre-listing dates) is an empty result, not an error; anything else is retried.
+    After the last retry the window is reported and returned empty, or HistoryFetchError is raised.
+    This loop is the only retry layer: build FyersClients that feed it with retry_policies=FETCHER_RETRY_POLICIES.
+    bucket=None leaves the throttling to the client (see history_bucket()).
+    """
+    payload = history_payload(symbol, start_date, end_date, resolution)
+    for attempt in range(retries):
+        if bucket is not None:
+            with METRICS.timer("rate_limit_wait_seconds", endpoint="history"):
+                await bucket.acquire()
+        async with semaphore:
+            with METRICS.timer("history_call_seconds", resolution=resolution):
+                try:
+                    response = await _call_history(client, payload)
+                except Exception as e:
+                    response = {"s": "error", "message": str(e)}
+        if response and response.get("s") == "ok":
+            candles = response.get("candles", [])
+            METRICS.inc("rows_fetched", len(candles), resolution=resolution)
+            if raw:
+                return decode_candles(candles)
+            return [(candle_time(d[0]), d[1], d[2], d[3], d[4], d[5]) for d in candles]
+        if response and response.get("s") == "no_data":
+            METRICS.inc("windows_without_data", resolution=resolution)
+            return EMPTY_CANDLES if raw else []
+        METRICS.inc("history_retries", resolution=resolution)
+        delay = backoff_delay(attempt)
+        print(f"⚠️ Retry {attempt + 1}/{retries} for {symbol} ({start_date} to {end_date}) in {delay:.1f}s: "
+              f"{(response or {}).get('message', response)}")
+        await asyncio.sleep(delay)
+    METRICS.inc("history_failures", resolution=resolution)
+    if raise_on_failure:
+        raise HistoryFetchError(f"{symbol} ({start_date} to {end_date}): {(response or {}).get('message', response)}")
+    print(f"❌ No data found for {symbol} ({start_date} to {end_date})")
+    return EMPTY_CANDLES if raw else []
+
+
+async def fetch_symbol(client, bucket, semaphore, symbol, start_date, end_date, resolution="D",
+                       raise_on_failure=False, raw=False):
+    """All windows of one symbol concurrently; returns the tuples (or one CandleArrays) in date order."""
+    windows = await asyncio.gather(*[
+        fetch_window(client, bucket, semaphore, symbol, ws, we, resolution, raise_on_failure=raise_on_failure, raw=raw)
+        for ws, we in history_windows(start_date, end_date)
+    ])
+    if raw:
+        return concat_candles(windows)
+    return [row for window in windows for row in window]
+
+
+# ✅ Fetch many symbols under one shared rate limit (the client's, or one bucket for a bare FyersModel), yielding each as soon as it completes
+async def iter_fetch(client, jobs, rate=HISTORY_RATE, burst=HISTORY_BURST, concurrency=MAX_IN_FLIGHT, resolution="D",
+                     raw=False):
+    """
+    jobs: iterable of (key, symbol, start_date, end_date); key is passed back untouched (e.g. symbol_id).
+    Yields (key, symbol, rows) in completion order; rows is a CandleArrays with raw=True.
+    """
+    bucket = history_bucket(client, rate, burst)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _job(key, symbol, start_date, end_date):
+        return key, symbol, await fetch_symbol(client, bucket, semaphore, symbol, start_date, end_date, resolution,
+                                               raw=raw)
+
+    tasks = [asyncio.create_task(_job(*job)) for job in jobs]
+    try:
+        for done in asyncio.as_completed(tasks):
+            yield await done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def fetch_all(client, jobs, **kwargs):
+    """Same as iter_fetch() but returns {key: rows}."""
+    return {key: rows async for key, _, rows in iter_fetch(client, jobs, **kwargs)}
@@ -0,0 +1,226 @@
+import datetime
+import argparse
+import threading
+import pandas as pd
+from sqlalchemy import text, bindparam
+from db_engine import get_engine
+from bulk_ingest import bulk_ingest, frame_rows
+from candle_decode import price_table
+from history_cache import IST, session_date
+from minute_stream import CREATE_PRICE_TABLE, MINUTE_TABLE, init_minute_price_table, stream_candles
+from trading_calendar import SESSION_OPEN, trading_days
+
+# ✅ Materialized bar tables (same columns as minute_price); each level is built from the one below it
+BAR_TABLES = {"1": MINUTE_TABLE, "5": "price_5min", "15": "price_15min", "60": "price_60min", "D": "price_1day"}
+RESOLUTION_CHAIN = [("1", "5"), ("5", "15"), ("15", "60"), ("60", "D")]
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+# Buckets are anchored at the session open, so 60-minute bars are 09:15-10:15, ..., 15:15-15:30
+SESSION_OFFSET = pd.Timedelta(hours=SESSION_OPEN.hour, minutes=SESSION_OPEN.minute)
+REBUILD_CHUNK_DAYS = 30
+
+
+def bar_table(resolution):
+    if resolution not in BAR_TABLES:
+        raise ValueError(f"Unsupported resolution {resolution!r}; use one of {list(BAR_TABLES)}")
+    return BAR_TABLES[resolution]
+
+
+def init_bar_tables(engine):
+    init_minute_price_table(engine)
+    with engine.begin() as conn:
+        for resolution, table in BAR_TABLES.items():
+            if table != MINUTE_TABLE:
+                conn.execute(text(CREATE_PRICE_TABLE.format(table=table)))
+
+
+# ✅ Start of the bucket each timestamp falls in
+def bucket_start(timestamps, resolution):
+    ts = pd.DatetimeIndex(timestamps)
+    day = ts.normalize()
+    if resolution == "D":
+        return day
+    step = pd.Timedelta(minutes=int(resolution))
+    return day + SESSION_OFFSET + ((ts - day - SESSION_OFFSET) // step) * step
+
+
+def bucket_length(resolution):
+    return pd.Timedelta(days=1) if resolution == "D" else pd.Timedelta(minutes=int(resolution))
+
+
+# ✅ OHLCV aggregation of finer bars (symbol_id, stock_name, timestamp, open, high, low, close, volume)
+def resample_bars(bars, resolution):
+    bars = bars.sort_values(["symbol_id", "timestamp"], kind="stable")
+    return (
+        bars.assign(bucket=bucket_start(bars["timestamp"], resolution))
+        .groupby(["symbol_id", "bucket"], sort=True)
+        .agg(stock_name=("stock_name", "first"), open=("open", "first"), high=("high", "max"),
+             low=("low", "min"), close=("close", "last"), volume=("volume", "sum"))
+        .reset_index()
+        .rename(columns={"bucket": "timestamp"})
+    )
+
+
+def _read_bars(engine, table, symbol_ids, start, end):
+    """Bars of `symbol_ids` with start <= price_date < end (range scan on the (symbol_id, price_date) key)."""
+    query = text(f"""
+        SELECT symbol_id, stock_name, price_date AS timestamp, open_price AS open, high_price AS high,
+               low_price AS low, close_price AS close, volume
+        FROM {table}
+        WHERE symbol_id IN :symbol_ids AND price_date >= :start AND price_date < :end
+        ORDER BY symbol_id, price_date
+    """).bindparams(bindparam("symbol_ids", expanding=True))
+    with engine.connect() as conn:
+        bars = pd.read_sql(query, conn, params={"symbol_ids": [int(s) for s in symbol_ids],
+                                                "start": start.to_pydatetime(), "end": end.to_pydatetime()})
+    bars["timestamp"] = pd.to_datetime(bars["timestamp"])
+    bars[OHLCV_COLUMNS] = bars[OHLCV_COLUMNS].astype(float).fillna({"volume": 0})
+    return bars
+
+
+# ✅ Incremental refresh: rebuild only the buckets touched by minutes in [first_minute, last_minute]
+def refresh_aggregates(engine, symbol_ids, first_minute, last_minute):
+    """
+    Recomputes the 5/15/60-minute and daily buckets that contain the given minutes, level by level
+    (each level reads only the touched buckets of the level below, so a new minute costs ~20 row reads).
+    Returns {resolution: bars written}.
+    """
+    first, last = pd.Timestamp(first_minute), pd.Timestamp(last_minute)
+    written = {}
+    for source, target in RESOLUTION_CHAIN:
+        first, last = bucket_start([first], target)[0], bucket_start([last], target)[0]
+        bars = _read_bars(engine, bar_table(source), symbol_ids, first, last + bucket_length(target))
+        if bars.empty:
+            break
+        resampled = resample_bars(bars, target)
+        resampled["volume"] = resampled["volume"].astype("int64")
+        written[target] = bulk_ingest(engine, frame_rows(resampled), bar_table(target), verbose=False).rows
+    return written
+
+
+# ✅ Write minute candles and keep the coarser tables in step (used by the minute backfill and live feeds)
+def ingest_minutes(engine, symbol_id, stock_name, candles, data_vendor_id=1):
+    """candles: CandleArrays (see candle_decode). Returns the minute_price IngestStats."""
+    stats = bulk_ingest(engine, price_table(data_vendor_id, symbol_id, stock_name, candles), MINUTE_TABLE,
+                        verbose=False)
+    if len(candles):
+        stamps = candles.timestamps()
+        refresh_aggregates(engine, [symbol_id], stamps.min(), stamps.max())
+    return stats
+
+
+# ✅ Read any resolution (1-minute bars come from minute_price, the rest from the materialized tables)
+def load_bars(engine, tickers=None, resolution="15", start=None, end=None):
+    """Returns ticker, timestamp, open, high, low, close, volume ordered by (symbol, timestamp)."""
+    blocks = list(stream_candles(engine, bar_table(resolution), tickers, start, end))
+    if not blocks:
+        return pd.DataFrame(columns=["ticker", "timestamp"] + OHLCV_COLUMNS)
+    bars = pd.concat(blocks, ignore_index=True)
+    bars[OHLCV_COLUMNS] = bars[OHLCV_COLUMNS].astype(float)
+    return bars
+
+
+class LiveBars:
+    """
+    Bars of one resolution per ticker for the live loops.
+
+    History comes from the bar tables once per IST session; live prices are folded into the latest
+    bar in memory (a new bar is started when the price falls in the next bucket). Nothing is written
+    to MySQL. Safe to share between threads.
+
+    The bar tables must be kept current by minute_backfill (minute_price plus the aggregates). A ticker
+    whose last stored bar is older than the previous trading session is reported as stale: its
+    indicators would be computed across the missing days, so callers should not trade it (is_stale()).
+    """
+
+    def __init__(self, engine, tickers, resolution="15", lookback_days=10, clock=None):
+        self.engine = engine
+        self.tickers = list(tickers)
+        self.resolution = resolution
+        self.lookback_days = lookback_days
+        self.clock = clock or (lambda: datetime.datetime.now(IST))
+        self._frames = {}
+        self._stale = set()
+        self._session = None
+        self._lock = threading.RLock()
+
+    def _roll_session(self):
+        today = session_date(self.clock())
+        if self._session == today:
+            return
+        start = today - datetime.timedelta(days=self.lookback_days)
+        bars = load_bars(self.engine, self.tickers, self.resolution, start=start)
+        self._frames = {
+            ticker: group.set_index("timestamp")[OHLCV_COLUMNS]
+            for ticker, group in bars.groupby("ticker", sort=False)
+        }
+        self._session = today
+        print(f"✅ {len(bars)} {self.resolution}-bars loaded for {len(self._frames)}/{len(self.tickers)} tickers")
+
+        sessions = trading_days(today - datetime.timedelta(days=self.lookback_days), today - datetime.timedelta(days=1))
+        previous_session = sessions[-1].date() if len(sessions) else start
+        self._stale = {
+            ticker for ticker in self.tickers
+            if ticker not in self._frames or self._frames[ticker].index[-1].date() < previous_session
+        }
+        if self._stale:
+            print(f"⚠️ Stored {self.resolution}-bars end before the {previous_session} session for "
+                  f"{', '.join(sorted(self._stale))}: run minute_backfill to bring minute_price and the "
+                  f"aggregates up to date (these tickers are not traded until then)")
+
+    # ✅ Fold one live price into the current bucket
+    def update(self, ticker, price, timestamp=None, volume=0):
+        timestamp = pd.Timestamp(timestamp or self.clock().astimezone(IST).replace(tzinfo=None))
+        bucket = bucket_start([timestamp], self.resolution)[0]
+        with self._lock:
+            self._roll_session()
+            frame = self._frames.get(ticker)
+            if frame is None:
+                frame = pd.DataFrame(columns=OHLCV_COLUMNS, dtype=float)
+            if len(frame) and frame.index[-1] == bucket:
+                row = frame.iloc[-1]
+                frame.iloc[-1] = [row["open"], max(row["high"], price), min(row["low"], price), price,
+                                  row["volume"] + volume]
+            elif not len(frame) or frame.index[-1] < bucket:
+                frame.loc[bucket] = [price, price, price, price, volume]
+            self._frames[ticker] = frame
+
+    def is_stale(self, ticker):
+        """True when the stored bars stop before the previous trading session (or there are none)."""
+        with self._lock:
+            self._roll_session()
+            return ticker in self._stale
+
+    def frame(self, ticker):
+        """Copy of the bars for `ticker` indexed by bucket start (OHLCV), or None; update() never changes it."""
+        with self._lock:
+            self._roll_session()
+            frame = self._frames.get(ticker)
+            return None if frame is None else frame.copy()
+
+
+# ✅ Main Execution: (re)build the aggregate tables from minute_price
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build 5/15/60-minute and daily bars from minute_price.")
+    parser.add_argument("--database", default="Algo_trading")
+    parser.add_argument("--tickers", nargs="*", help="Defaults to every ticker in the symbol table")
+    parser.add_argument("--start", required=True, type=datetime.date.fromisoformat)
+    parser.add_argument("--end", type=datetime.date.fromisoformat, default=datetime.date.today())
+    args = parser.parse_args()
+
+    engine = get_engine(args.database)
+    init_bar_tables(engine)
+    with engine.connect() as conn:
+        symbols = pd.read_sql(text("SELECT id, ticker FROM symbol ORDER BY id"), conn)
+    if args.tickers:
+        symbols = symbols[symbols["ticker"].isin(args.tickers)]
+
+    for symbol_id, ticker in symbols.itertuples(index=False):
+        totals = {}
+        chunk_start = pd.Timestamp(args.start)
+        while chunk_start <= pd.Timestamp(args.end):
+            chunk_end = min(chunk_start + pd.Timedelta(days=REBUILD_CHUNK_DAYS), pd.Timestamp(args.end) + pd.Timedelta(days=1))
+            written = refresh_aggregates(engine, [symbol_id], chunk_start, chunk_end - pd.Timedelta(minutes=1))
+            for resolution, rows in written.items():
+                totals[resolution] = totals.get(resolution, 0) + rows
+            chunk_start = chunk_end
+        print(f"📊 {ticker}: " + (", ".join(f"{r}: {n:,}" for r, n in totals.items()) or "no minute bars"))
@@ -0,0 +1,177 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from db_engine import get_engine
+from schema_migrations import migrate_table, rollback_table
+
+# ✅ Synthetic daily_price: 500 symbols x 10 years of trading days (~1.26M rows) in a scratch schema
+BENCH_DB = "daily_price_bench"
+N_SYMBOLS = 500
+N_YEARS = 10
+INSERT_BATCH = 10_000
+REPEATS = 20
+
+CREATE_SYMBOL = """
+    CREATE TABLE symbol (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        ticker VARCHAR(32) NOT NULL,
+        name VARCHAR(255)
+    )
+"""
+
+# Same columns as the production table, with only the primary key (the "before" state)
+CREATE_DAILY_PRICE = """
+    CREATE TABLE daily_price (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        data_vendor_id INT,
+        symbol_id INT NOT NULL,
+        stock_name VARCHAR(255),
+        price_date DATETIME NOT NULL,
+        created_date DATETIME,
+        last_updated_date DATETIME,
+        open_price DECIMAL(19,4),
+        high_price DECIMAL(19,4),
+        low_price DECIMAL(19,4),
+        close_price DECIMAL(19,4),
+        volume BIGINT
+    )
+"""
+
+# ✅ The hot queries, as issued by the scripts (name -> (SQL, params(rng, symbols, dates)))
+HOT_QUERIES = {
+    "plan_sync watermarks": (
+        "SELECT symbol_id, MAX(price_date) FROM daily_price GROUP BY symbol_id",
+        lambda rng, symbols, dates: {},
+    ),
+    "fetch_historical_data": (
+        """SELECT price_date, close_price AS close FROM daily_price
+           WHERE stock_name = :stock_name ORDER BY price_date DESC LIMIT 14""",
+        lambda rng, symbols, dates: {"stock_name": rng.choice(symbols)},
+    ),
+    "load_data (per ticker)": (
+        """SELECT sym.ticker, dp.price_date, dp.open_price, dp.high_price, dp.low_price, dp.close_price, dp.volume
+           FROM daily_price AS dp INNER JOIN symbol AS sym ON dp.symbol_id = sym.id
+           WHERE sym.ticker = :ticker ORDER BY dp.price_date ASC""",
+        lambda rng, symbols, dates: {"ticker": rng.choice(symbols)},
+    ),
+    "incremental sync (last 5 days)": (
+        """SELECT dp.symbol_id, dp.price_date, dp.close_price
+           FROM daily_price AS dp WHERE dp.price_date > :since ORDER BY dp.symbol_id, dp.price_date""",
+        lambda rng, symbols, dates: {"since": dates[-5].to_pydatetime()},
+    ),
+}
+
+
+# ✅ Create the scratch schema and fill it with a random walk per symbol
+def build_synthetic_table(n_symbols=N_SYMBOLS, n_years=N_YEARS, seed=0):
+    with get_engine().begin() as conn:
+        conn.execute(text(f"DROP DATABASE IF EXISTS {BENCH_DB}"))
+        conn.execute(text(f"CREATE DATABASE {BENCH_DB}"))
+
+    engine = get_engine(BENCH_DB)
+    symbols = [f"SYM{i:04d}" for i in range(n_symbols)]
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_years * 252)
+    rng = np.random.default_rng(seed)
+
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_SYMBOL))
+        conn.execute(text(CREATE_DAILY_PRICE))
+        conn.execute(text("INSERT INTO symbol (ticker, name) VALUES (:ticker, :ticker)"),
+                     [{"ticker": s} for s in symbols])
+
+    # Rows arrive one trading day at a time for all symbols, like the daily ingestion
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(dates), n_symbols)), axis=0))
+    now = pd.Timestamp.now().to_pydatetime()
+    insert = text("""
+        INSERT INTO daily_price (data_vendor_id, symbol_id, stock_name, price_date, created_date, last_updated_date,
+                                 open_price, high_price, low_price, close_price, volume)
+        VALUES (1, :symbol_id, :stock_name, :price_date, :now, :now, :open, :high, :low, :close, :volume)
+    """)
+    started, batch = time.perf_counter(), []
+    for d, date in enumerate(dates.to_pydatetime()):
+        for s, symbol in enumerate(symbols):
+            c = float(close[d, s])
+            batch.append({"symbol_id": s + 1, "stock_name": symbol, "price_date": date, "now": now,
+                          "open": c, "high": c * 1.01, "low": c * 0.99, "close": c,
+                          "volume": int(rng.integers(10_000, 10_000_000))})
+        if len(batch) >= INSERT_BATCH or d == len(dates) - 1:
+            with engine.begin() as conn:
+                conn.execute(insert, batch)
+            batch = []
+    rows = len(dates) * n_symbols
+    print(f"✅ Built {BENCH_DB}.daily_price: {rows:,} rows in {time.perf_counter() - started:.0f}s")
+    return engine, np.array(symbols), dates
+
+
+# ✅ EXPLAIN summary of a query (access type, chosen key, estimated rows, Extra) per table
+def explain(conn, sql, params):
+    plan = conn.execute(text(f"EXPLAIN {sql}"), params).mappings().fetchall()
+    return "; ".join(
+        f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}"
+        + (f" ({row['Extra']})" if row["Extra"] else "")
+        for row in plan
+    )
+
+
+# ✅ Median / p95 latency over random parameters
+def time_query(conn, sql, make_params, rng, symbols, dates, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        params = make_params(rng, symbols, dates)
+        started = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return np.median(timings), np.percentile(timings, 95)
+
+
+def run_queries(engine, symbols, dates, label, repeats=REPEATS, seed=1):
+    rng = np.random.default_rng(seed)
+    results = []
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE TABLE daily_price, symbol")).fetchall()
+        for name, (sql, make_params) in HOT_QUERIES.items():
+            plan = explain(conn, sql, make_params(rng, symbols, dates))
+            median_ms, p95_ms = time_query(conn, sql, make_params, rng, symbols, dates, repeats)
+            results.append({"query": name, "state": label, "median_ms": median_ms, "p95_ms": p95_ms, "plan": plan})
+            print(f"⏱️ [{label}] {name}: median {median_ms:.2f} ms, p95 {p95_ms:.2f} ms | {plan}")
+    return results
+
+
+# ✅ Main Execution: before/after comparison
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN and time the hot daily_price queries before/after the index migration.")
+    parser.add_argument("--symbols", type=int, default=N_SYMBOLS)
+    parser.add_argument("--years", type=int, default=N_YEARS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--reuse", action="store_true", help=f"Reuse an existing {BENCH_DB} instead of rebuilding it")
+    parser.add_argument("--keep", action="store_true", help=f"Keep {BENCH_DB} after the run")
+    parser.add_argument("--output", help="Write the results to this CSV file")
+    args = parser.parse_args()
+
+    if args.reuse:
+        engine = get_engine(BENCH_DB)
+        with engine.connect() as conn:
+            symbols = np.array([row[0] for row in conn.execute(text("SELECT ticker FROM symbol ORDER BY id"))])
+            dates = pd.DatetimeIndex([row[0] for row in conn.execute(text("SELECT DISTINCT price_date FROM daily_price ORDER BY price_date"))])
+        rollback_table(engine, "daily_price")
+    else:
+        engine, symbols, dates = build_synthetic_table(args.symbols, args.years)
+
+    results = run_queries(engine, symbols, dates, "before", args.repeats)
+    started = time.perf_counter()
+    migrate_table(engine, "daily_price")
+    print(f"🔧 Migration took {time.perf_counter() - started:.1f}s")
+    results += run_queries(engine, symbols, dates, "after", args.repeats)
+
+    report = pd.DataFrame(results).pivot(index="query", columns="state", values=["median_ms", "p95_ms"])
+    report[("speedup", "median")] = report[("median_ms", "before")] / report[("median_ms", "after")]
+    print(report.round(2).to_string())
+    if args.output:
+        pd.DataFrame(results).to_csv(args.output, index=False)
+        print(f"📄 Results written to {args.output}")
+
+    if not args.keep:
+        with get_engine().begin() as conn:
+            conn.execute(text(f"DROP DATABASE IF EXISTS {BENCH_DB}"))
@@ -0,0 +1,260 @@
+import os
+import csv
+import time
+import datetime
+import argparse
+import tempfile
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from db_engine import get_engine
+from schema_migrations import existing_indexes, price_indexes, index_covered
+from ingest_metrics import METRICS
+from candle_decode import mysql_datetime_strings
+
+# ✅ Column order of every row handed to the bulk loaders (daily_price and minute_price share it)
+PRICE_COLUMNS = [
+    "data_vendor_id", "symbol_id", "stock_name", "price_date", "created_date",
+    "last_updated_date", "open_price", "high_price", "low_price", "close_price", "volume",
+]
+# created_date keeps the first insert time; everything else is refreshed on conflict
+UPDATE_COLUMNS = ["last_updated_date", "open_price", "high_price", "low_price", "close_price", "volume"]
+
+DEFAULT_BATCH_SIZE = 5_000  # Rows per multi-row INSERT (~1 MB statement; keep under max_allowed_packet)
+TUNE_BATCH_SIZES = (500, 1_000, 2_000, 5_000, 10_000, 20_000)
+
+IngestStats = namedtuple("IngestStats", ["rows", "batches", "seconds", "rows_per_sec"])
+
+# DBAPI connect() flag that enables LOAD DATA LOCAL INFILE for each driver
+_LOCAL_INFILE_ARGS = {"mysqlconnector": {"allow_local_infile": True}, "pymysql": {"local_infile": True}}
+_checked_tables = set()
+
+
+# ✅ Build rows in PRICE_COLUMNS order from fetched (datetime, o, h, l, c, v) tuples
+def price_rows(data_vendor_id, symbol_id, stock_name, price_data, now=None):
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return [
+        (data_vendor_id, symbol_id, stock_name, d[0], now, now, d[1], d[2], d[3], d[4], d[5])
+        for d in price_data
+    ]
+
+
+# ✅ Same, from a candle frame with symbol_id / stock_name / timestamp / open / high / low / close / volume columns
+def frame_rows(df, data_vendor_id=1, now=None):
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    timestamps = pd.to_datetime(df["timestamp"]).dt.to_pydatetime()
+    return list(zip(
+        [data_vendor_id] * len(df), df["symbol_id"].astype(int).tolist(), df["stock_name"].tolist(), timestamps,
+        [now] * len(df), [now] * len(df), df["open"].tolist(), df["high"].tolist(), df["low"].tolist(),
+        df["close"].tolist(), df["volume"].astype("int64").tolist(),
+    ))
+
+
+def upsert_sql(table, n_rows):
+    row = "(" + ", ".join(["%s"] * len(PRICE_COLUMNS)) + ")"
+    return (
+        f"INSERT INTO {table} ({', '.join(PRICE_COLUMNS)}) VALUES "
+        + ", ".join([row] * n_rows)
+        + " ON DUPLICATE KEY UPDATE "
+        + ", ".join(f"{col} = VALUES({col})" for col in UPDATE_COLUMNS)
+    )
+
+
+# ✅ Warn once per table when re-runs would duplicate rows instead of updating them
+def _check_unique_key(engine, table):
+    key = (str(engine.url), table)
+    if key in _checked_tables:
+        return
+    with engine.connect() as conn:
+        existing = existing_indexes(conn, table)
+    if not index_covered(price_indexes(table)[0], existing):
+        print(f"⚠️ {table} has no UNIQUE (symbol_id, price_date) key: re-runs will insert duplicates. "
+              f"Run schema_migrations.py --tables {table} first.")
+    _checked_tables.add(key)
+
+
+# ✅ Arrow table (see candle_decode.price_table) → one row-major object block, built column by column
+# (no Python loop per row); each batch's parameters are then a single tolist() of a slice
+def _table_block(table):
+    block = np.empty((table.num_rows, len(PRICE_COLUMNS)), dtype=object)
+    for i, column in enumerate(PRICE_COLUMNS):
+        values = table.column(column)
+        if pa.types.is_timestamp(values.type):
+            values = mysql_datetime_strings(values)
+        block[:, i] = values.to_numpy(zero_copy_only=False)
+    return block
+
+
+# ✅ Multi-row INSERT ... ON DUPLICATE KEY UPDATE, one commit per batch
+def _upsert_batches(con, rows, table, batch_size):
+    block = _table_block(rows) if isinstance(rows, pa.Table) else None
+    cur = con.cursor()
+    batches = 0
+    try:
+        for start in range(0, len(rows), batch_size):
+            if block is not None:
+                batch = block[start:start + batch_size]
+                params = batch.ravel().tolist()
+            else:
+                batch = rows[start:start + batch_size]
+                params = [value for row in batch for value in row]
+            with METRICS.timer("db_execute_seconds", table=table, method="upsert"):
+                cur.execute(upsert_sql(table, len(batch)), params)
+            with METRICS.timer("db_commit_seconds", table=table, method="upsert"):
+                con.commit()
+            batches += 1
+    except Exception:
+        con.rollback()
+        raise
+    finally:
+        cur.close()
+    return batches
+
+
+def _csv_value(value):
+    if value is None:
+        return r"\N"
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+# ✅ Arrow's C++ CSV writer: no Python objects per row
+def _arrow_csv(table):
+    table = pa.table({c: mysql_datetime_strings(table[c]) if pa.types.is_timestamp(table[c].type) else table[c]
+                      for c in PRICE_COLUMNS})
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    pa_csv.write_csv(table, path, pa_csv.WriteOptions(include_header=False))
+    return path
+
+
+# ✅ LOAD DATA LOCAL INFILE into a staging table, then one INSERT ... SELECT ... ON DUPLICATE KEY UPDATE
+def _load_infile(con, rows, table):
+    stage = f"_stage_{table}"
+    columns = ", ".join(PRICE_COLUMNS)
+    if isinstance(rows, pa.Table):
+        path, line_end = _arrow_csv(rows), "\\n"
+    else:
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", delete=False) as f:
+            csv.writer(f).writerows([_csv_value(v) for v in row] for row in rows)
+            path = f.name
+        line_end = "\\r\\n"
+    cur = con.cursor()
+    try:
+        cur.execute(f"DROP TEMPORARY TABLE IF EXISTS {stage}")
+        cur.execute(f"CREATE TEMPORARY TABLE {stage} LIKE {table}")
+        with METRICS.timer("db_execute_seconds", table=table, method="infile"):
+            cur.execute(
+                f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {stage} "
+                f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' LINES TERMINATED BY '{line_end}' ({columns})"
+            )
+            cur.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {stage} "
+                f"ON DUPLICATE KEY UPDATE " + ", ".join(f"{col} = VALUES({col})" for col in UPDATE_COLUMNS)
+            )
+        with METRICS.timer("db_commit_seconds", table=table, method="infile"):
+            con.commit()
+        cur.execute(f"DROP TEMPORARY TABLE IF EXISTS {stage}")
+    except Exception:
+        con.rollback()
+        raise
+    finally:
+        cur.close()
+        os.remove(path)
+    return 1
+
+
+# ✅ Bulk ingest rows into daily_price / minute_price
+def bulk_ingest(engine, rows, table="daily_price", method="upsert", batch_size=DEFAULT_BATCH_SIZE, verbose=True):
+    """
+    Writes rows (tuples in PRICE_COLUMNS order) so that re-running an ingest never duplicates candles.
+
+    Parameters:
+        engine: SQLAlchemy engine for the target schema.
+        rows (list[tuple] | pyarrow.Table): Tuples from price_rows() / frame_rows(), or a
+                                          candle_decode.price_table() (no per-row Python objects).
+        table (str): daily_price or minute_price.
+        method (str): "upsert" (multi-row INSERT ... ON DUPLICATE KEY UPDATE) or
+                      "infile" (LOAD DATA LOCAL INFILE from a temp CSV; needs local_infile=ON on the server).
+        batch_size (int): Rows per INSERT statement for "upsert" (see tune_batch_size()).
+
+    Returns:
+        IngestStats: rows, batches, seconds, rows_per_sec.
+    """
+    if len(rows) == 0:
+        return IngestStats(0, 0, 0.0, 0.0)
+    _check_unique_key(engine, table)
+
+    started = time.perf_counter()
+    if method == "infile":
+        url = engine.url
+        infile_engine = get_engine(url.database, engine.dialect.driver,
+                                   connect_args=_LOCAL_INFILE_ARGS.get(engine.dialect.driver, {}),
+                                   user=url.username, password=url.password, host=url.host, port=url.port)
+        con = infile_engine.raw_connection()
+        try:
+            batches = _load_infile(con, rows, table)
+        finally:
+            con.close()
+    elif method == "upsert":
+        con = engine.raw_connection()
+        try:
+            batches = _upsert_batches(con, rows, table, batch_size)
+        finally:
+            con.close()
+    else:
+        raise ValueError(f"Unknown ingest method: {method}")
+
+    seconds = time.perf_counter() - started
+    METRICS.inc("rows_inserted", len(rows), table=table)
+    METRICS.observe("ingest_call_seconds", seconds, table=table, method=method)
+    stats = IngestStats(len(rows), batches, seconds, len(rows) / seconds if seconds else float("inf"))
+    if verbose:
+        print(f"📥 {table}: {stats.rows:,} rows in {stats.batches} batch(es), "
+              f"{stats.seconds:.2f}s → {stats.rows_per_sec:,.0f} rows/s ({method})")
+    return stats
+
+
+# ✅ Time each candidate batch size on a temporary copy of the table and return the fastest
+def tune_batch_size(engine, rows, table="daily_price", candidates=TUNE_BATCH_SIZES):
+    """Rows are written to a TEMPORARY TABLE LIKE `table`, so the real table is untouched."""
+    scratch = f"_tune_{table}"
+    con = engine.raw_connection()
+    cur = con.cursor()
+    results = {}
+    try:
+        for batch_size in candidates:
+            cur.execute(f"DROP TEMPORARY TABLE IF EXISTS {scratch}")
+            cur.execute(f"CREATE TEMPORARY TABLE {scratch} LIKE {table}")
+            started = time.perf_counter()
+            _upsert_batches(con, rows, scratch, batch_size)
+            results[batch_size] = len(rows) / (time.perf_counter() - started)
+            print(f"🔬 batch_size={batch_size:>6}: {results[batch_size]:,.0f} rows/s")
+        cur.execute(f"DROP TEMPORARY TABLE IF EXISTS {scratch}")
+    finally:
+        cur.close()
+        con.close()
+    best = max(results, key=results.get)
+    print(f"🏁 Best batch size for {table}: {best} ({results[best]:,.0f} rows/s)")
+    return best
+
+
+# ✅ Main Execution: load a candle CSV (symbol_id, stock_name, timestamp, open, high, low, close, volume)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk upsert candles into daily_price / minute_price.")
+    parser.add_argument("csv_file")
+    parser.add_argument("--database", default="Algo_trading")
+    parser.add_argument("--table", default="daily_price", choices=["daily_price", "minute_price"])
+    parser.add_argument("--method", default="upsert", choices=["upsert", "infile"])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--tune", action="store_true", help="Pick the batch size on a sample of the file first")
+    parser.add_argument("--data-vendor-id", type=int, default=1)
+    args = parser.parse_args()
+
+    engine = get_engine(args.database)
+    rows = frame_rows(pd.read_csv(args.csv_file), args.data_vendor_id)
+    batch_size = tune_batch_size(engine, rows[:100_000], args.table) if args.tune else args.batch_size
+    bulk_ingest(engine, rows, args.table, args.method, batch_size)
@@ -0,0 +1,333 @@
+import os
+import json
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# ✅ Candle Store Location (hive layout: <database>/ticker=<TICKER>/year=<YYYY>/part-0.parquet)
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CANDLE_STORE_ROOT = os.getenv("CANDLE_STORE_DIR", os.path.join(REPO_ROOT, "market_data", "candles"))
+WATERMARK_FILE = "_watermarks.json"  # Leading underscore keeps it out of dataset discovery
+
+
+# ✅ One store per MySQL database, so mirrors of different schemas never mix
+def candle_store_dir(database):
+    return os.path.join(CANDLE_STORE_ROOT, database)
+
+
+CANDLE_STORE_DIR = candle_store_dir("Algo_trading")
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+PARTITIONING = ds.partitioning(
+    pa.schema([("ticker", pa.string()), ("year", pa.int32())]), flavor="hive"
+)
+CANDLE_SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("ns")),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.int64()),
+    ("ticker", pa.string()),
+    ("year", pa.int32()),
+])
+
+EXPORT_QUERY = """
+    SELECT dp.symbol_id, sym.ticker, dp.price_date AS timestamp, dp.open_price AS open, dp.high_price AS high,
+           dp.low_price AS low, dp.close_price AS close, dp.volume AS volume
+    FROM daily_price AS dp
+    INNER JOIN symbol AS sym ON dp.symbol_id = sym.id
+    WHERE sym.ticker = %s
+    ORDER BY dp.price_date ASC
+"""
+
+INCREMENTAL_QUERY = """
+    SELECT dp.symbol_id, sym.ticker, dp.price_date AS timestamp, dp.open_price AS open, dp.high_price AS high,
+           dp.low_price AS low, dp.close_price AS close, dp.volume AS volume
+    FROM daily_price AS dp
+    INNER JOIN symbol AS sym ON dp.symbol_id = sym.id
+    WHERE dp.price_date > %s AND dp.symbol_id IN ({symbol_ids})
+    ORDER BY sym.ticker, dp.price_date ASC
+"""
+NO_ROWS_WATERMARK = pd.Timestamp("1900-01-01")  # Lower bound for symbols recorded before daily_price had any rows
+
+
+# ✅ Convert a candle DataFrame to an Arrow table matching CANDLE_SCHEMA
+def _to_arrow(df):
+    df = df.copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df["year"] = df["timestamp"].dt.year.astype("int32")
+    df["volume"] = df["volume"].fillna(0).astype("int64")
+    return pa.Table.from_pandas(df[CANDLE_SCHEMA.names], schema=CANDLE_SCHEMA, preserve_index=False)
+
+
+# ✅ Write candles, replacing only the (ticker, year) partitions they touch
+def write_candles(df, store_dir=CANDLE_STORE_DIR):
+    """Write a flat candle frame (ticker, timestamp, open, high, low, close, volume) to the store."""
+    if df is None or df.empty:
+        return 0
+    ds.write_dataset(
+        _to_arrow(df),
+        store_dir,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="delete_matching",
+    )
+    return len(df)
+
+
+# ✅ Export daily_price from MySQL into the Parquet store, one ticker at a time
+def export_candles_from_db(engine, store_dir=CANDLE_STORE_DIR, tickers=None):
+    """Exports daily_price to the candle store. Each ticker is read and written separately to bound memory."""
+    symbols = pd.read_sql("SELECT id, ticker FROM symbol ORDER BY ticker", con=engine)
+    if tickers is None:
+        tickers = symbols["ticker"].tolist()
+    symbol_ids = dict(zip(symbols["ticker"], symbols["id"]))
+
+    watermarks = read_watermarks(store_dir)
+    total_rows = 0
+    for ticker in tickers:
+        df = pd.read_sql(EXPORT_QUERY, con=engine, params=(ticker,))
+        if df.empty:
+            print(f"⚠️ No rows in daily_price for {ticker}")
+            if ticker in symbol_ids:  # ✅ Remember it, so the next sync polls it incrementally instead of re-exporting
+                watermarks.setdefault(int(symbol_ids[ticker]), {"ticker": ticker, "price_date": None})
+                write_watermarks(watermarks, store_dir)
+            continue
+        total_rows += write_candles(df, store_dir)
+        _advance_watermarks(watermarks, df)
+        write_watermarks(watermarks, store_dir)  # ✅ Persist per ticker so an interrupted export resumes cleanly
+        print(f"✅ Exported {len(df)} rows for {ticker}")
+
+    print(f"🎉 Candle store export complete: {total_rows} rows → {store_dir}")
+    return total_rows
+
+
+# ✅ Per-symbol watermarks: {symbol_id: {"ticker": str, "price_date": ISO timestamp, or None if it had no rows yet}}
+def read_watermarks(store_dir=CANDLE_STORE_DIR):
+    path = os.path.join(store_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {int(symbol_id): mark for symbol_id, mark in json.load(f).items()}
+
+
+def write_watermarks(watermarks, store_dir=CANDLE_STORE_DIR):
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, WATERMARK_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump({str(symbol_id): mark for symbol_id, mark in sorted(watermarks.items())}, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def _advance_watermarks(watermarks, df):
+    last_dates = df.groupby(["symbol_id", "ticker"])["timestamp"].max()
+    for (symbol_id, ticker), last_date in last_dates.items():
+        watermarks[int(symbol_id)] = {"ticker": ticker, "price_date": pd.Timestamp(last_date).isoformat()}
+
+
+# ✅ Merge new rows into the (ticker, year) partitions they belong to
+def append_candles(df, store_dir=CANDLE_STORE_DIR):
+    """Appends rows to the store. Touched partitions are rewritten whole (one small file per ticker-year)."""
+    if df is None or df.empty:
+        return 0
+    df = df.copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    touched = df.groupby(["ticker", df["timestamp"].dt.year]).size().index
+
+    merged = [df]
+    for ticker, year in touched:
+        start = pd.Timestamp(year=int(year), month=1, day=1)
+        existing = load_candles(ticker, start_date=start, end_date=start + pd.offsets.YearEnd(0), store_dir=store_dir)
+        if not existing.empty:
+            merged.insert(0, existing.reset_index())
+    merged = pd.concat(merged, ignore_index=True)
+    merged = merged.drop_duplicates(subset=["ticker", "timestamp"], keep="last")
+    write_candles(merged, store_dir)
+    return len(df)
+
+
+# ✅ Incremental sync: pull only rows newer than each symbol's watermark
+def sync_candle_store(engine, store_dir=CANDLE_STORE_DIR):
+    """
+    Brings the local mirror of daily_price up to date.
+
+    Symbols seen before are grouped by watermark and each group is refreshed with one query for its own
+    symbols' newer rows, so one stale symbol never widens the scan for the others (in the usual case every
+    symbol shares yesterday's watermark and this is a single query). Symbols never synced get a full export.
+
+    Returns:
+        int: Number of new rows written to the store.
+    """
+    watermarks = read_watermarks(store_dir)
+    symbols = pd.read_sql("SELECT id, ticker FROM symbol", con=engine)
+    new_tickers = symbols.loc[~symbols["id"].isin(list(watermarks)), "ticker"].tolist()
+
+    synced_rows = 0
+    if watermarks:
+        groups = {}
+        for symbol_id, mark in watermarks.items():
+            groups.setdefault(mark["price_date"], []).append(symbol_id)
+        frames = []
+        for since, symbol_ids in groups.items():
+            lower = pd.Timestamp(since) if since else NO_ROWS_WATERMARK
+            query = INCREMENTAL_QUERY.format(symbol_ids=", ".join(["%s"] * len(symbol_ids)))
+            frames.append(pd.read_sql(query, con=engine, params=(lower.to_pydatetime(), *symbol_ids)))
+        df = pd.concat(frames, ignore_index=True)
+        if not df.empty:
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+            synced_rows += append_candles(df, store_dir)
+            _advance_watermarks(watermarks, df)
+            write_watermarks(watermarks, store_dir)
+        print(f"✅ Incremental sync: {synced_rows} new rows ({len(groups)} watermark groups)")
+
+    if new_tickers:
+        print(f"🆕 {len(new_tickers)} symbols not in the local mirror yet → full export")
+        synced_rows += export_candles_from_db(engine, store_dir, new_tickers)
+
+    return synced_rows
+
+
+# ✅ Load candles from the store with ticker, column and date-range pruning
+def load_candles(tickers=None, columns=None, start_date=None, end_date=None, store_dir=CANDLE_STORE_DIR, compact=False):
+    """
+    Loads candles from the Parquet store.
+
+    Parameters:
+        tickers (list | str): Tickers to load (partition pruning). None loads all tickers.
+        columns (list): Subset of open/high/low/close/volume to read. None reads all.
+        start_date, end_date: Inclusive date bounds (year partitions outside the range are skipped).
+        store_dir (str): Root of the candle store.
+        compact (bool): Return the compact layout (see to_compact() for the precision contract).
+
+    Returns:
+        pd.DataFrame: MultiIndex (ticker, timestamp) frame, same layout as load_data_from_db().
+    """
+    columns = list(columns) if columns is not None else PRICE_COLUMNS
+    if not os.path.isdir(store_dir):
+        return pd.DataFrame(columns=columns, index=pd.MultiIndex.from_arrays([[], []], names=["ticker", "timestamp"]))
+
+    dataset = ds.dataset(store_dir, format="parquet", partitioning=PARTITIONING)
+    filters = []
+    if tickers is not None:
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        filters.append(ds.field("ticker").isin(tickers))
+    if start_date is not None:
+        start = pd.Timestamp(start_date)
+        filters.append(ds.field("year") >= start.year)
+        filters.append(ds.field("timestamp") >= pa.scalar(start.as_unit("ns").value, type=pa.timestamp("ns")))
+    if end_date is not None:
+        end = pd.Timestamp(end_date)
+        if end == end.normalize():
+            end = end + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")  # ✅ Date-only bound is inclusive of the whole day
+        filters.append(ds.field("year") <= end.year)
+        filters.append(ds.field("timestamp") <= pa.scalar(end.as_unit("ns").value, type=pa.timestamp("ns")))
+
+    expression = None
+    for f in filters:
+        expression = f if expression is None else expression & f
+
+    table = dataset.to_table(columns=["ticker", "timestamp"] + columns, filter=expression)
+    df = table.to_pandas()
+    df = df.sort_values(["ticker", "timestamp"], kind="stable").set_index(["ticker", "timestamp"])
+    return to_compact(df) if compact else df
+
+
+# ✅ Compact candle layout (opt-in, roughly half the memory of the default frame)
+#
+# Precision contract:
+#   open/high/low/close → float32. Relative error ≤ 2^-24 (about 7 significant digits). Below ₹65,536 the
+#       absolute error is under 0.004, so round(price, 2) recovers the stored two-decimal price exactly.
+#       Above that (e.g. MRF), expect up to ±0.008 and compare prices with a half-tick tolerance.
+#   volume → uint32 (0 to 4,294,967,295 per bar). Frames with a larger or negative volume keep int64.
+#   ticker → categorical index level.
+#   timestamp → int64 seconds since the Unix epoch, taken from the naive (IST wall clock) value as stored.
+#       Convert back with pd.to_datetime(values, unit="s").
+COMPACT_PRICE_DTYPE = np.float32
+
+
+def to_compact(df):
+    """Converts a MultiIndex (ticker, timestamp) candle frame to the compact layout."""
+    compact = pd.DataFrame(index=pd.MultiIndex.from_arrays(
+        [
+            pd.Categorical(df.index.get_level_values(0)),
+            pd.to_datetime(df.index.get_level_values(1)).as_unit("s").asi8,
+        ],
+        names=df.index.names,
+    ))
+    for column in df.columns:
+        values = df[column]
+        if column == "volume":
+            volume = values.fillna(0).to_numpy(dtype=np.int64)
+            in_range = len(volume) == 0 or (volume.min() >= 0 and volume.max() <= np.iinfo(np.uint32).max)
+            compact[column] = volume.astype(np.uint32) if in_range else volume
+        elif column in PRICE_COLUMNS:
+            compact[column] = values.to_numpy(dtype=COMPACT_PRICE_DTYPE)
+        else:
+            compact[column] = values.to_numpy()
+    return compact
+
+
+# ✅ Memory report: default vs compact layout for the same frame
+def memory_report(df):
+    """
+    Returns a DataFrame with bytes per column (and index) in both layouts, plus the largest
+    absolute price change introduced by float32.
+    """
+    compact = to_compact(df)
+    default_bytes = df.memory_usage(deep=True)
+    compact_bytes = compact.memory_usage(deep=True)
+    report = pd.DataFrame({"default_bytes": default_bytes, "compact_bytes": compact_bytes})
+    report.loc["Total"] = report.sum()
+    report["ratio"] = (report["compact_bytes"] / report["default_bytes"]).round(3)
+
+    price_columns = [c for c in PRICE_COLUMNS[:4] if c in df.columns]
+    max_error = max(
+        (np.nanmax(np.abs(compact[c].to_numpy(np.float64) - df[c].to_numpy(np.float64)), initial=0.0) for c in price_columns),
+        default=0.0,
+    )
+    report.attrs["max_price_error"] = max_error
+    return report
+
+
+# ✅ Tickers present in the store (from partition directories only, no data read)
+def stored_tickers(store_dir=CANDLE_STORE_DIR):
+    if not os.path.isdir(store_dir):
+        return []
+    dataset = ds.dataset(store_dir, format="parquet", partitioning=PARTITIONING)
+    tickers = {ds.get_partition_keys(fragment.partition_expression)["ticker"] for fragment in dataset.get_fragments()}
+    return sorted(tickers)
+
+
+# ✅ Main Execution: export MySQL → Parquet
+if __name__ == "__main__":
+    from db_engine import get_engine
+
+    parser = argparse.ArgumentParser(description="Export daily_price into the Parquet candle store.")
+    parser.add_argument("--database", default="Algo_trading", help="MySQL schema to export from")
+    parser.add_argument("--store-dir", default=None, help="Defaults to the store for --database")
+    parser.add_argument("--tickers", nargs="*", help="Export only these tickers")
+    parser.add_argument("--full", action="store_true", help="Full re-export instead of an incremental sync")
+    parser.add_argument("--memory-report", action="store_true", help="Compare default vs compact layout of the stored history")
+    args = parser.parse_args()
+    args.store_dir = args.store_dir or candle_store_dir(args.database)
+
+    if args.memory_report:
+        report = memory_report(load_candles(store_dir=args.store_dir))
+        print(report.to_string())
+        print(f"📉 Compact layout: {report.loc['Total', 'compact_bytes'] / 1e6:.1f} MB vs "
+              f"{report.loc['Total', 'default_bytes'] / 1e6:.1f} MB, max price error {report.attrs['max_price_error']:.6f}")
+        raise SystemExit(0)
+
+    engine = get_engine(args.database)
+
+    started = datetime.datetime.now()
+    if args.full or args.tickers:
+        export_candles_from_db(engine, args.store_dir, args.tickers)
+    else:
+        sync_candle_store(engine, args.store_dir)
+    print(f"⏱️ Export took {datetime.datetime.now() - started}")
@@ -0,0 +1,72 @@
+import os
+import threading
+from urllib.parse import quote_plus
+from sqlalchemy import create_engine
+from dotenv import load_dotenv
+load_dotenv()
+
+# ✅ MySQL Connection Settings (override via environment / .env)
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = int(os.getenv("DB_PORT", "3306"))
+DB_USER = os.getenv("DB_USER", "sec_user")
+DB_PASSWORD = os.getenv("db_password", "")
+DB_NAME = os.getenv("DB_NAME", "Algo_trading")
+DB_DRIVER = os.getenv("DB_DRIVER", "mysqlconnector")
+
+# ✅ Pool Settings
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # Connections kept open per engine
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Extra connections allowed under burst load
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds; well below MySQL's wait_timeout
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+
+_engines = {}
+_lock = threading.Lock()
+
+
+def database_url(database=None, driver=None, user=None, password=None, host=None, port=None):
+    password = quote_plus(DB_PASSWORD if password is None else password)
+    return (
+        f"mysql+{driver or DB_DRIVER}://{user or DB_USER}:{password}"
+        f"@{host or DB_HOST}:{port or DB_PORT}/{database or DB_NAME}"
+    )
+
+
+# ✅ One pooled engine per (database, driver, credentials) for the whole process
+def get_engine(database=None, driver=None, connect_args=None, **overrides):
+    """
+    Returns a shared SQLAlchemy engine with connection pooling.
+
+    Parameters:
+        database (str): Schema name (defaults to DB_NAME).
+        driver (str): DBAPI driver, e.g. "mysqlconnector" (default) or "pymysql".
+        connect_args (dict): Extra DBAPI connect() arguments (e.g. allow_local_infile); gets its own pool.
+        overrides: user / password / host / port, when a script must differ from the environment.
+    """
+    url = database_url(database, driver, **overrides)
+    key = (url, tuple(sorted((connect_args or {}).items())))
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = create_engine(
+                url,
+                connect_args=connect_args or {},
+                pool_pre_ping=True,  # Transparently replace connections MySQL has closed
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+                pool_recycle=POOL_RECYCLE,
+                pool_timeout=POOL_TIMEOUT,
+            )
+            _engines[key] = engine
+        return engine
+
+
+# ✅ Pooled DBAPI connection for cursor-style code (close() hands it back to the pool)
+def raw_connection(database=None, driver=None, connect_args=None, **overrides):
+    return get_engine(database, driver, connect_args, **overrides).raw_connection()
+
+
+# ✅ Drop all pooled connections (call in child processes after fork)
+def dispose_engines(close=False):
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose(close=close)
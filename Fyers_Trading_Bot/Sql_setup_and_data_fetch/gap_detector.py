@@ -0,0 +1,196 @@
+import os
+import sys
+import time
+import asyncio
+import datetime
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from db_engine import get_engine
+from bulk_ingest import bulk_ingest
+from candle_decode import price_table
+from minute_stream import streaming_engine
+from sync_planner import FetchTask
+from trading_calendar import SESSION_MINUTES, SESSION_OPEN, session_slots, trading_days
+from async_history_fetcher import iter_fetch
+
+DEFAULT_MERGE_DAYS = 5  # Gaps closer than this (calendar days) are re-fetched with one request
+LOAD_CHUNK_ROWS = 1_000_000
+
+
+# ✅ Only (symbol_id, timestamp) is needed: stream it into two compact numpy arrays
+def load_bar_index(engine, table="daily_price", start=None, end=None, chunk_rows=LOAD_CHUNK_ROWS):
+    """Returns (symbol_ids int32, timestamps datetime64[ns]) for every bar in [start, end)."""
+    where, params = [], {}
+    if start is not None:
+        where.append("price_date >= :start")
+        params["start"] = pd.Timestamp(start).to_pydatetime()
+    if end is not None:
+        where.append("price_date < :end")
+        params["end"] = pd.Timestamp(end).to_pydatetime()
+    query = text(f"""
+        SELECT symbol_id, price_date FROM {table}
+        {"WHERE " + " AND ".join(where) if where else ""}
+    """)
+    ids, stamps = [], []
+    with streaming_engine(engine).connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows)
+        for block in pd.read_sql(query, conn, params=params, chunksize=chunk_rows):
+            ids.append(block["symbol_id"].to_numpy(dtype=np.int32))
+            stamps.append(pd.to_datetime(block["price_date"]).to_numpy(dtype="datetime64[ns]"))
+    if not ids:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype="datetime64[ns]")
+    return np.concatenate(ids), np.concatenate(stamps)
+
+
+# ✅ Missing bars per symbol in one vectorized pass
+def find_gaps(symbol_ids, timestamps, start, end, resolution="D", include_tail=True, from_first_bar=True):
+    """
+    Compares every symbol's bars with the NSE session grid between start and end.
+
+    Parameters:
+        symbol_ids, timestamps: Parallel arrays (any order; duplicates and off-grid bars are ignored).
+        resolution (str): "D" or minutes ("1", "5", ...), matching the table.
+        include_tail (bool): Report bars missing after a symbol's last bar up to `end`.
+        from_first_bar (bool): Only check from each symbol's first bar (not flagging pre-listing dates);
+                               False checks from `start`.
+
+    Returns:
+        pd.DataFrame: symbol_id, first_missing, last_missing, missing_bars; one row per contiguous gap.
+    """
+    days = trading_days(start, end).values
+    slots = session_slots(start, end, resolution).values
+    columns = ["symbol_id", "first_missing", "last_missing", "missing_bars"]
+    if len(slots) == 0 or len(timestamps) == 0:
+        return pd.DataFrame(columns=columns)
+
+    # Slot of each bar = trading-day index * bars per day + bar within the session (no search over the minute grid)
+    stamps = np.asarray(timestamps, dtype="datetime64[ns]")
+    bar_days = stamps.astype("datetime64[D]").astype("datetime64[ns]")
+    day_pos = np.searchsorted(days, bar_days)
+    on_grid = days[np.minimum(day_pos, len(days) - 1)] == bar_days
+    if resolution == "D":
+        pos = day_pos
+    else:
+        step = int(resolution)
+        minute = (stamps - bar_days) // np.timedelta64(1, "m") - (SESSION_OPEN.hour * 60 + SESSION_OPEN.minute)
+        on_grid &= (minute >= 0) & (minute < SESSION_MINUTES) & (minute % step == 0)
+        pos = day_pos * (len(slots) // len(days)) + minute // step
+
+    # One int64 key per bar: sorting it orders by (symbol, slot) far faster than lexsort
+    n_slots = np.int64(len(slots))
+    key = np.sort(np.asarray(symbol_ids, dtype=np.int64)[on_grid] * n_slots + pos[on_grid])
+    key = key[np.r_[True, key[1:] != key[:-1]]] if len(key) else key  # Drop duplicate bars
+    sym, pos = key // n_slots, key % n_slots
+    if len(sym) == 0:
+        return pd.DataFrame(columns=columns)
+
+    same_symbol = sym[1:] == sym[:-1]
+    inner = same_symbol & (pos[1:] - pos[:-1] > 1)
+    gap_sym = [sym[:-1][inner]]
+    gap_first = [pos[:-1][inner] + 1]
+    gap_last = [pos[1:][inner] - 1]
+
+    if include_tail:
+        is_last = np.r_[~same_symbol, True]
+        tail = is_last & (pos < len(slots) - 1)
+        gap_sym.append(sym[tail])
+        gap_first.append(pos[tail] + 1)
+        gap_last.append(np.full(int(tail.sum()), len(slots) - 1))
+    if not from_first_bar:
+        is_first = np.r_[True, ~same_symbol]
+        head = is_first & (pos > 0)
+        gap_sym.append(sym[head])
+        gap_first.append(np.zeros(int(head.sum()), dtype=pos.dtype))
+        gap_last.append(pos[head] - 1)
+
+    first, last = np.concatenate(gap_first), np.concatenate(gap_last)
+    gaps = pd.DataFrame({
+        "symbol_id": np.concatenate(gap_sym),
+        "first_missing": slots[first],
+        "last_missing": slots[last],
+        "missing_bars": last - first + 1,
+    })
+    return gaps.sort_values(["symbol_id", "first_missing"], ignore_index=True)
+
+
+# ✅ Merge nearby gaps into the fewest date ranges worth re-fetching
+def repair_plan(gaps, symbols, merge_days=DEFAULT_MERGE_DAYS):
+    """
+    gaps: find_gaps() output. symbols: DataFrame with id, ticker, name.
+    Returns list[FetchTask] (feed to the historical fetcher; it splits long ranges into request windows).
+    """
+    if gaps.empty:
+        return []
+    start = gaps["first_missing"].dt.normalize()
+    end = gaps["last_missing"].dt.normalize()
+    prev_end = end.groupby(gaps["symbol_id"]).shift()
+    new_range = prev_end.isna() | ((start - prev_end).dt.days > merge_days)
+    ranges = (
+        gaps.assign(start=start, end=end, range_id=new_range.cumsum())
+        .groupby("range_id")
+        .agg(symbol_id=("symbol_id", "first"), start=("start", "min"), end=("end", "max"))
+        .merge(symbols.rename(columns={"id": "symbol_id", "name": "stock_name"}), on="symbol_id", how="left")
+    )
+    return [
+        FetchTask(int(row.symbol_id), row.ticker, row.stock_name, row.start.date(), row.end.date())
+        for row in ranges.itertuples(index=False)
+    ]
+
+
+# ✅ Re-fetch the planned ranges and upsert them
+async def repair(client, engine, plan, table="daily_price", resolution="D"):
+    names = {task.symbol_id: task.stock_name for task in plan}
+    total = 0
+    async for symbol_id, ticker, rows in iter_fetch(
+        client, [(t.symbol_id, t.ticker, t.start_date, t.end_date) for t in plan], resolution=resolution, raw=True
+    ):
+        if len(rows):
+            stats = await asyncio.to_thread(bulk_ingest, engine, price_table(1, symbol_id, names[symbol_id], rows),
+                                            table, "upsert", verbose=False)
+            total += stats.rows
+            print(f"🩹 {ticker}: {stats.rows} bars re-fetched")
+    return total
+
+
+# ✅ Main Execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find missing bars against the NSE calendar and plan re-fetches.")
+    parser.add_argument("--database", default="Algo_trading")
+    parser.add_argument("--table", default="daily_price")
+    parser.add_argument("--resolution", default="D", help='"D" for daily_price, minutes ("1") for minute_price')
+    parser.add_argument("--start", type=datetime.date.fromisoformat, default=datetime.date(2024, 1, 1))
+    parser.add_argument("--end", type=datetime.date.fromisoformat,
+                        default=datetime.date.today() - datetime.timedelta(days=1))
+    parser.add_argument("--merge-days", type=int, default=DEFAULT_MERGE_DAYS)
+    parser.add_argument("--no-tail", action="store_true", help="Ignore bars missing after each symbol's last bar")
+    parser.add_argument("--output", help="Write the gap list to this CSV file")
+    parser.add_argument("--repair", action="store_true", help="Re-fetch the planned ranges from Fyers and upsert them")
+    args = parser.parse_args()
+
+    engine = get_engine(args.database)
+    started = time.perf_counter()
+    symbol_ids, timestamps = load_bar_index(engine, args.table, args.start, args.end + datetime.timedelta(days=1))
+    loaded = time.perf_counter()
+    gaps = find_gaps(symbol_ids, timestamps, args.start, args.end, args.resolution, include_tail=not args.no_tail)
+    print(f"🔍 {len(timestamps):,} bars loaded in {loaded - started:.1f}s, scanned in {time.perf_counter() - loaded:.2f}s: "
+          f"{len(gaps)} gaps, {int(gaps['missing_bars'].sum()) if len(gaps) else 0:,} missing bars")
+
+    with engine.connect() as conn:
+        symbols = pd.read_sql(text("SELECT id, ticker, name FROM symbol"), conn)
+    plan = repair_plan(gaps, symbols, args.merge_days)
+    for task in plan:
+        print(f"📅 {task.stock_name} ({task.ticker}): {task.start_date} → {task.end_date}")
+    print(f"🗓️ {len(plan)} re-fetch ranges")
+    if args.output:
+        gaps.to_csv(args.output, index=False)
+
+    if args.repair and plan:
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_API_setup"))
+        from fyers_client import FETCHER_RETRY_POLICIES, FyersClient, create_model
+
+        client = FyersClient(create_model(os.getenv("client_id"), os.getenv("FYERS_ACCESS_TOKEN"), is_async=False),
+                             retry_policies=FETCHER_RETRY_POLICIES)
+        repaired = asyncio.run(repair(client, engine, plan, args.table, args.resolution))
+        print(f"✅ Re-fetched {repaired:,} bars")
@@ -0,0 +1,97 @@
+import datetime
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+# ✅ NSE session dates are IST calendar dates
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+
+
+def session_date(now=None):
+    return (now or datetime.datetime.now(IST)).astimezone(IST).date()
+
+
+class HistoryCache:
+    """
+    Daily history for the live loops, loaded once per trading session.
+
+    loader(symbols) must return {symbol: DataFrame indexed by date with a 'close' column}.
+    Symbols are loaded in one loader call the first time they are requested in a session;
+    symbols the loader did not return are requested again on the next call. Everything is dropped
+    and reloaded when the IST date changes. Safe to share between threads.
+    """
+
+    def __init__(self, loader, symbols=None, clock=None):
+        self.loader = loader
+        self.clock = clock or (lambda: datetime.datetime.now(IST))
+        self._symbols = list(symbols or [])
+        self._frames = {}
+        self._closes = {}
+        self._session = None
+        self._lock = threading.RLock()
+        self.loads = 0
+
+    def _roll_session(self):
+        today = session_date(self.clock())
+        if self._session != today:
+            if self._session is not None:
+                logging.info(f"📅 New session {today}: dropping history cached for {self._session}")
+            self._frames, self._closes, self._session = {}, {}, today
+
+    # ✅ Load every requested symbol not yet cached this session (one loader call)
+    def prefetch(self, symbols=None):
+        symbols = list(symbols) if symbols is not None else self._symbols
+        with self._lock:
+            self._roll_session()
+            missing = [s for s in symbols if s not in self._frames]
+            if not missing:
+                return
+            loaded = self.loader(missing) or {}
+            self.loads += 1
+            if not loaded:
+                logging.warning(f"⚠️ History loader returned nothing for {len(missing)} symbols, will retry")
+                return
+            not_loaded = []
+            for symbol in missing:
+                frame = loaded.get(symbol)
+                if frame is None:
+                    not_loaded.append(symbol)  # Not cached, so the next call for it asks the loader again
+                    continue
+                self._frames[symbol] = frame
+                if not frame.empty:
+                    closes = frame["close"].to_numpy(dtype=np.float64, copy=True)
+                    closes.setflags(write=False)
+                    self._closes[symbol] = closes
+            logging.info(f"✅ History cached for {len(missing) - len(not_loaded)}/{len(missing)} symbols "
+                         f"(session {self._session})")
+            if not_loaded:
+                logging.warning(f"⚠️ No history for {', '.join(not_loaded)}, will retry on the next call")
+
+    def invalidate(self):
+        with self._lock:
+            self._session = None
+            self._roll_session()
+
+    def frame(self, symbol):
+        """Cached history frame for `symbol`, or None. Do not modify it in place."""
+        with self._lock:
+            self.prefetch([symbol])  # No-op when already cached this session
+            return self._frames.get(symbol)
+
+    def closes(self, symbol):
+        """Read-only float64 array of cached closes, oldest first (empty if unknown)."""
+        self.frame(symbol)
+        return self._closes.get(symbol, np.empty(0))
+
+    def closes_with_live(self, symbol, live_price):
+        """Cached closes with the live price appended as today's (unconfirmed) close."""
+        return np.append(self.closes(symbol), float(live_price))
+
+    def frame_with_live(self, symbol, live_price, timestamp=None):
+        """Copy of the cached frame with a live row appended, or None without history."""
+        frame = self.frame(symbol)
+        if frame is None:
+            return None
+        live_row = pd.DataFrame({"close": [live_price]}, index=[timestamp or pd.Timestamp.now()])
+        return pd.concat([frame, live_row])
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import bisect
+import datetime
+import threading
+from contextlib import contextmanager
+
+# ✅ Run metrics for the fetch → insert pipeline, written as a JSON run report or a Prometheus text file.
+# Broker time (fyers_request_seconds), self-imposed throttling (rate_limit_wait_seconds) and MySQL time
+# (db_execute_seconds / db_commit_seconds) are recorded separately, so a slow backfill shows where it waits.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_PREFIX = "algo_"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics) with sum, count and max."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate by linear interpolation inside the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum_s": round(self.sum, 4),
+            "avg_ms": round(1000 * self.sum / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(1000 * self.quantile(0.50), 2),
+            "p95_ms": round(1000 * self.quantile(0.95), 2),
+            "p99_ms": round(1000 * self.quantile(0.99), 2),
+            "max_ms": round(1000 * self.max, 2),
+        }
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _prom_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """
+    Thread-safe registry of labelled counters and histograms.
+
+    metrics.inc("rows_fetched", 500, endpoint="history")
+    metrics.observe("db_commit_seconds", 0.012, table="daily_price")
+    with metrics.timer("fetch_window_seconds", resolution="D"): ...
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self.started_at = datetime.datetime.now().isoformat(timespec="seconds")
+            self.counters = {}
+            self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(seconds)
+
+    # ✅ Raw state for merging the registries of worker processes into the coordinator's
+    def state(self):
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {key: (h.buckets, list(h.counts), h.sum, h.count, h.max)
+                               for key, h in self.histograms.items()},
+            }
+
+    def merge(self, state):
+        with self._lock:
+            for key, value in state["counters"].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, (buckets, counts, total, count, maximum) in state["histograms"].items():
+                histogram = self.histograms.setdefault(key, Histogram(buckets))
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+                histogram.max = max(histogram.max, maximum)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    # ✅ Machine-readable run report: counters, per-second rates over the run, latency summaries
+    def report(self):
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value,
+                 "per_sec": round(value / elapsed, 2) if elapsed else 0.0}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), **histogram.as_dict()}
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ]
+        return {"started_at": self.started_at, "elapsed_s": round(elapsed, 3),
+                "counters": counters, "histograms": histograms}
+
+    def prometheus(self):
+        lines = []
+        with self._lock:
+            lines.append(f"# TYPE {METRIC_PREFIX}run_elapsed_seconds gauge")
+            lines.append(f"{METRIC_PREFIX}run_elapsed_seconds {time.monotonic() - self.started:.3f}")
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name}_total counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{METRIC_PREFIX}{name}_total{_prom_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+                for (n, labels), histogram in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                        cumulative += count
+                        lines.append(f"{METRIC_PREFIX}{name}_bucket{_prom_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{METRIC_PREFIX}{name}_sum{_prom_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{METRIC_PREFIX}{name}_count{_prom_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    # ✅ .prom → Prometheus text format (node_exporter textfile collector), anything else → JSON
+    def write(self, path):
+        content = self.prometheus() if path.endswith(".prom") else json.dumps(self.report(), indent=2)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(f"{path}.tmp", "w") as f:
+            f.write(content)
+        os.replace(f"{path}.tmp", path)  # Readers never see a half-written file
+        print(f"📊 Metrics written to {path}")
+
+    def summary(self):
+        """One line per histogram, for the end of a run."""
+        return [
+            f"⏱️ {h['name']} {h['labels'] or ''}: n={h['count']} avg={h['avg_ms']}ms p95={h['p95_ms']}ms max={h['max_ms']}ms"
+            for h in self.report()["histograms"]
+        ]
+
+
+# Process-wide registry shared by the fetcher, FyersClient and bulk_ingest
+METRICS = Metrics()
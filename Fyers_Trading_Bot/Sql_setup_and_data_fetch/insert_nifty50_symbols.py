@@ -1,26 +1,28 @@
 import datetime
+import argparse
 import pandas as pd
-from fyers_apiv3 import fyersModel
-from sqlalchemy import create_engine
 from sqlalchemy import text
-import urllib.parse
 import os
+import sys
+from db_engine import get_engine
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_API_setup"))
+from fyers_client import FyersClient, create_model
 
-# 🔹 Encode Password for MySQL Connection
-DB_USER = "sec_user"
-DB_PASS = os.getenv("db_password")
+# 🔹 MySQL Database (pooled engine; credentials come from .env, see db_engine.py)
 DB_NAME = "Algo_trading"
-DB_HOST = "localhost"
 
-ENCODED_PASS = urllib.parse.quote_plus(DB_PASS)
-SQL_CONNECTION_STRING = f"mysql+pymysql://{DB_USER}:{ENCODED_PASS}@{DB_HOST}/{DB_NAME}"
+# 🔹 Read API Credentials (files first, then the environment; neither is needed with FYERS_FAKE=1)
+def _read_credential(path, env_name):
+    if os.path.exists(path):
+        return open(path, 'r').read().strip()
+    return os.getenv(env_name)
 
-# 🔹 Read API Credentials
-app_id = open("fyers_appid.txt", 'r').read().strip()
-access_token = open("fyers_token.txt", 'r').read().strip()
+
+app_id = _read_credential("fyers_appid.txt", "client_id")
+access_token = _read_credential("fyers_token.txt", "FYERS_ACCESS_TOKEN")
 
 # 🔹 Initialize Fyers API
-fyers = fyersModel.FyersModel(client_id=app_id, token=access_token)
+fyers = FyersClient(create_model(app_id, access_token))
 
 # 🔹 NIFTY 50 Symbols List
 NIFTY_50_TICKERS = [
@@ -34,81 +36,113 @@ NIFTY_50_TICKERS = [
     "APOLLOHOSP", "BAJAJ-AUTO", "SHREECEM"
 ]
 
-# 🔹 Fetch Nifty 50 Symbols from Fyers API
-def fetch_nifty50_symbols():
-    """Fetch NIFTY 50 stock details from Fyers API."""
-    symbols = []
-    now = datetime.datetime.now()
+SYMBOL_COLUMNS = ["exchange_id", "ticker", "name", "sector", "industry", "isin", "created_date", "last_updated_date"]
+METADATA_COLUMNS = ["name", "sector", "industry", "isin"]  # Compared to decide whether a row needs writing
+UPSERT_BATCH_SIZE = 1000
+
 
-    for ticker in NIFTY_50_TICKERS:
-        fyers_symbol = f"NSE:{ticker}-EQ"
-        data = {"symbols": fyers_symbol}
+def _quote_ticker(item):
+    """'NSE:BAJAJ-AUTO-EQ' → 'BAJAJ-AUTO'"""
+    return item.get("n", "").split(":")[-1].rsplit("-", 1)[0]
 
-        try:
-            response = fyers.quotes(data)
 
-            if 'd' in response and response['d']:
-                stock_info = response['d'][0]
+# 🔹 Fetch Symbol Metadata from Fyers API (50 symbols per quotes call)
+def fetch_nifty50_symbols(tickers=NIFTY_50_TICKERS):
+    """Fetch stock details for `tickers` from Fyers API with batched quotes calls."""
+    now = datetime.datetime.now()
+    try:
+        quotes = {_quote_ticker(item): item for item in fyers.quotes_many([f"NSE:{t}-EQ" for t in tickers])}
+    except Exception as e:
+        print(f"❌ Error fetching quotes: {e}")
+        return []
 
-                name = stock_info.get("name", ticker)
-                sector = stock_info.get("sector", "Unknown")
-                industry = stock_info.get("industry", "Unknown")
-                isin = stock_info.get("isin", None)  # Ensure None for NULL in DB
+    symbols = []
+    for ticker in tickers:
+        stock_info = quotes.get(ticker)
+        if not stock_info or stock_info.get("s") == "error":
+            print(f"⚠️ No data found for {ticker}")
+            continue
+        name = stock_info.get("name", ticker)
+        sector = stock_info.get("sector", "Unknown")
+        industry = stock_info.get("industry", "Unknown")
+        isin = stock_info.get("isin", None)  # Ensure None for NULL in DB
+        symbols.append((1, ticker, name, sector, industry, isin, now, now))
+
+    print(f"✅ Symbols fetched: {len(symbols)}/{len(tickers)}")
+    return symbols
 
-                symbols.append((1, ticker, name, sector, industry, isin, now, now))
-            else:
-                print(f"⚠️ No data found for {ticker}")
 
-        except Exception as e:
-            print(f"❌ Error fetching data for {ticker}: {e}")
+# 🔹 Keep only new symbols and symbols whose metadata changed
+def changed_symbols(df, engine):
+    with engine.connect() as conn:
+        existing = pd.read_sql(text(f"SELECT ticker, {', '.join(METADATA_COLUMNS)} FROM symbol"), conn)
+    merged = df.merge(existing, on="ticker", how="left", suffixes=("", "_db"), indicator=True)
+    is_new = merged["_merge"] == "left_only"
+    changed = pd.Series(False, index=merged.index)
+    for col in METADATA_COLUMNS:
+        new, old = merged[col], merged[f"{col}_db"]
+        same = (new == old) | (new.isna() & old.isna())
+        if col == "isin":
+            same |= new.isna()  # A missing ISIN never overwrites a stored one (see upsert_symbols)
+        changed |= ~same
+    print(f"🔎 {int(is_new.sum())} new, {int((changed & ~is_new).sum())} changed, "
+          f"{int((~changed).sum())} unchanged symbols")
+    return df[(is_new | changed).to_numpy()]
+
+
+# 🔹 One multi-row INSERT ... ON DUPLICATE KEY UPDATE per batch
+def upsert_symbols(engine, df, batch_size=UPSERT_BATCH_SIZE):
+    records = df[SYMBOL_COLUMNS].astype(object).where(df[SYMBOL_COLUMNS].notna(), None).to_dict("records")
+    with engine.begin() as conn:
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start + batch_size]
+            values = ", ".join(
+                "(" + ", ".join(f":{col}_{i}" for col in SYMBOL_COLUMNS) + ")" for i in range(len(batch))
+            )
+            params = {f"{col}_{i}": row[col] for i, row in enumerate(batch) for col in SYMBOL_COLUMNS}
+            conn.execute(text(f"""
+                INSERT INTO symbol ({", ".join(SYMBOL_COLUMNS)})
+                VALUES {values}
+                ON DUPLICATE KEY UPDATE
+                    name = VALUES(name),
+                    sector = VALUES(sector),
+                    industry = VALUES(industry),
+                    isin = COALESCE(VALUES(isin), isin),
+                    last_updated_date = VALUES(last_updated_date)
+            """), params)
+    return len(records)
 
-    print(f"✅ Symbols fetched: {len(symbols)}")  # Debug log
-    return symbols
 
 # 🔹 Insert Data into MySQL
-def insert_symbols_to_db(symbols):
-    """Insert symbols into MySQL, avoiding duplicates and handling NULL ISINs."""
+def insert_symbols_to_db(symbols, only_changed=True):
+    """Upsert symbols into MySQL in batches, skipping rows whose metadata is unchanged."""
     if not symbols:
         print("⚠️ No symbols to insert.")
         return
 
-    # ✅ Create SQLAlchemy Engine
-    engine = create_engine(SQL_CONNECTION_STRING)
-
-    # ✅ Debugging: Check Symbols List Format
-    print("🔍 Checking symbols format before inserting:")
-    for sym in symbols[:5]:  # Print only first 5 for debugging
-        print(sym)
-
-    # ✅ Convert Data to DataFrame
-    column_names = ["exchange_id", "ticker", "name", "sector", "industry", "isin", "created_date", "last_updated_date"]
-    df = pd.DataFrame(symbols, columns=column_names)
-
-    # ✅ Ensure `None` values are converted to `NULL`
-    df = df.where(pd.notnull(df), None)
+    # ✅ Shared pooled SQLAlchemy Engine
+    engine = get_engine(DB_NAME)
+    df = pd.DataFrame(symbols, columns=SYMBOL_COLUMNS)
 
     try:
-        # ✅ Insert into MySQL using dictionaries (SQLAlchemy)
-        with engine.begin() as conn:
-            sql_query = text("""  
-                INSERT INTO symbol (exchange_id, ticker, name, sector, industry, isin, created_date, last_updated_date)  
-                VALUES (:exchange_id, :ticker, :name, :sector, :industry, :isin, :created_date, :last_updated_date)  
-                ON DUPLICATE KEY UPDATE  
-                    name = VALUES(name),  
-                    sector = VALUES(sector),  
-                    industry = VALUES(industry),  
-                    last_updated_date = VALUES(last_updated_date);  
-            """)
-
-            for _, row in df.iterrows():
-                conn.execute(sql_query, row.to_dict())  # ✅ Use text() wrapped query
-
-        print(f"✅ Successfully inserted/updated {len(symbols)} NIFTY 50 symbols into MySQL.")
-
+        if only_changed:
+            df = changed_symbols(df, engine)
+        written = upsert_symbols(engine, df)
+        print(f"✅ Successfully inserted/updated {written} of {len(symbols)} symbols into MySQL.")
     except Exception as e:
         print(f"❌ Error inserting into MySQL: {e}")
 
 # 🔹 Run Fetch & Store Process
 if __name__ == "__main__":
-    symbols = fetch_nifty50_symbols()
-    insert_symbols_to_db(symbols)
+    parser = argparse.ArgumentParser(description="Refresh the symbol table from Fyers quotes.")
+    parser.add_argument("--tickers-file", help="One ticker per line (defaults to the Nifty 50 list)")
+    parser.add_argument("--all", action="store_true", help="Write every symbol, not only changed ones")
+    args = parser.parse_args()
+
+    tickers = NIFTY_50_TICKERS
+    if args.tickers_file:
+        with open(args.tickers_file) as f:
+            tickers = [line.strip() for line in f if line.strip()]
+
+    symbols = fetch_nifty50_symbols(tickers)
+    insert_symbols_to_db(symbols, only_changed=not args.all)
@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import asyncio
+import datetime
+import argparse
+import threading
+from sqlalchemy import text
+from db_engine import get_engine
+from candle_store import CANDLE_STORE_ROOT
+import pyarrow.parquet as pq
+from bulk_ingest import bulk_ingest
+from candle_decode import candles_table, price_table
+from minute_stream import MINUTE_TABLE, init_minute_price_table
+from bar_resampler import ingest_minutes, init_bar_tables
+from ingest_metrics import METRICS
+from async_history_fetcher import (
+    HISTORY_BURST, HISTORY_RATE, MAX_IN_FLIGHT, WINDOW_DAYS, fetch_window, history_bucket,
+    history_windows,
+)
+
+# ✅ Checkpoints: one JSON line per finished (ticker, window); a crash loses at most the windows in flight
+CHECKPOINT_DIR = os.path.join(os.path.dirname(CANDLE_STORE_ROOT), "checkpoints")
+MINUTE_PARQUET_DIR = os.path.join(os.path.dirname(CANDLE_STORE_ROOT), "minute")
+
+
+class CheckpointLog:
+    """Append-only log of completed (ticker, window_start, window_end) windows for one backfill job."""
+
+    def __init__(self, job, checkpoint_dir=CHECKPOINT_DIR):
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.path = os.path.join(checkpoint_dir, f"{job}.jsonl")
+        self.done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from a crash mid-write
+                    self.done.add((entry["ticker"], entry["window_start"], entry["window_end"]))
+
+    # The window end is part of the key: a later --end extends the last window, which is then re-fetched
+    def is_done(self, ticker, window_start, window_end):
+        return (ticker, str(window_start), str(window_end)) in self.done
+
+    def record(self, ticker, window_start, window_end, rows):
+        entry = {"ticker": ticker, "window_start": str(window_start), "window_end": str(window_end),
+                 "rows": rows, "completed_at": datetime.datetime.now().isoformat(timespec="seconds")}
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.done.add((ticker, str(window_start), str(window_end)))
+
+
+# ✅ Sinks: each window is written as soon as it arrives, so memory holds only the windows in flight
+class DatabaseSink:
+    """Upserts windows into minute_price (safe to repeat after a crash) and refreshes the resampled bar tables."""
+
+    def __init__(self, engine, table=MINUTE_TABLE):
+        self.engine = engine
+        self.table = table
+        if table == MINUTE_TABLE:
+            init_bar_tables(engine)
+        else:
+            init_minute_price_table(engine)
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT ticker, id, name FROM symbol")).fetchall()
+        self.symbols = {ticker: (symbol_id, name) for ticker, symbol_id, name in rows}
+
+    def write(self, ticker, window_start, window_end, candles):
+        symbol_id, name = self.symbols[ticker]
+        if self.table == MINUTE_TABLE:
+            return ingest_minutes(self.engine, symbol_id, name, candles).rows
+        return bulk_ingest(self.engine, price_table(1, symbol_id, name, candles), self.table, verbose=False).rows
+
+
+class ParquetSink:
+    """One Parquet file per (ticker, window) under out_dir/<ticker>/, written atomically."""
+
+    def __init__(self, out_dir=MINUTE_PARQUET_DIR):
+        self.out_dir = out_dir
+
+    def write(self, ticker, window_start, window_end, candles):
+        ticker_dir = os.path.join(self.out_dir, ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+        table = candles_table(candles)
+        path = os.path.join(ticker_dir, f"{window_start}_{window_end}.parquet")
+        pq.write_table(table, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        return table.num_rows
+
+
+# ✅ Backfill every (ticker, window) not yet checkpointed
+async def run_backfill(client, tickers, start_date, end_date, sink, checkpoints, resolution="1",
+                       window_days=WINDOW_DAYS, rate=HISTORY_RATE, burst=HISTORY_BURST, concurrency=MAX_IN_FLIGHT):
+    """
+    Returns (windows written, rows written, failed windows). Failed windows are not checkpointed,
+    so running the job again retries exactly those.
+    """
+    windows = [
+        (ticker, ws, we)
+        for ticker in tickers
+        for ws, we in history_windows(start_date, end_date, window_days)
+        if not checkpoints.is_done(ticker, ws, we)
+    ]
+    print(f"🗓️ {len(windows)} windows to fetch for {len(tickers)} tickers "
+          f"({len(checkpoints.done)} already checkpointed)")
+
+    bucket = history_bucket(client, rate, burst)
+    semaphore = asyncio.Semaphore(concurrency)
+    written_slots = asyncio.Semaphore(concurrency * 2)  # Bounds fetched-but-unwritten windows held in memory
+    totals = {"windows": 0, "rows": 0, "failed": []}
+
+    async def _window(ticker, ws, we):
+        async with written_slots:
+            try:
+                candles = await fetch_window(client, bucket, semaphore, ticker, ws, we, resolution, raise_on_failure=True,
+                                             raw=True)
+                rows = await asyncio.to_thread(sink.write, ticker, ws, we, candles) if candles else 0
+            except Exception as e:  # HistoryFetchError or a sink failure
+                print(f"❌ {ticker} {ws} → {we} failed, will retry on the next run: {e}")
+                totals["failed"].append((ticker, ws, we))
+                return
+            with METRICS.timer("checkpoint_seconds"):
+                checkpoints.record(ticker, ws, we, rows)
+            totals["windows"] += 1
+            totals["rows"] += rows
+            if totals["windows"] % 50 == 0:
+                print(f"📦 {totals['windows']}/{len(windows)} windows, {totals['rows']:,} rows")
+
+    await asyncio.gather(*[_window(*window) for window in windows])
+    return totals["windows"], totals["rows"], totals["failed"]
+
+
+# ✅ Main Execution
+if __name__ == "__main__":
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_API_setup"))
+    from fyers_client import FETCHER_RETRY_POLICIES, FyersClient, create_model
+
+    parser = argparse.ArgumentParser(description="Resumable minute-candle backfill (checkpointed per ticker/window).")
+    parser.add_argument("--tickers", nargs="*", help="Defaults to every ticker in the symbol table")
+    parser.add_argument("--start", required=True, type=datetime.date.fromisoformat)
+    parser.add_argument("--end", type=datetime.date.fromisoformat,
+                        default=datetime.date.today() - datetime.timedelta(days=1))
+    parser.add_argument("--resolution", default="1")
+    parser.add_argument("--sink", choices=["db", "parquet"], default="db")
+    parser.add_argument("--database", default="Algo_trading")
+    parser.add_argument("--job", help="Checkpoint name (defaults to minute_<resolution>_<sink>)")
+    parser.add_argument("--metrics-out", default=os.getenv("INGEST_METRICS_FILE"),
+                        help="Write a run report here (.json, or .prom for the Prometheus text format)")
+    args = parser.parse_args()
+
+    engine = get_engine(args.database)
+    tickers = args.tickers
+    if not tickers:
+        with engine.connect() as conn:
+            tickers = [row[0] for row in conn.execute(text("SELECT ticker FROM symbol ORDER BY id"))]
+
+    sink = DatabaseSink(engine) if args.sink == "db" else ParquetSink()
+    checkpoints = CheckpointLog(args.job or f"minute_{args.resolution}_{args.sink}")
+    client = FyersClient(create_model(os.getenv("client_id"), os.getenv("FYERS_ACCESS_TOKEN"), is_async=False),
+                         retry_policies=FETCHER_RETRY_POLICIES, metrics=METRICS)
+
+    started = datetime.datetime.now()
+    windows, rows, failed = asyncio.run(
+        run_backfill(client, tickers, args.start, args.end, sink, checkpoints, args.resolution)
+    )
+    elapsed = (datetime.datetime.now() - started).total_seconds()
+    print(f"✅ {windows} windows, {rows:,} rows in {elapsed:.0f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    if failed:
+        print(f"⚠️ {len(failed)} windows failed; rerun the same command to resume")
+    for line in METRICS.summary():
+        print(line)
+    if args.metrics_out:
+        METRICS.write(args.metrics_out)
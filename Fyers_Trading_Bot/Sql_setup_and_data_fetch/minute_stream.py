@@ -0,0 +1,178 @@
+import argparse
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import text, bindparam
+from db_engine import get_engine
+
+# ✅ 1-minute bars live in minute_price (same column names as daily_price)
+MINUTE_TABLE = "minute_price"
+DEFAULT_CHUNK_ROWS = 200_000
+
+# Shared by minute_price and the resampled bar tables (see bar_resampler.py)
+CREATE_PRICE_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        data_vendor_id INT,
+        symbol_id INT NOT NULL,
+        stock_name VARCHAR(255),
+        price_date DATETIME NOT NULL,
+        created_date DATETIME,
+        last_updated_date DATETIME,
+        open_price DECIMAL(19,4),
+        high_price DECIMAL(19,4),
+        low_price DECIMAL(19,4),
+        close_price DECIMAL(19,4),
+        volume BIGINT,
+        UNIQUE KEY uq_{table}_symbol_date (symbol_id, price_date)
+    )
+"""
+CREATE_MINUTE_TABLE = CREATE_PRICE_TABLE.format(table=MINUTE_TABLE)
+
+# A chunk of consecutive bars for one ticker. The first `warmup_rows` rows repeat the tail of the
+# previous chunk so rolling indicators are continuous across chunk boundaries.
+CandleChunk = namedtuple("CandleChunk", ["ticker", "frame", "warmup_rows"])
+
+# A date window of bars for all tickers. `warmup` is a boolean mask aligned with `frame` marking the rows
+# repeated from the previous window (their counts differ per ticker, so a mask rather than a row count).
+WindowChunk = namedtuple("WindowChunk", ["window_start", "frame", "warmup"])
+
+
+def init_minute_price_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_MINUTE_TABLE))
+
+
+# ✅ Server-side cursors need PyMySQL/mysqlclient (mysql-connector's SQLAlchemy dialect buffers everything)
+def streaming_engine(engine):
+    if engine.dialect.driver in ("pymysql", "mysqldb") or engine.dialect.name != "mysql":
+        return engine
+    url = engine.url
+    return get_engine(url.database, driver="pymysql", user=url.username, password=url.password,
+                      host=url.host, port=url.port)
+
+
+def _candle_query(table, tickers, start, end):
+    where, params = [], {}
+    if tickers is not None:
+        where.append("sym.ticker IN :tickers")
+        params["tickers"] = [tickers] if isinstance(tickers, str) else list(tickers)
+    if start is not None:
+        where.append("t.price_date >= :start")
+        params["start"] = pd.Timestamp(start).to_pydatetime()
+    if end is not None:
+        where.append("t.price_date < :end")
+        params["end"] = pd.Timestamp(end).to_pydatetime()
+
+    query = f"""
+        SELECT sym.ticker, t.price_date AS timestamp, t.open_price AS open, t.high_price AS high,
+               t.low_price AS low, t.close_price AS close, t.volume AS volume
+        FROM {table} AS t
+        INNER JOIN symbol AS sym ON t.symbol_id = sym.id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY t.symbol_id, t.price_date ASC
+    """
+    query = text(query)
+    if "tickers" in params:
+        query = query.bindparams(bindparam("tickers", expanding=True))
+    return query, params
+
+
+# ✅ Stream raw blocks of rows through an unbuffered cursor
+def stream_candles(engine, table=MINUTE_TABLE, tickers=None, start=None, end=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yields DataFrames of at most `chunk_rows` rows, ordered by (symbol, timestamp).
+    Only one block is held in memory; the rest of the result stays on the server.
+    """
+    query, params = _candle_query(table, tickers, start, end)
+    with streaming_engine(engine).connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows)
+        for block in pd.read_sql(query, conn, params=params, chunksize=chunk_rows):
+            block["timestamp"] = pd.to_datetime(block["timestamp"])
+            yield block
+
+
+def _chunk(ticker, parts, tail):
+    frame = pd.concat(([tail] if tail is not None else []) + parts)
+    return CandleChunk(ticker, frame, 0 if tail is None else len(tail))
+
+
+# ✅ Per-ticker chunks from a single streamed query
+def iter_ticker_chunks(engine, tickers=None, start=None, end=None, table=MINUTE_TABLE,
+                       chunk_rows=DEFAULT_CHUNK_ROWS, warmup_rows=0):
+    """
+    Yields CandleChunk(ticker, frame, warmup_rows) with `frame` indexed by timestamp.
+    A ticker with more than `chunk_rows` bars is split into several chunks, each prefixed
+    with the last `warmup_rows` bars of the previous one.
+    """
+    current, parts, size, tail = None, [], 0, None
+    for block in stream_candles(engine, table, tickers, start, end, chunk_rows):
+        for ticker, part in block.groupby("ticker", sort=False):
+            part = part.drop(columns="ticker").set_index("timestamp")
+            if ticker != current:
+                if parts:
+                    yield _chunk(current, parts, tail)
+                current, parts, size, tail = ticker, [], 0, None
+            parts.append(part)
+            size += len(part)
+            if size >= chunk_rows:
+                chunk = _chunk(current, parts, tail)
+                yield chunk
+                tail = chunk.frame.iloc[len(chunk.frame) - warmup_rows:] if warmup_rows else None
+                parts, size = [], 0
+    if parts:
+        yield _chunk(current, parts, tail)
+
+
+# ✅ Date-window chunks across all tickers (one bounded query per window)
+def iter_date_range_chunks(engine, start, end, window="30D", tickers=None, table=MINUTE_TABLE, warmup_rows=0):
+    """
+    Yields WindowChunk(window_start, frame, warmup) with `frame` indexed by (ticker, timestamp).
+    With warmup_rows, each ticker's last bars from the previous window are prepended, but only for
+    tickers that have bars in this window; frame[~warmup] are the window's own bars.
+    """
+    tail = None
+    for window_start in pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq=window, inclusive="left"):
+        window_end = min(window_start + pd.Timedelta(window), pd.Timestamp(end))
+        blocks = list(stream_candles(engine, table, tickers, window_start, window_end))
+        if not blocks:
+            continue
+        frame = pd.concat(blocks, ignore_index=True).set_index(["ticker", "timestamp"])
+        warmup = np.zeros(len(frame), dtype=bool)
+        if tail is not None:
+            tail = tail[tail.index.get_level_values(0).isin(frame.index.unique(level=0))]
+            frame = pd.concat([tail, frame])
+            warmup = np.concatenate([np.ones(len(tail), dtype=bool), warmup])
+            order = np.argsort(frame.index.get_level_values(0).to_numpy(), kind="stable")  # Group by ticker
+            frame, warmup = frame.iloc[order], warmup[order]
+        yield WindowChunk(window_start, frame, warmup)
+        if warmup_rows:
+            tail = frame.groupby(level=0, sort=False).tail(warmup_rows)
+
+
+# ✅ Run an indicator function chunk by chunk, dropping the warm-up rows from each result
+def apply_by_chunk(chunks, func):
+    """
+    func(frame) -> DataFrame/Series aligned with frame. Yields (ticker, result) per CandleChunk, or
+    (window_start, result) per WindowChunk (func must then group by ticker itself).
+    """
+    for chunk in chunks:
+        if isinstance(chunk, WindowChunk):
+            yield chunk.window_start, func(chunk.frame)[~chunk.warmup]
+        else:
+            yield chunk.ticker, func(chunk.frame).iloc[chunk.warmup_rows:]
+
+
+# ✅ Main Execution: stream minute_price and report per-ticker bar counts
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream minute_price per ticker without loading the table.")
+    parser.add_argument("--tickers", nargs="*")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    engine = get_engine(driver="pymysql")
+
+    for chunk in iter_ticker_chunks(engine, args.tickers, args.start, args.end, chunk_rows=args.chunk_rows):
+        print(f"📦 {chunk.ticker}: {len(chunk.frame)} bars {chunk.frame.index[0]} → {chunk.frame.index[-1]}")
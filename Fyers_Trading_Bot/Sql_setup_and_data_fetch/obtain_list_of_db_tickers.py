@@ -1,17 +1,12 @@
 import datetime
-import mysql.connector as mdb
 import requests
 import pandas as pd
+from db_engine import raw_connection
 
 
-# Database connection function
+# Database connection function (pooled; close() returns the connection to the pool)
 def get_db_connection():
-    return mdb.connect(
-        host='localhost',
-        user='sec_user',
-        password='Apple@1234',
-        database='securities_master'
-    )
+    return raw_connection("securities_master")
 
 
 # Get the data_vendor_id based on the vendor name (e.g., 'Fyers API')
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from candle_store import CANDLE_STORE_DIR, WATERMARK_FILE, load_candles
+
+# ✅ Dense (ticker x date) panel: one .npy file per array, opened read-only with mmap
+PANEL_FIELDS = ["open", "high", "low", "close", "volume"]
+PANEL_META_FILE = "meta.json"
+PANEL_POINTER_FILE = "CURRENT"  # Name of the active version directory; swapped with os.replace
+
+OHLCVPanel = namedtuple("OHLCVPanel", ["tickers", "dates"] + PANEL_FIELDS + ["valid"])
+
+
+def default_panel_dir(store_dir=CANDLE_STORE_DIR):
+    return os.path.join(store_dir, "_panel")  # Leading underscore keeps it out of dataset discovery
+
+
+# ✅ Versioned layout: <panel_dir>/v-<ns>-<pid>/*.npy plus CURRENT naming the active version
+def current_panel_dir(panel_dir):
+    """Directory holding the active version (panel_dir itself for panels built before versioning), or None."""
+    pointer = os.path.join(panel_dir, PANEL_POINTER_FILE)
+    if os.path.exists(pointer):
+        with open(pointer) as f:
+            return os.path.join(panel_dir, f.read().strip())
+    return panel_dir if os.path.exists(os.path.join(panel_dir, PANEL_META_FILE)) else None
+
+
+def _prune_versions(panel_dir, keep):
+    # The previous version is kept too: a reader may have read the old pointer but not opened the files yet
+    versions = sorted((name for name in os.listdir(panel_dir) if name.startswith("v-")),
+                      key=lambda name: int(name.split("-")[1]))
+    for name in versions[:-2]:
+        if name not in keep:
+            shutil.rmtree(os.path.join(panel_dir, name), ignore_errors=True)
+
+
+# ✅ Fingerprint of the candle store contents (changes whenever a sync writes new rows)
+def store_fingerprint(store_dir=CANDLE_STORE_DIR):
+    path = os.path.join(store_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+# ✅ Build the panel from a MultiIndex (ticker, timestamp) candle frame
+def build_panel(df, panel_dir, source=None, dtype=np.float64):
+    """
+    Writes a dense panel to panel_dir and returns it memory-mapped.
+
+    Parameters:
+        df (pd.DataFrame): MultiIndex (ticker, timestamp) frame with open/high/low/close/volume columns.
+        panel_dir (str): Output directory. Each build writes a new version and then swaps the CURRENT pointer
+            atomically, so there is never a moment without a panel and readers of an old version are unaffected.
+        source (str): Fingerprint of the data the panel was built from (see store_fingerprint()).
+        dtype: Float dtype of the price/volume arrays. Missing bars are NaN and False in `valid`.
+
+    Returns:
+        OHLCVPanel: Arrays of shape (len(tickers), len(dates)).
+    """
+    ticker_codes, tickers = pd.factorize(df.index.get_level_values(0), sort=True)
+    date_codes, dates = pd.factorize(df.index.get_level_values(1), sort=True)
+    shape = (len(tickers), len(dates))
+
+    version = f"v-{time.time_ns()}-{os.getpid()}"
+    version_dir = os.path.join(panel_dir, version)
+    os.makedirs(version_dir)
+
+    np.save(os.path.join(version_dir, "tickers.npy"), np.asarray(tickers, dtype=str))
+    np.save(os.path.join(version_dir, "dates.npy"), np.asarray(dates, dtype="datetime64[ns]"))
+
+    valid = np.lib.format.open_memmap(os.path.join(version_dir, "valid.npy"), mode="w+", dtype=bool, shape=shape)
+    valid[:] = False
+    valid[ticker_codes, date_codes] = True
+    valid.flush()
+    del valid
+
+    for field in PANEL_FIELDS:
+        arr = np.lib.format.open_memmap(os.path.join(version_dir, f"{field}.npy"), mode="w+", dtype=dtype, shape=shape)
+        arr[:] = np.nan
+        if field in df.columns:
+            arr[ticker_codes, date_codes] = df[field].to_numpy(dtype=dtype, na_value=np.nan)
+        arr.flush()
+        del arr
+
+    with open(os.path.join(version_dir, PANEL_META_FILE), "w") as f:
+        json.dump({"shape": shape, "dtype": np.dtype(dtype).name, "source": source}, f)
+
+    # ✅ Swap the pointer: readers see the old version or the new one, never neither
+    pointer = os.path.join(panel_dir, PANEL_POINTER_FILE)
+    with open(f"{pointer}.tmp-{os.getpid()}", "w") as f:
+        f.write(version)
+    os.replace(f"{pointer}.tmp-{os.getpid()}", pointer)
+    _prune_versions(panel_dir, keep={version})  # Processes that already mapped removed files keep valid mappings
+
+    print(f"✅ Panel built: {shape[0]} tickers x {shape[1]} dates → {version_dir}")
+    return load_panel(version_dir)
+
+
+# ✅ Open an existing panel read-only (pages are shared between processes by the OS)
+def load_panel(panel_dir):
+    panel_dir = current_panel_dir(panel_dir) or panel_dir
+
+    def _load(name):
+        return np.load(os.path.join(panel_dir, f"{name}.npy"), mmap_mode="r")
+
+    return OHLCVPanel(
+        tickers=np.load(os.path.join(panel_dir, "tickers.npy")),
+        dates=np.load(os.path.join(panel_dir, "dates.npy")),
+        valid=_load("valid"),
+        **{field: _load(field) for field in PANEL_FIELDS},
+    )
+
+
+def panel_source(panel_dir):
+    current = current_panel_dir(panel_dir)
+    path = os.path.join(current, PANEL_META_FILE) if current else None
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get("source")
+
+
+# ✅ Reuse the panel across runs; rebuild only when the candle store changed since it was built
+def load_or_build_panel(store_dir=CANDLE_STORE_DIR, panel_dir=None):
+    panel_dir = panel_dir or default_panel_dir(store_dir)
+    fingerprint = store_fingerprint(store_dir)
+    if fingerprint is not None and panel_source(panel_dir) == fingerprint:
+        return load_panel(panel_dir)
+    return build_panel(load_candles(store_dir=store_dir), panel_dir, source=fingerprint)
+
+
+# ✅ Row number of each ticker in the panel
+def ticker_rows(panel):
+    return {ticker: i for i, ticker in enumerate(panel.tickers)}
+
+
+# ✅ (row, column) of every stored bar, in the (ticker, timestamp) order panel_to_frame() uses
+def panel_index(panel):
+    return np.nonzero(panel.valid)
+
+
+# ✅ Columns whose dates fall in [start, end] as a slice, so panel arrays sliced with it stay mmap views
+def date_columns(panel, start=None, end=None):
+    first = 0 if start is None else int(np.searchsorted(panel.dates, np.datetime64(pd.Timestamp(start)), "left"))
+    if end is None:
+        return slice(first, len(panel.dates))
+    end = pd.Timestamp(end)
+    if end == end.normalize():
+        end = end + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")  # ✅ Date-only bound is inclusive of the whole day
+    return slice(first, int(np.searchsorted(panel.dates, np.datetime64(end), "right")))
+
+
+# ✅ Convert back to the MultiIndex (ticker, timestamp) layout used by the backtests
+def panel_to_frame(panel, fields=PANEL_FIELDS):
+    rows, cols = panel_index(panel)
+    index = pd.MultiIndex.from_arrays(
+        [panel.tickers[rows], panel.dates[cols]], names=["ticker", "timestamp"]
+    )
+    return pd.DataFrame({field: getattr(panel, field)[rows, cols] for field in fields}, index=index)
+
+
+# ✅ Main Execution: (re)build the panel for a candle store
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped OHLCV panel from the candle store.")
+    parser.add_argument("--store-dir", default=CANDLE_STORE_DIR)
+    parser.add_argument("--panel-dir", default=None)
+    args = parser.parse_args()
+
+    panel = load_or_build_panel(args.store_dir, args.panel_dir)
+    print(f"📊 Panel: {len(panel.tickers)} tickers, {len(panel.dates)} dates, {int(panel.valid.sum())} bars")
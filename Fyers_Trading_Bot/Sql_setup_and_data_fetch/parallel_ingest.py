@@ -0,0 +1,142 @@
+import os
+import sys
+import queue
+import asyncio
+import datetime
+import argparse
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from db_engine import dispose_engines, get_engine
+from bulk_ingest import DEFAULT_BATCH_SIZE, bulk_ingest
+from candle_decode import price_table
+from async_history_fetcher import MAX_IN_FLIGHT, fetch_symbol
+from ingest_metrics import METRICS
+from sync_planner import plan_sync, summarize_plan
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_API_setup"))
+from fyers_client import ENDPOINT_BUDGETS, FETCHER_RETRY_POLICIES, GLOBAL_BUDGETS, Budget, FyersClient, create_model
+
+# ✅ Multi-process ingestion: tickers are sharded across worker processes, each with its own Fyers client,
+# event loop and pooled DB connections; the coordinator merges progress, failures and metrics.
+DEFAULT_WORKERS = max(1, min(8, os.cpu_count() or 1))
+
+
+# ✅ Balance shards by the number of days each task still has to fetch (largest first → least-loaded worker)
+def shard_plan(plan, workers):
+    shards, loads = [[] for _ in range(workers)], [0] * workers
+    for task in sorted(plan, key=lambda t: (t.end_date - t.start_date).days, reverse=True):
+        target = loads.index(min(loads))
+        shards[target].append(task)
+        loads[target] += (task.end_date - task.start_date).days + 1
+    return [shard for shard in shards if shard]
+
+
+def _worker_init():
+    dispose_engines(close=False)  # Pooled sockets inherited through fork belong to the parent
+    METRICS.reset()
+
+
+# ✅ One worker: fetch its shard concurrently and upsert each ticker as soon as it arrives
+async def _ingest_shard(tasks, progress, database, table, method, batch_size, workers):
+    # Fyers limits are per app, so every worker gets an equal slice of them
+    share = 1 / workers
+    budgets = {endpoint: Budget(b.rate * share, max(1, int(b.burst * share))) for endpoint, b in ENDPOINT_BUDGETS.items()}
+    client = FyersClient(create_model(os.getenv("client_id"), os.getenv("FYERS_ACCESS_TOKEN"), is_async=False),
+                         budgets=budgets, global_budgets=[(r * share, max(1, int(b * share))) for r, b in GLOBAL_BUDGETS],
+                         retry_policies=FETCHER_RETRY_POLICIES, metrics=METRICS)
+    engine = get_engine(database)
+    semaphore = asyncio.Semaphore(max(2, MAX_IN_FLIGHT // workers))
+    pid = os.getpid()
+
+    async def _task(task):
+        try:
+            candles = await fetch_symbol(client, None, semaphore, task.ticker, task.start_date, task.end_date,
+                                         raise_on_failure=True, raw=True)
+            rows = 0
+            if candles:
+                stats = await asyncio.to_thread(bulk_ingest, engine, price_table(1, task.symbol_id, task.stock_name, candles),
+                                                table, method, batch_size, False)
+                rows = stats.rows
+            progress.put(("done", pid, task.ticker, rows))
+            return rows
+        except Exception as e:
+            progress.put(("failed", pid, task.ticker, str(e)))
+            return None
+
+    results = await asyncio.gather(*[_task(task) for task in tasks])
+    failed = [task.ticker for task, rows in zip(tasks, results) if rows is None]
+    return {"pid": pid, "tickers": len(tasks), "rows": sum(r for r in results if r), "failed": failed,
+            "metrics": METRICS.state()}
+
+
+def _run_shard(tasks, progress, database, table, method, batch_size, workers):
+    return asyncio.run(_ingest_shard(tasks, progress, database, table, method, batch_size, workers))
+
+
+def _drain(progress, totals, n_tasks):
+    while True:
+        try:
+            status, pid, ticker, detail = progress.get_nowait()
+        except queue.Empty:
+            return
+        if status == "done":
+            totals["done"].add(ticker)
+            totals["rows"] += detail
+            print(f"✅ [{len(totals['done']) + len(totals['failed'])}/{n_tasks}] {ticker}: {detail:,} rows (worker {pid})")
+        else:
+            totals["failed"][ticker] = detail
+            print(f"❌ [{len(totals['done']) + len(totals['failed'])}/{n_tasks}] {ticker} failed in worker {pid}: {detail}")
+
+
+# ✅ Coordinator: shard, run, merge
+def run_parallel(plan, workers=DEFAULT_WORKERS, database="Algo_trading", table="daily_price", method="upsert",
+                 batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Ingests a sync plan (list[FetchTask]) with `workers` processes.
+    Returns (rows written, {ticker: error} for failed tickers); worker metrics are merged into METRICS.
+    """
+    shards = shard_plan(plan, workers)
+    if not shards:
+        return 0, {}
+    print(f"🧵 {len(plan)} tickers across {len(shards)} worker processes")
+    totals = {"done": set(), "rows": 0, "failed": {}}
+    with multiprocessing.Manager() as manager:
+        progress = manager.Queue()
+        with ProcessPoolExecutor(len(shards), initializer=_worker_init) as pool:
+            futures = {pool.submit(_run_shard, shard, progress, database, table, method, batch_size, len(shards)): shard
+                       for shard in shards}
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                _drain(progress, totals, len(plan))
+                for future in finished:
+                    try:
+                        METRICS.merge(future.result()["metrics"])
+                    except Exception as e:  # The worker process died: its unfinished tickers count as failed
+                        for task in futures[future]:
+                            if task.ticker not in totals["done"]:
+                                totals["failed"].setdefault(task.ticker, f"worker crashed: {e}")
+        _drain(progress, totals, len(plan))
+    return totals["rows"], totals["failed"]
+
+
+# ✅ Main Execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill daily candles with one process per shard of tickers.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--database", default="Algo_trading")
+    parser.add_argument("--method", choices=["upsert", "infile"], default=os.getenv("INGEST_METHOD", "upsert"))
+    parser.add_argument("--end", type=datetime.date.fromisoformat,
+                        default=datetime.date.today() - datetime.timedelta(days=1))
+    parser.add_argument("--metrics-out", default=os.getenv("INGEST_METRICS_FILE"))
+    args = parser.parse_args()
+
+    plan = plan_sync(get_engine(args.database), args.end)
+    summarize_plan(plan)
+    started = datetime.datetime.now()
+    rows, failed = run_parallel(plan, args.workers, args.database, method=args.method)
+    elapsed = (datetime.datetime.now() - started).total_seconds()
+    print(f"📥 {rows:,} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s), {len(failed)} tickers failed")
+    for line in METRICS.summary():
+        print(line)
+    if args.metrics_out:
+        METRICS.write(args.metrics_out)
@@ -0,0 +1,167 @@
+import argparse
+from collections import namedtuple
+from sqlalchemy import text
+from db_engine import get_engine
+
+# ✅ Composite indexes for the hot daily_price queries
+#   uq_<table>_symbol_date : sync_planner watermarks (MAX per symbol), candle_store export, duplicate protection for upserts
+#   ix_<table>_stock_date  : mw_rsi fetch_historical_data_batch (WHERE stock_name ... ORDER BY price_date)
+#   ix_<table>_date        : candle_store incremental sync (WHERE price_date > watermark)
+Index = namedtuple("Index", ["name", "columns", "unique"])
+
+PRICE_TABLES = ["daily_price", "minute_price"]
+
+
+def price_indexes(table):
+    return [
+        Index(f"uq_{table}_symbol_date", ("symbol_id", "price_date"), True),
+        Index(f"ix_{table}_stock_date", ("stock_name", "price_date"), False),
+        Index(f"ix_{table}_date", ("price_date",), False),
+    ]
+
+
+# ✅ Existing indexes as {name: (columns, unique)}
+def existing_indexes(conn, table):
+    rows = conn.execute(text("""
+        SELECT index_name, column_name, non_unique
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = :table
+        ORDER BY index_name, seq_in_index
+    """), {"table": table}).fetchall()
+    indexes = {}
+    for name, column, non_unique in rows:
+        columns, _ = indexes.get(name, ((), None))
+        indexes[name] = (columns + (column,), not non_unique)
+    return indexes
+
+
+def table_exists(conn, table):
+    return conn.execute(text("""
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name = :table
+    """), {"table": table}).scalar() > 0
+
+
+# ✅ An index is already covered by one that starts with the same columns (unique keys must match exactly)
+def index_covered(index, existing):
+    for columns, unique in existing.values():
+        if index.unique:
+            if unique and columns == index.columns:
+                return True
+        elif columns[:len(index.columns)] == index.columns:
+            return True
+    return False
+
+
+# ✅ Rows that would violate the (symbol_id, price_date) unique key
+def find_duplicates(conn, table="daily_price", limit=20):
+    """Returns (number of duplicated keys, sample rows of (symbol_id, price_date, copies))."""
+    count = conn.execute(text(f"""
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM {table} GROUP BY symbol_id, price_date HAVING COUNT(*) > 1
+        ) AS dup
+    """)).scalar()
+    sample = conn.execute(text(f"""
+        SELECT symbol_id, price_date, COUNT(*) AS copies
+        FROM {table}
+        GROUP BY symbol_id, price_date
+        HAVING COUNT(*) > 1
+        ORDER BY copies DESC
+        LIMIT {int(limit)}
+    """)).fetchall()
+    return count, sample
+
+
+# ✅ Keep the most recently inserted row (highest id) of each duplicated key
+def remove_duplicates(conn, table="daily_price"):
+    result = conn.execute(text(f"""
+        DELETE older FROM {table} AS older
+        INNER JOIN {table} AS newer
+            ON older.symbol_id = newer.symbol_id
+           AND older.price_date = newer.price_date
+           AND older.id < newer.id
+    """))
+    return result.rowcount
+
+
+# ✅ Apply the missing indexes to one table
+def migrate_table(engine, table="daily_price", dedupe=False, dry_run=False):
+    """
+    Creates the composite indexes that are not already present.
+
+    Parameters:
+        engine: SQLAlchemy engine for the target schema.
+        table (str): daily_price or minute_price (same column names).
+        dedupe (bool): Delete duplicate (symbol_id, price_date) rows, keeping the newest, before adding the unique key.
+        dry_run (bool): Only print the statements.
+
+    Returns:
+        list[str]: The DDL statements executed (or that would be executed).
+    """
+    with engine.connect() as conn:
+        if not table_exists(conn, table):
+            print(f"⚠️ Table {table} does not exist, skipping")
+            return []
+        existing = existing_indexes(conn, table)
+        missing = [index for index in price_indexes(table) if not index_covered(index, existing)]
+        if not missing:
+            print(f"✅ {table}: all indexes present")
+            return []
+
+        if any(index.unique for index in missing):
+            count, sample = find_duplicates(conn, table)
+            if count:
+                print(f"⚠️ {table}: {count} duplicated (symbol_id, price_date) keys, e.g. {sample[:5]}")
+                if not dedupe:
+                    raise RuntimeError(
+                        f"{table} has {count} duplicated (symbol_id, price_date) keys; rerun with --dedupe "
+                        f"to keep the newest row of each, or clean them up manually"
+                    )
+                if not dry_run:
+                    print(f"🧹 {table}: removed {remove_duplicates(conn, table)} duplicate rows")
+                    conn.commit()
+
+    statements = [
+        f"ALTER TABLE {table} ADD {'UNIQUE ' if index.unique else ''}INDEX {index.name} "
+        f"({', '.join(index.columns)}), ALGORITHM=INPLACE, LOCK=NONE"
+        for index in missing
+    ]
+    for statement in statements:
+        print(f"{'📝' if dry_run else '🔧'} {statement}")
+        if not dry_run:
+            with engine.begin() as conn:
+                conn.execute(text(statement))
+    return statements
+
+
+# ✅ Drop the indexes created by migrate_table (used by the benchmark for the "before" run)
+def rollback_table(engine, table="daily_price"):
+    with engine.connect() as conn:
+        existing = existing_indexes(conn, table)
+    for index in price_indexes(table):
+        if index.name in existing:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table} DROP INDEX {index.name}"))
+            print(f"🗑️ Dropped {table}.{index.name}")
+
+
+def migrate(engine, tables=PRICE_TABLES, dedupe=False, dry_run=False):
+    return [statement for table in tables for statement in migrate_table(engine, table, dedupe, dry_run)]
+
+
+# ✅ Main Execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add composite (symbol, date) indexes to the price tables.")
+    parser.add_argument("--database", default="Algo_trading")
+    parser.add_argument("--tables", nargs="*", default=PRICE_TABLES)
+    parser.add_argument("--dedupe", action="store_true", help="Delete duplicate (symbol_id, price_date) rows, keeping the newest")
+    parser.add_argument("--dry-run", action="store_true", help="Print the DDL without running it")
+    parser.add_argument("--rollback", action="store_true", help="Drop the indexes this tool creates")
+    args = parser.parse_args()
+
+    engine = get_engine(args.database)
+    if args.rollback:
+        for table in args.tables:
+            rollback_table(engine, table)
+    else:
+        migrate(engine, args.tables, args.dedupe, args.dry_run)
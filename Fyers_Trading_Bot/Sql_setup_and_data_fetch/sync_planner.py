@@ -0,0 +1,83 @@
+import datetime
+import argparse
+from collections import namedtuple
+import pandas as pd
+from sqlalchemy import text
+from db_engine import get_engine
+
+# ✅ One download job: fetch [start_date, end_date] for a symbol
+FetchTask = namedtuple("FetchTask", ["symbol_id", "ticker", "stock_name", "start_date", "end_date"])
+
+DEFAULT_START = datetime.date(2024, 1, 1)  # First date fetched for symbols with no rows yet
+
+# Every symbol with its newest bar in one pass (served from the (symbol_id, price_date) index)
+WATERMARK_QUERY = """
+    SELECT sym.id AS symbol_id, sym.ticker, sym.name AS stock_name, MAX(t.price_date) AS last_date
+    FROM symbol AS sym
+    LEFT JOIN {table} AS t ON t.symbol_id = sym.id
+    GROUP BY sym.id, sym.ticker, sym.name
+    ORDER BY sym.id
+"""
+
+
+# ✅ Newest stored bar per symbol (NaT for symbols with no rows)
+def read_table_watermarks(engine, table="daily_price"):
+    with engine.connect() as conn:
+        df = pd.read_sql(text(WATERMARK_QUERY.format(table=table)), conn)
+    df["last_date"] = pd.to_datetime(df["last_date"])
+    return df
+
+
+# ✅ Missing ranges for every symbol at once
+def plan_sync(engine, end_date=None, default_start=DEFAULT_START, table="daily_price", resolution="D", tickers=None):
+    """
+    Builds the fetch plan for an incremental sync.
+
+    Parameters:
+        end_date (date): Last date to fetch (defaults to yesterday).
+        default_start (date): Start date for symbols with no stored rows.
+        table (str): daily_price or minute_price.
+        resolution (str): "D" resumes the day after the last bar; intraday resolutions re-fetch the last
+                          (possibly partial) day, which the upsert makes safe.
+        tickers (list[str]): Restrict the plan to these tickers.
+
+    Returns:
+        list[FetchTask]: Symbols that need data, oldest start first.
+    """
+    end_date = end_date or datetime.date.today() - datetime.timedelta(days=1)
+    watermarks = read_table_watermarks(engine, table)
+    if tickers is not None:
+        watermarks = watermarks[watermarks["ticker"].isin(tickers)]
+
+    step = pd.Timedelta(days=1) if resolution == "D" else pd.Timedelta(0)
+    start = (watermarks["last_date"].dt.normalize() + step).fillna(pd.Timestamp(default_start))
+    watermarks = watermarks.assign(start_date=start.dt.date)
+    pending = watermarks[watermarks["start_date"] <= end_date].sort_values(["start_date", "symbol_id"])
+
+    return [
+        FetchTask(int(row.symbol_id), row.ticker, row.stock_name, row.start_date, end_date)
+        for row in pending.itertuples(index=False)
+    ]
+
+
+def summarize_plan(plan, total_symbols=None):
+    if not plan:
+        print("✅ All symbols are up to date")
+        return
+    days = sum((task.end_date - task.start_date).days + 1 for task in plan)
+    print(f"🗓️ Fetch plan: {len(plan)} symbols{f' of {total_symbols}' if total_symbols else ''}, "
+          f"{days} symbol-days, oldest start {plan[0].start_date}")
+
+
+# ✅ Main Execution: print the plan
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show which symbols need data and from when.")
+    parser.add_argument("--database", default="Algo_trading")
+    parser.add_argument("--table", default="daily_price")
+    parser.add_argument("--resolution", default="D")
+    args = parser.parse_args()
+
+    plan = plan_sync(get_engine(args.database), table=args.table, resolution=args.resolution)
+    for task in plan:
+        print(f"📅 {task.stock_name} ({task.ticker}): {task.start_date} → {task.end_date}")
+    summarize_plan(plan)
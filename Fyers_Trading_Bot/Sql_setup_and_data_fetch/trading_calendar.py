@@ -0,0 +1,51 @@
+import datetime
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import holidays
+
+# ✅ NSE cash-market session (IST): 09:15 to 15:30 → 375 one-minute bars, first bar stamped 09:15
+SESSION_OPEN = datetime.time(9, 15)
+SESSION_CLOSE = datetime.time(15, 30)
+SESSION_MINUTES = 375
+
+
+# ✅ Exchange holidays (falls back to Indian public holidays on old versions of `holidays`)
+@lru_cache(maxsize=None)
+def _holidays_for_year(year):
+    try:
+        calendar = holidays.financial_holidays("XNSE", years=year)
+    except (AttributeError, NotImplementedError, KeyError):
+        calendar = holidays.India(years=year)
+    return frozenset(calendar.keys())
+
+
+def nse_holidays(start, end):
+    days = set()
+    for year in range(pd.Timestamp(start).year, pd.Timestamp(end).year + 1):
+        days |= _holidays_for_year(year)
+    return days
+
+
+def is_trading_day(day=None):
+    day = day or datetime.date.today()
+    return day.weekday() < 5 and day not in nse_holidays(day, day)
+
+
+# ✅ Trading days between start and end inclusive (weekdays minus NSE holidays)
+def trading_days(start, end):
+    days = pd.bdate_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize())
+    closed = pd.DatetimeIndex(sorted(nse_holidays(start, end)))
+    return days.difference(closed)
+
+
+# ✅ Every expected bar timestamp (sorted) for a resolution: "D" or minutes ("1", "5", "15", ...)
+def session_slots(start, end, resolution="D"):
+    days = trading_days(start, end)
+    if resolution == "D":
+        return days
+    step = int(resolution)
+    offsets = (np.arange(0, SESSION_MINUTES, step) * 60 + (SESSION_OPEN.hour * 60 + SESSION_OPEN.minute) * 60)
+    offsets = offsets.astype("timedelta64[s]").astype("timedelta64[ns]")
+    slots = days.values[:, None] + offsets[None, :]
+    return pd.DatetimeIndex(slots.ravel())
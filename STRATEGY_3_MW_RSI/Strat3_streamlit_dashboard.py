@@ -1,29 +1,26 @@
+import os
+import sys
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
-from urllib.parse import quote_plus
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Sql_setup_and_data_fetch"))
+from db_engine import get_engine
 
 
 # --- App Title ---
 st.set_page_config(page_title="MW RSI Strategy Dashboard", layout="wide")
 st.title("📊 MW RSI Strategy - Signal Monitor")
 
-# --- DB credentials ---
-username = 'root'                # ← change to your MySQL username
-password = quote_plus('Apple@1331')  # ✅ URL-encoded
-host = 'localhost'
-port = 3306
+# --- DB (credentials come from .env, see db_engine.py) ---
 database = 'Algo_Trading'
 
-connection_str = f"mysql+pymysql://{username}:{password}@{host}:{port}/{database}"
-
 # --- Create SQLAlchemy engine ---
 try:
-    engine = create_engine(connection_str)
+    engine = get_engine(database)
     # Test connection
     with engine.connect() as conn:
-        result = conn.execute("SELECT 1")
+        result = conn.execute(text("SELECT 1"))
 
     # --- Read latest signals ---
     query = "SELECT * FROM signal_log ORDER BY timestamp DESC LIMIT 50"
@@ -1,36 +1,36 @@
 import numpy as np
 import pandas as pd
-import mysql.connector as mdb
 import os
-from urllib.parse import quote_plus
-from sqlalchemy import create_engine
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
+import sys
 
-# Database Configuration
-db_config = {
-    "host": "localhost",
-    "user": "Algo_Trading",
-    "password": "",
-    "database": "Historical_data_2024"
-}
+# ✅ Shared data layer (pooled engine, Parquet candle store)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Sql_setup_and_data_fetch"))
+from db_engine import get_engine, raw_connection
+from candle_store import candle_store_dir, load_candles, sync_candle_store, to_compact
+from ohlcv_panel import load_or_build_panel, panel_index, panel_to_frame, store_fingerprint
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Indicators"))
+from indicators import PanelLayout, from_panel, lag, panel_layout, rsi_sma, to_panel
 
-# Connect to MySQL
+# Database Configuration (credentials come from the environment, see db_engine.py)
+DB_NAME = "Historical_data_2024"
+
+# Connect to MySQL (pooled connection; close() returns it to the pool)
 def connect_db():
     try:
-        con = mdb.connect(**db_config)
+        con = raw_connection(DB_NAME)
         print("✅ Database connection successful!")
         return con
-    except mdb.Error as e:
+    except Exception as e:
         print(f"❌ Database connection error: {e}")
         return None
 
-con = connect_db()
-ENCODED_PASS = quote_plus(db_config["password"])
-ENGINE = create_engine(f"mysql+mysqlconnector://{db_config['user']}:{ENCODED_PASS}@{db_config['host']}/{db_config['database']}")
+ENGINE = get_engine(DB_NAME)
+STORE_DIR = candle_store_dir(DB_NAME)
 
 # Load Historical Data
-def load_data_from_db():
+def load_data_from_db(compact=False):
     query = """
         SELECT sym.ticker, dp.price_date AS timestamp, dp.open_price AS open, dp.high_price AS high, 
                dp.low_price AS low, dp.close_price AS close, dp.volume AS volume
@@ -43,62 +43,73 @@ def load_data_from_db():
     df["timestamp"] = pd.to_datetime(df["timestamp"])
     symbols = df["ticker"].unique()
     print(f"Processing {len(symbols)} stocks: {symbols}")
-    return df.set_index(["ticker", "timestamp"])
+    df = df.set_index(["ticker", "timestamp"])
+    return to_compact(df) if compact else df  # ✅ float32 OHLC, uint32 volume, categorical ticker, epoch seconds
+
+# Load Historical Data from the local Parquet mirror of daily_price
+def load_data_from_store(tickers=None, start_date=None, end_date=None, compact=False):
+    df = load_candles(tickers=tickers, start_date=start_date, end_date=end_date, store_dir=STORE_DIR, compact=compact)
+    symbols = df.index.get_level_values("ticker").unique()
+    print(f"Processing {len(symbols)} stocks from {STORE_DIR}: {list(symbols)}")
+    return df
+
+# Sync only rows newer than each symbol's watermark, then read the mirror (MySQL if the mirror is empty)
+def load_data(compact=False):
+    try:
+        sync_candle_store(ENGINE, STORE_DIR)
+    except Exception as e:
+        print(f"⚠️ Candle store sync failed, using the local mirror as-is: {e}")
+    df = load_data_from_store(compact=compact)
+    if not df.empty:
+        return df
+    return load_data_from_db(compact=compact)
+
+# Sync, then open the memory-mapped (ticker x date) panel of the mirror (None without a local mirror)
+def load_panel_data():
+    try:
+        sync_candle_store(ENGINE, STORE_DIR)
+    except Exception as e:
+        print(f"⚠️ Candle store sync failed, using the local mirror as-is: {e}")
+    if store_fingerprint(STORE_DIR) is None:
+        return None
+    panel = load_or_build_panel(STORE_DIR)
+    print(f"Processing {len(panel.tickers)} stocks from the panel in {STORE_DIR}: {list(panel.tickers)}")
+    return panel if len(panel.tickers) else None
 
 
 # Calculate RSI with SMA(14,2)
 
-def calculate_rsi(data, period=14, smoothing=2):
+def calculate_rsi(data, period=14, smoothing=2, panel=None):
     """
-    Computes the Relative Strength Index (RSI) and a smoothed RSI SMA.
+    Computes the Relative Strength Index (RSI) and a smoothed RSI SMA for every ticker in one call.
 
     Parameters:
         data (pd.DataFrame): DataFrame with MultiIndex (ticker, date) and a 'close' column.
         period (int): Lookback period for RSI calculation.
         smoothing (int): Lookback period for RSI SMA calculation.
+        panel (OHLCVPanel): Panel `data` came from (panel_to_frame); its memory-mapped close array is used as is.
 
     Returns:
         pd.DataFrame: Original DataFrame with added 'RSI' and 'RSI_SMA' columns.
     """
-
-    # Ensure the DataFrame is sorted
-    data = data.sort_values(by="timestamp")  # ✅ Ensure chronological order
-
-
-    # Compute price change
-    delta = data["close"].groupby(level=0).diff()
-
-    # Compute gains and losses
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-
-    # Compute EMA of gains and losses
-    avg_gain = gain.groupby(level=0).ewm(span=period, adjust=False).mean()
-    avg_loss = loss.groupby(level=0).ewm(span=period, adjust=False).mean()
-
-    # Compute RSI (avoiding division by zero)
-    rs = avg_gain / (avg_loss + 1e-10)
-    rsi = 100 - (100 / (1 + rs))
-
-    # ✅ Fix index misalignment before assignment
-    data = data.copy()  # Avoid modifying original
-    data["RSI"] = rsi.reset_index(level=0, drop=True)
-
-    # ✅ Compute RSI SMA (Smoothed RSI) and fix indexing
-    data["RSI_SMA"] = (
-        data["RSI"]
-        .groupby(level=0)
-        .rolling(window=smoothing, min_periods=1)
-        .mean()
-        .reset_index(level=0, drop=True)
+    if panel is not None:
+        rows, cols = panel_index(panel)  # ✅ Same row order as panel_to_frame(panel)
+        layout, close = PanelLayout(panel.tickers, panel.dates, rows, cols), panel.close
+    else:
+        layout = panel_layout(data.index)  # ✅ (ticker x date) arrays, chronological per ticker
+        close = to_panel(data["close"], layout)
+    rsi, rsi_smoothed = rsi_sma(close, period, smoothing, method="ema")
+    data = data.assign(
+        RSI=from_panel(rsi, layout),
+        RSI_SMA=from_panel(rsi_smoothed, layout),
+        RSI_SMA_prev=from_panel(lag(rsi_smoothed), layout),  # Previous bar of the same ticker
     )
-
-    return data
+    return data.sort_values(by="timestamp")  # ✅ Chronological order (backtest() walks the rows in order)
 
 # Generate Buy/Sell Signals based on M & W Patterns
 def generate_signals(data):
     data["Signal"] = 0
-    rsi_shifted = data["RSI_SMA"].groupby(level=0).shift(1)  # Avoid lookahead bias
+    rsi_shifted = data["RSI_SMA_prev"]  # Avoid lookahead bias
 
     # Vectorized Buy/Sell Signal Logic
     buy_signal = (rsi_shifted < 30) & (data["RSI_SMA"] > 30)
@@ -339,12 +350,13 @@ def save_to_excel(trades_log, trade_signals, summary):
 # Main Execution
 if __name__ == "__main__":
     print("🔄 Starting script execution...")
-    df = load_data_from_db()
+    panel = load_panel_data()
+    df = panel_to_frame(panel) if panel is not None else load_data_from_db()
     if df is None or df.empty:
         print("❌ No data loaded. Exiting...")
         exit()
     print(f"✅ Loaded {len(df)} rows from the database.")
-    df = calculate_rsi(df)
+    df = calculate_rsi(df, panel=panel)
     print("✅ RSI calculation complete.")
     df = generate_signals(df)
     print("✅ Signal generation complete.")
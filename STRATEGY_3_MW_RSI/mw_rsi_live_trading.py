@@ -1,17 +1,21 @@
 import time
 import requests
 import pandas as pd
-from urllib.parse import quote_plus
-from sqlalchemy import create_engine
-from fyers_api import fyersModel
-from datetime import datetime, timedelta
-from openpyxl import Workbook
+from datetime import datetime
 import os
 import logging
-from collections import deque
-import json
+import sys
 from dotenv import load_dotenv
 
+# ✅ Shared data layer (pooled engine, session-scoped history cache)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Sql_setup_and_data_fetch"))
+from db_engine import get_engine
+from history_cache import HistoryCache
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Fyers_API_setup"))
+from fyers_client import FyersClient, create_model
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Indicators"))
+from streaming import StreamingRSI
+
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -36,21 +40,12 @@ def send_telegram_alert(message):
 client_id = os.getenv("client_id")
 access_token = os.getenv("FYERS_ACCESS_TOKEN")
 
-# Database Configuration
-db_user = "sec_user"
-db_password = os.getenv("db_password")
-db_host = "localhost"
+# Database Configuration (pooled engine shared with the other scripts; credentials from .env)
 db_name = "Algo_trading"
+engine = get_engine(db_name)
 
-# SQLAlchemy connection string for MySQL
-db_password_encoded = quote_plus(db_password)
-db_url = f"mysql+mysqlconnector://{db_user}:{db_password_encoded}@{db_host}/{db_name}"
-
-# Create engine
-engine = create_engine(db_url)
-
-# ✅ Initialize Fyers API
-fyers = fyersModel.FyersModel(client_id=client_id, token=access_token, is_async=False, log_path="")
+# ✅ Initialize Fyers API (rate-budgeted wrapper; orders are never retried)
+fyers = FyersClient(create_model(client_id, access_token, package="fyers_api", is_async=False, log_path=""))
 
 # ✅ Capital Management
 MAX_CAPITAL = 10000  # Initial capital
@@ -213,29 +208,36 @@ def check_order_status():
     except Exception as e:
         logging.error(f"❌ Error checking order status: {e}")
 
-# ✅ Fetch Historical Data from MySQL
-def fetch_historical_data(symbol, days=14):
-    """Fetch last `days` of historical data for a stock using SQLAlchemy"""
+# ✅ Fetch Historical Data for all symbols in one query
+def fetch_historical_data_batch(symbols, days=14):
+    """Fetch the last `days` closes for every symbol with a single window-function query.
+    Returns {symbol: DataFrame indexed by price_date with a 'close' column}."""
+    if not symbols:
+        return {}
     try:
-        query = """
-            SELECT price_date, close_price AS close 
-            FROM daily_price 
-            WHERE stock_name = %s 
-            ORDER BY price_date DESC 
-            LIMIT %s
+        placeholders = ", ".join(["%s"] * len(symbols))
+        query = f"""
+            SELECT stock_name, price_date, close
+            FROM (
+                SELECT stock_name, price_date, close_price AS close,
+                       ROW_NUMBER() OVER (PARTITION BY stock_name ORDER BY price_date DESC) AS rn
+                FROM daily_price
+                WHERE stock_name IN ({placeholders})
+            ) AS recent
+            WHERE rn <= %s
+            ORDER BY stock_name, price_date
         """
-        df = pd.read_sql_query(query, engine, params=(symbol, days))
-
-        if df.empty:
-            return None
-
+        df = pd.read_sql_query(query, engine, params=(*symbols, days))
         df["price_date"] = pd.to_datetime(df["price_date"])
-        df.set_index("price_date", inplace=True)
-        return df.sort_index()
+
+        history = {}
+        for symbol, group in df.groupby("stock_name", sort=False):
+            history[symbol] = group.drop(columns="stock_name").set_index("price_date")
+        return history
 
     except Exception as e:
-        logging.error(f"❌ Error fetching historical data for {symbol}: {e}")
-        return None
+        logging.error(f"❌ Error fetching batched historical data: {e}")
+        return {}
 
 # ✅ Fetch Live Market Data from Fyers API
 def get_market_data(symbols):
@@ -259,24 +261,25 @@ def get_market_data(symbols):
         logging.error(f"❌ Error fetching live market data: {e}")
         return {}
 
-# ✅ Calculate RSI
-def calculate_rsi(df, period=14):
-    """Calculate RSI using rolling average method"""
-    delta = df["close"].diff()
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-
-    rs = avg_gain / (avg_loss + 1e-10)
-    df["RSI"] = 100 - (100 / (1 + rs))
-    return df
+# ✅ RSI state per symbol: seeded from the session's daily closes, then O(1) per live tick
+RSI_PERIOD = 14
+# Off by default: with 14 days of history the RSI rows are too few for a 5-close pattern, so the bot
+# never signals. MW_PATTERN_FULL_HISTORY=1 checks the pattern on the last closes + live price instead,
+# which lets W patterns place real bracket orders.
+MW_PATTERN_FULL_HISTORY = os.getenv("MW_PATTERN_FULL_HISTORY", "0") == "1"
+RSI_STATES = {}  # symbol → (closes the state was seeded from, StreamingRSI)
+
+def get_rsi_state(symbol, closes, period=RSI_PERIOD):
+    """Rolling-average RSI over the cached closes; re-seeded when the history cache reloads (new session)"""
+    cached = RSI_STATES.get(symbol)
+    if cached is None or cached[0] is not closes:
+        RSI_STATES[symbol] = (closes, StreamingRSI.from_history(closes, period, method="sma"))
+    return RSI_STATES[symbol][1]
 
 # ✅ Detect M/W Patterns
-def detect_mw_pattern(df, min_diff_percent=0.5):
-    """Detect M or W pattern based on closing prices"""
-    closes = df["close"].values[-5:]
+def detect_mw_pattern(closes, min_diff_percent=0.5):
+    """Detect M or W pattern based on the last 5 closing prices"""
+    closes = closes[-5:]
     if len(closes) < 5:
         return None
 
@@ -300,12 +303,16 @@ def detect_mw_pattern(df, min_diff_percent=0.5):
     return None
 
 # ✅ Trading Strategy + Signal Logging
-def check_trade_signals(symbol, df, live_price):
+def check_trade_signals(symbol, closes, live_price):
     global current_position
-    df = calculate_rsi(df)
-    df = df.dropna(subset=["RSI"])
-    latest_rsi = df.iloc[-1]["RSI"]
-    pattern = detect_mw_pattern(df)
+    # Today's bar is not closed yet: evaluate the live price without committing it to the RSI state
+    latest_rsi, _ = get_rsi_state(symbol, closes).peek(live_price)
+    if pd.isna(latest_rsi):  # Not enough history for the RSI warm-up
+        return
+    if MW_PATTERN_FULL_HISTORY:
+        pattern = detect_mw_pattern([*closes[-4:], live_price])
+    else:
+        pattern = detect_mw_pattern([*closes, live_price][RSI_PERIOD:])  # Closes that have an RSI value
 
     logging.info(f"Checking {symbol} — RSI: {latest_rsi:.2f}, Pattern: {pattern}")
 
@@ -323,6 +330,11 @@ def check_trade_signals(symbol, df, live_price):
 # ✅ Auto Trading Logic
 def auto_trade(symbols):
     init_trade_log_table()  # Initialize trade log table
+    if MW_PATTERN_FULL_HISTORY:
+        logging.warning("⚠️ MW_PATTERN_FULL_HISTORY=1: M/W patterns use the full close history and can place live orders")
+    # Daily history only changes once a day: load it once and reload when the session date changes
+    history_cache = HistoryCache(fetch_historical_data_batch, symbols)
+    history_cache.prefetch()
     while True:
         try:
             # Check status of open position
@@ -331,21 +343,19 @@ def auto_trade(symbols):
             # Get live market prices
             live_prices = get_market_data(symbols)
 
+            # History comes from the session cache (one batched query per day)
+            history_cache.prefetch()
+
             for symbol in symbols:
                 if current_position:
                     break  # Skip if a position is open
 
-                df = fetch_historical_data(symbol)
-                if df is not None and symbol in live_prices:
-                    live_time = datetime.now()
+                closes = history_cache.closes(symbol)
+                if len(closes) and symbol in live_prices:
                     live_close = live_prices[symbol]["live_price"]
 
-                    # Append live price to historical data
-                    new_row = pd.DataFrame({"close": [live_close]}, index=[live_time])
-                    df = pd.concat([df, new_row])
-
-                    # Check for trade signals
-                    check_trade_signals(symbol, df, live_close)
+                    # Check for trade signals (cached closes + live price, no DataFrame rebuild)
+                    check_trade_signals(symbol, closes, live_close)
 
             time.sleep(5)
 
@@ -1,27 +1,18 @@
 import os
+import sys
 import subprocess
 import webbrowser
 import time
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
-from urllib.parse import quote_plus
-from dotenv import load_dotenv
-load_dotenv()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Sql_setup_and_data_fetch"))
+from db_engine import get_engine
 
-# --- MySQL connection test ---
-username = 'sec_user'
-#db_password = os.getenv("db_password")
-password = quote_plus(db_password)
-#password = quote_plus('v')  # Escaped
-host = 'localhost'
-port = 3306
+# --- MySQL connection test (credentials come from .env, see db_engine.py) ---
 database = 'Algo_trading'
 
-connection_str = f"mysql+pymysql://{username}:{password}@{host}:{port}/{database}"
-print(f"DEBUG connection string: {connection_str}")
-
 try:
-    engine = create_engine(connection_str)
+    engine = get_engine(database)
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))
     print("✅ Connected successfully!")
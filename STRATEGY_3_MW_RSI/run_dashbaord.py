@@ -1,24 +1,18 @@
-import urllib.parse
+import os
+import sys
 import subprocess
 import webbrowser
 import time
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
-import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Sql_setup_and_data_fetch"))
+from db_engine import get_engine
 
-# DB Credentials
-username = 'sec_user'
-db_password = os.getenv("Apple@1331")
-password = urllib.parse.quote_plus(db_password)  # Encode special characters
-host = 'localhost'
-port = 3306
+# DB (credentials come from .env, see db_engine.py)
 database = 'Algo_trading'
 
 try:
-    conn_str = f"mysql+pymysql://{username}:{password}@{host}:{port}/{database}"
-    print("DEBUG connection string:", conn_str)
-
-    engine = create_engine(conn_str)
+    engine = get_engine(database)
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))  # ✅ Correct way in SQLAlchemy 2.0+
     print("✅ Connected successfully!")
@@ -1,36 +1,44 @@
+import argparse
 import numpy as np
 import pandas as pd
-import mysql.connector as mdb
 import os
-from urllib.parse import quote_plus
-from sqlalchemy import create_engine
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
+import sys
 
-# Database Configuration
-db_config = {
-    "host": "localhost",
-    "user": "Algo_Trading",
-    "password": "v",
-    "database": "Historical_data_2024"
-}
+# ✅ Shared data layer (pooled engine, Parquet candle store)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Sql_setup_and_data_fetch"))
+from db_engine import get_engine, raw_connection
+from candle_store import candle_store_dir, load_candles, sync_candle_store, to_compact
+from ohlcv_panel import load_or_build_panel, store_fingerprint
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Indicators"))
+from indicators import from_panel, panel_layout, rsi, supertrend, supertrend_sweep, to_panel
 
-# Connect to MySQL
+# Database Configuration (credentials come from the environment, see db_engine.py)
+DB_NAME = "Historical_data_2024"
+
+# ✅ Strategy parameters and the default Supertrend sweep grid
+RSI_PERIOD, RSI_THRESHOLD = 14, 60
+SUPERTREND_PERIOD, SUPERTREND_MULTIPLIER = 10, 3
+SWEEP_PERIODS = [7, 10, 14, 20]
+SWEEP_MULTIPLIERS = [1.5, 2, 2.5, 3, 3.5]
+SWEEP_COST = 0.0005  # Per-trade cost as a fraction of the exit value (stamp fee used in backtest())
+
+# Connect to MySQL (pooled connection; close() returns it to the pool)
 def connect_db():
     try:
-        con = mdb.connect(**db_config)
+        con = raw_connection(DB_NAME)
         print("✅ Database connection successful!")
         return con
-    except mdb.Error as e:
+    except Exception as e:
         print(f"❌ Database connection error: {e}")
         return None
 
-con = connect_db()
-ENCODED_PASS = quote_plus(db_config["password"])
-ENGINE = create_engine(f"mysql+mysqlconnector://{db_config['user']}:{ENCODED_PASS}@{db_config['host']}/{db_config['database']}")
+ENGINE = get_engine(DB_NAME)
+STORE_DIR = candle_store_dir(DB_NAME)
 
 # Load Historical Data
-def load_data_from_db():
+def load_data_from_db(compact=False):
     query = """
         SELECT sym.ticker, dp.price_date AS timestamp, dp.open_price AS open, dp.high_price AS high, 
                dp.low_price AS low, dp.close_price AS close, dp.volume AS volume
@@ -40,32 +48,45 @@ def load_data_from_db():
     """
     df = pd.read_sql(query, con=ENGINE)
     df["timestamp"] = pd.to_datetime(df["timestamp"])
-    return df.set_index(["ticker", "timestamp"])
-
-# Calculate RSI
-def calculate_rsi(data, period=14):
-    delta = data["close"].groupby(level=0).diff()
-    gain = delta.where(delta > 0, 0).groupby(level=0).rolling(window=period).mean().reset_index(0, drop=True)
-    loss = -delta.where(delta < 0, 0).groupby(level=0).rolling(window=period).mean().reset_index(0, drop=True)
-    rs = gain / loss
-    data["RSI"] = 100 - (100 / (1 + rs))
+    df = df.set_index(["ticker", "timestamp"])
+    return to_compact(df) if compact else df  # ✅ float32 OHLC, uint32 volume, categorical ticker, epoch seconds
+
+# Load Historical Data from the local Parquet mirror of daily_price
+def load_data_from_store(tickers=None, start_date=None, end_date=None, compact=False):
+    return load_candles(tickers=tickers, start_date=start_date, end_date=end_date, store_dir=STORE_DIR, compact=compact)
+
+# Sync only rows newer than each symbol's watermark, then read the mirror (MySQL if the mirror is empty)
+def load_data(compact=False):
+    try:
+        sync_candle_store(ENGINE, STORE_DIR)
+    except Exception as e:
+        print(f"⚠️ Candle store sync failed, using the local mirror as-is: {e}")
+    df = load_data_from_store(compact=compact)
+    if not df.empty:
+        return df
+    return load_data_from_db(compact=compact)
+
+# Calculate RSI (all tickers in one call; windows never cross into another ticker)
+def calculate_rsi(data, period=RSI_PERIOD):
+    layout = panel_layout(data.index)
+    data["RSI"] = from_panel(rsi(to_panel(data["close"], layout), period, method="sma"), layout)
     return data
 
-# Calculate Supertrend
-def calculate_supertrend(data, period=10, multiplier=3):
-    data["hl2"] = (data["high"] + data["low"]) / 2
-    data["atr"] = data["high"].rolling(period).max() - data["low"].rolling(period).min()
-    data["upper_band"] = data["hl2"] + (multiplier * data["atr"])
-    data["lower_band"] = data["hl2"] - (multiplier * data["atr"])
-    data["Supertrend"] = np.where(data["close"] > data["upper_band"], data["lower_band"], data["upper_band"])
+# Calculate Supertrend (Wilder ATR, ratcheting bands, trend flips; per ticker)
+def calculate_supertrend(data, period=SUPERTREND_PERIOD, multiplier=SUPERTREND_MULTIPLIER):
+    layout = panel_layout(data.index)
+    high, low, close = (to_panel(data[field], layout) for field in ["high", "low", "close"])
+    line, direction, upper_band, lower_band = supertrend(high, low, close, period, multiplier)
+    data["upper_band"] = from_panel(upper_band, layout)
+    data["lower_band"] = from_panel(lower_band, layout)
+    data["Supertrend"] = from_panel(line, layout)
+    data["Trend"] = from_panel(direction, layout)  # +1 uptrend (line = lower band), -1 downtrend
     return data
 
 # Generate Trading Signals
 def generate_signals(data):
-    data["Signal"] = 0
-    for ticker, group in data.groupby(level=0):
-        buy_signals = (group["RSI"] > 60) & (group["close"] > group["Supertrend"])
-        data.loc[buy_signals.index, "Signal"] = 1
+    buy_signals = (data["RSI"] > RSI_THRESHOLD) & (data["close"] > data["Supertrend"])
+    data["Signal"] = buy_signals.astype(int)
     return data
 
 # Backtest Strategy (Fixes Applied)
@@ -132,6 +153,61 @@ def backtest(data, initial_balance=10000, brokerage_fee=20):
 
     return all_trades, summary
 
+# ✅ Sweep Supertrend period x multiplier over every ticker at once
+def sweep_supertrend(data, periods=SWEEP_PERIODS, multipliers=SWEEP_MULTIPLIERS, cost=SWEEP_COST):
+    """Same as sweep_supertrend_panel() for a MultiIndex (ticker, timestamp) frame."""
+    layout = panel_layout(data.index)
+    high, low, close = (to_panel(data[field], layout) for field in ["high", "low", "close"])
+    return sweep_supertrend_panel(high, low, close, periods, multipliers, cost)
+
+def sweep_supertrend_panel(high, low, close, periods=SWEEP_PERIODS, multipliers=SWEEP_MULTIPLIERS, cost=SWEEP_COST):
+    """
+    Scores every (period, multiplier) pair with the strategy's rules, per ticker: buy at the close when
+    RSI > RSI_THRESHOLD and the close is above the Supertrend, sell at the close when it falls below.
+    Positions still open at the end are marked to the last close.
+
+    high, low, close: (tickers x dates) arrays with NaN for missing bars, e.g. the memory-mapped OHLCVPanel.
+
+    Returns:
+        pd.DataFrame: One row per pair (mean return per ticker %, trades, win rate %), best first.
+    """
+    pairs, lines, _ = supertrend_sweep(high, low, close, periods, multipliers)
+    rsi_values = rsi(close, RSI_PERIOD, method="sma")
+
+    # Every (pair, ticker) is one row of the position loop
+    n_pairs, n_tickers, n_dates = lines.shape
+    closes = np.tile(close, (n_pairs, 1))
+    buy = np.tile(rsi_values > RSI_THRESHOLD, (n_pairs, 1)) & (closes > lines.reshape(-1, n_dates))
+    sell = closes < lines.reshape(-1, n_dates)
+    rows = n_pairs * n_tickers
+    holding, entry, last_close = np.zeros(rows, bool), np.full(rows, np.nan), np.full(rows, np.nan)
+    log_return, trades, wins = np.zeros(rows), np.zeros(rows), np.zeros(rows)
+    for j in range(n_dates):
+        c = closes[:, j]
+        exits = holding & sell[:, j]
+        trade_return = np.log(c / entry) + np.log1p(-cost)
+        log_return += np.where(exits, trade_return, 0.0)
+        trades += exits
+        wins += exits & (trade_return > 0)
+        holding &= ~exits
+        entries = ~holding & buy[:, j]
+        entry = np.where(entries, c, entry)
+        holding |= entries
+        last_close = np.where(np.isnan(c), last_close, c)
+    log_return += np.where(holding, np.log(last_close / entry), 0.0)
+
+    per_ticker = np.expm1(log_return).reshape(n_pairs, n_tickers) * 100
+    trades, wins = trades.reshape(n_pairs, n_tickers).sum(axis=1), wins.reshape(n_pairs, n_tickers).sum(axis=1)
+    results = pd.DataFrame({
+        "Period": [p for p, _ in pairs],
+        "Multiplier": [m for _, m in pairs],
+        "Mean Return %": per_ticker.mean(axis=1).round(2),
+        "Median Return %": np.median(per_ticker, axis=1).round(2),
+        "Trades": trades.astype(int),
+        "Win Rate %": np.where(trades > 0, 100 * wins / np.maximum(trades, 1), 0).round(2),
+    })
+    return results.sort_values("Mean Return %", ascending=False, ignore_index=True)
+
 # Save Results to Excel
 def save_results_to_files(all_trades, summary):
     output_dir = "/Users/ankursaraswat/Fyers_API_trading_bot/Strategy_2_RSI_Supertrend/"
@@ -168,10 +244,31 @@ def save_results_to_files(all_trades, summary):
 
 # Run Backtest
 if __name__ == "__main__":
-    df = load_data_from_db()
-    df = calculate_rsi(df)
-    df = calculate_supertrend(df)
-    df = generate_signals(df)
-    
-    all_trades, summary = backtest(df)
-    save_results_to_files(all_trades, summary)
+    parser = argparse.ArgumentParser(description="Backtest the RSI + Supertrend strategy.")
+    parser.add_argument("--sweep", action="store_true", help="Rank Supertrend (period, multiplier) pairs and exit")
+    parser.add_argument("--periods", type=int, nargs="+", default=SWEEP_PERIODS)
+    parser.add_argument("--multipliers", type=float, nargs="+", default=SWEEP_MULTIPLIERS)
+    args = parser.parse_args()
+
+    if args.sweep:
+        # ✅ The sweep only needs (ticker x date) arrays: read them straight from the memory-mapped panel
+        try:
+            sync_candle_store(ENGINE, STORE_DIR)
+        except Exception as e:
+            print(f"⚠️ Candle store sync failed, using the local mirror as-is: {e}")
+        if store_fingerprint(STORE_DIR) is not None:
+            panel = load_or_build_panel(STORE_DIR)
+            ranking = sweep_supertrend_panel(panel.high, panel.low, panel.close, args.periods, args.multipliers)
+        else:
+            ranking = sweep_supertrend(load_data_from_db(), args.periods, args.multipliers)
+        ranking.to_csv("supertrend_sweep.csv", index=False)
+        print(ranking.head(10).to_string(index=False))
+        print("✅ Sweep results saved to supertrend_sweep.csv")
+    else:
+        df = load_data()
+        df = calculate_rsi(df)
+        df = calculate_supertrend(df)
+        df = generate_signals(df)
+
+        all_trades, summary = backtest(df)
+        save_results_to_files(all_trades, summary)
@@ -1,30 +1,36 @@
+import os
+import sys
 import time
 import json
-import pymysql
 import requests
-import pandas as pd
-from fyers_api import fyersModel
 from concurrent.futures import ThreadPoolExecutor
 
-# MySQL connection
-DB_CONFIG = {
-    "host": "localhost",
-    "user": "root",
-    "password": "yourpassword",
-    "database": "Algo_Trading"
-}
+# ✅ Shared data layer (pooled engine, resampled intraday bars)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Sql_setup_and_data_fetch"))
+from db_engine import get_engine
+from bar_resampler import LiveBars
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Fyers_API_setup"))
+from fyers_client import FyersClient, create_model
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Fyers_Trading_Bot", "Indicators"))
+from indicators import macd, rsi
+
+# MySQL connection (pooled engine; credentials come from the environment)
+DB_NAME = "Algo_Trading"
+ENGINE = get_engine(DB_NAME)
 
 # FYERS API Configuration
 FYERS_CLIENT_ID = "YOUR_CLIENT_ID"
 FYERS_ACCESS_TOKEN = "YOUR_ACCESS_TOKEN"
 
-fyers = fyersModel.FyersModel(client_id=FYERS_CLIENT_ID, token=FYERS_ACCESS_TOKEN, log_path="")
+fyers = FyersClient(create_model(FYERS_CLIENT_ID, FYERS_ACCESS_TOKEN, package="fyers_api", log_path=""))
 
 # Telegram Bot Configuration
 TELEGRAM_BOT_TOKEN = "YOUR_TELEGRAM_BOT_TOKEN"
 TELEGRAM_CHAT_ID = "YOUR_CHAT_ID"
 
 # Trading Parameters
+BAR_RESOLUTION = "15"  # Minutes per bar ("5", "15", "60" or "D")
+BAR_LOOKBACK_DAYS = 10  # Enough 15-minute bars for the MACD/RSI warm-up
 STOP_LOSS_PERCENT = 1.5  # 1.5% SL
 TAKE_PROFIT_PERCENT = 3.0  # 3% TP
 
@@ -54,50 +60,31 @@ def fetch_market_data(symbol):
         print(f"Error fetching data for {symbol}: {str(e)}")
     return None
 
-# Fetch and update historical data in MySQL
-def fetch_historical_data(symbol, days=50):
+# Intraday bars come from the resampled bar tables; live prices only update the in-memory latest bar
+BARS = LiveBars(ENGINE, NIFTY50_STOCKS, resolution=BAR_RESOLUTION, lookback_days=BAR_LOOKBACK_DAYS)
+
+
+# Recent bars with the latest market price folded into the current bar (nothing is written to MySQL)
+def fetch_historical_data(symbol, bars=50):
     try:
-        connection = pymysql.connect(**DB_CONFIG)
-        with connection.cursor() as cursor:
-            # Fetch last 50 days' closing prices
-            query = f"SELECT date, close FROM daily_price WHERE symbol = %s ORDER BY date DESC LIMIT %s"
-            cursor.execute(query, (symbol, days))
-            rows = cursor.fetchall()
-
-            # Convert to DataFrame
-            df = pd.DataFrame(rows, columns=["date", "close"]).sort_values(by="date", ascending=True)
-
-            # Fetch latest market price
-            market_data = fetch_market_data(symbol)
-            if market_data:
-                latest_price = market_data["price"]
-                df = df.append({"date": pd.Timestamp.now(), "close": latest_price}, ignore_index=True)
-
-                # Insert the latest price into MySQL
-                insert_query = "INSERT INTO daily_price (symbol, date, close) VALUES (%s, NOW(), %s)"
-                cursor.execute(insert_query, (symbol, latest_price))
-                connection.commit()
-
-        connection.close()
-        return df
+        market_data = fetch_market_data(symbol)
+        if market_data:
+            BARS.update(symbol, market_data["price"])
+        history = BARS.frame(symbol)
+        if history is None:
+            return None
+        return history.tail(bars).rename_axis("date").reset_index()
     except Exception as e:
         print(f"Error updating historical data: {str(e)}")
         return None
 
 # Compute RSI
 def calculate_rsi(data, period=14):
-    delta = data["close"].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
+    return rsi(data["close"].to_numpy(), period, method="sma")
 
 # Compute MACD
 def calculate_macd(data, short_window=12, long_window=26, signal_window=9):
-    short_ema = data["close"].ewm(span=short_window, adjust=False).mean()
-    long_ema = data["close"].ewm(span=long_window, adjust=False).mean()
-    data["macd"] = short_ema - long_ema
-    data["signal"] = data["macd"].ewm(span=signal_window, adjust=False).mean()
+    data["macd"], data["signal"], _ = macd(data["close"].to_numpy(), short_window, long_window, signal_window)
 
 # Fetch available funds from Fyers
 def get_available_funds():
@@ -149,6 +136,9 @@ def place_trade(symbol, side, price):
 
 # Strategy Execution
 def execute_strategy(symbol):
+    if BARS.is_stale(symbol):  # Bars missing since the previous session (logged once per session by LiveBars)
+        return
+
     historical_data = fetch_historical_data(symbol)
     if historical_data is None or historical_data.empty:
         return